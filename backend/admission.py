@@ -0,0 +1,158 @@
+from flask import request, jsonify, g, current_app
+from functools import wraps
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to per-process limits
+    fcntl = None
+
+# Endpoints that scan a business's full history, fit models or render files.
+# Each one takes a slot after its auth checks (heavy_request / admit) and
+# gets a deadline (see deadline.py). Everything else (auth, CRUD, POS
+# sales) is "light" and is never throttled.
+HEAVY_ENDPOINTS = {
+    # ai_insights blueprint
+    "ai.get_dashboard_stats",
+    "ai.get_csv_analysis",
+    "ai.get_transaction_analysis",
+    "ai.export_ai_data",
+    "ai.export_report_excel",
+    "ai.export_report_pdf",
+    "ai.get_advanced_analytics",
+    # bundle / portfolio blueprints
+    "bundle.get_dashboard_bundle",
+    "portfolio.get_portfolio_dashboard",
+    # export blueprint
+    "export.export_transactions",
+    "export.email_report",
+    # app.py
+    "ai_predictions",
+    "get_predictions",
+    "get_pnl_data",
+    "get_inventory_insights",
+    "get_profit_stars",
+    "import_transactions",
+}
+
+
+def is_heavy(endpoint):
+    return endpoint in HEAVY_ENDPOINTS
+
+
+class SlotLimiter:
+    """Counting semaphore shared by every worker process on the host.
+
+    Each slot is a lock file; holding a non-blocking flock on one of the
+    `limit` files for a name means holding a slot. flock locks belong to the
+    open file, so this works the same across gunicorn workers and across
+    threads of one worker, and a crashed worker releases its slots with its
+    file descriptors.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local_counts = {}
+
+    def acquire(self, name, limit):
+        """Returns a slot handle, or None if all `limit` slots are taken."""
+        if limit <= 0:
+            return None
+        if fcntl is None:
+            with self._lock:
+                if self._local_counts.get(name, 0) >= limit:
+                    return None
+                self._local_counts[name] = self._local_counts.get(name, 0) + 1
+            return name
+
+        for i in range(limit):
+            f = open(os.path.join(self.directory, f"{name}-{i}.lock"), "a")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except OSError:
+                f.close()
+        return None
+
+    def release(self, handle):
+        if handle is None:
+            return
+        if fcntl is None:
+            with self._lock:
+                self._local_counts[handle] -= 1
+            return
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            handle.close()
+
+
+def init_admission(app):
+    """Caps concurrent heavy requests globally and per business.
+
+    Config: HEAVY_MAX_CONCURRENT (all businesses), HEAVY_MAX_PER_BUSINESS,
+    HEAVY_RETRY_AFTER (seconds sent with the 429) and ADMISSION_LOCK_DIR.
+    Set HEAVY_MAX_CONCURRENT to 0 to disable the limiter, and
+    HEAVY_MAX_PER_BUSINESS to 0 to only apply the global cap.
+    """
+    limiter = SlotLimiter(app.config.get("ADMISSION_LOCK_DIR") or os.path.join(tempfile.gettempdir(), "bulkbins-admission"))
+    app.extensions["admission"] = limiter
+
+    @app.teardown_request
+    def _release_heavy_request(exc):
+        slots = g.pop("admission_slots", None)
+        if slots:
+            for slot in slots:
+                limiter.release(slot)
+
+    return limiter
+
+
+def admit(business_id=None):
+    """Takes a heavy-request slot for this request, or returns the 429 response to send.
+
+    Call it once the caller passed the route's auth and role checks, so
+    nobody can hold a business's slots without being allowed to read it.
+    The slots are released when the request is torn down.
+    """
+    limiter = current_app.extensions.get("admission")
+    global_limit = current_app.config.get("HEAVY_MAX_CONCURRENT", 4)
+    if limiter is None or not global_limit or request.method == "OPTIONS" or "admission_slots" in g:
+        return None
+
+    business_slot = None
+    business_limit = current_app.config.get("HEAVY_MAX_PER_BUSINESS", 2)
+    if business_id is not None and business_limit > 0:
+        business_slot = limiter.acquire(f"business-{business_id}", business_limit)
+        if business_slot is None:
+            return _too_many("This business already has too many reports running. Please retry shortly.")
+
+    global_slot = limiter.acquire("global", global_limit)
+    if global_slot is None:
+        limiter.release(business_slot)
+        return _too_many("The server is busy generating reports. Please retry shortly.")
+
+    g.admission_slots = (business_slot, global_slot)
+    return None
+
+
+def heavy_request(f):
+    """admit() as a decorator; put it below role_required / jwt_required."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        busy = admit(kwargs.get("business_id"))
+        if busy is not None:
+            return busy
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _too_many(message):
+    resp = jsonify({"error": message})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(current_app.config.get("HEAVY_RETRY_AFTER", 5))
+    return resp
@@ -3,17 +3,29 @@ import numpy as np
 import matplotlib
 matplotlib.use('Agg') # Fix for threading issues on Windows/Flask
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
 import os
 from datetime import datetime
+from deadline import check_deadline
+from holt_winters import FORECAST_MODES, mode_error, fit_holt_winters, forecast_holt_winters
 
-def run_analysis(file_path, granularity='weekly'):
+def run_analysis(file_path, granularity='weekly', mode='linear'):
     # 1. Load Data
     if not os.path.exists(file_path):
         return {"error": "File not found"}
     
     df = pd.read_csv(file_path)
-    
+    return analyze_frame(df, granularity, mode=mode)
+
+def analyze_frame(df, granularity='weekly', models=None, mode='linear'):
+    """Runs the analysis on an already-loaded DataFrame (CSV upload or DB transactions).
+
+    `mode` is "linear" (regression on the date) or "holt-winters" (see
+    holt_winters.py). `models`, if given, is called with the fitting function
+    and returns the series params to use, so a caller can reuse a stored fit
+    (see model_registry).
+    """
+    if mode not in FORECAST_MODES:
+        raise ValueError(mode_error(mode))
     # Flexible Column Mapping — supports multiple CSV formats
     col_map = {
         # Date columns
@@ -79,6 +91,7 @@ def run_analysis(file_path, granularity='weekly'):
         has_profit_col = True
 
     # 2. Multi-Series Aggregation
+    check_deadline("aggregation")
     df = df.sort_values('Date')
     
     sales_df = df[df['Type'].str.contains('Sale', case=False, na=False)].copy()
@@ -112,7 +125,7 @@ def run_analysis(file_path, granularity='weekly'):
     if 'Category' in df.columns:
         # Show sales by category (more useful for a store)
         sales_cats = sales_df.groupby('Category')['Amount'].sum().sort_values(ascending=False).reset_index()
-        cat_breakdown = [{"category": row['Category'], "amount": float(row['Amount'])} for _, row in sales_cats.iterrows()]
+        cat_breakdown = [{"category": row['Category'], "amount": row['Amount']} for _, row in sales_cats.iterrows()]
     
     # Product-level breakdown (top 10 products by revenue)
     product_breakdown = []
@@ -123,50 +136,95 @@ def run_analysis(file_path, granularity='weekly'):
         ).sort_values('revenue', ascending=False).head(10).reset_index()
         
         product_breakdown = [
-            {"product": row['Product'], "revenue": float(row['revenue']), "quantity": int(row.get('quantity', 0))}
+            {"product": row['Product'], "revenue": row['revenue'], "quantity": row.get('quantity', 0)}
             for _, row in top_products.iterrows()
         ]
 
     # 4. AI Forecasting (Linear Regression for each series)
+    check_deadline("forecasting")
     resampled_df['Date_Ordinal'] = resampled_df['Date'].map(datetime.toordinal)
     
-    def get_forecast(series_name, periods=8):
-        y = resampled_df[series_name].values
+    def fit_series_holt_winters():
+        """Holt-Winters state of all three series, fitted together: (params, metrics), JSON-ready."""
+        names = ('Sales', 'Expenses', 'Profit')
+        Y = resampled_df[list(names)].to_numpy(dtype=float).T
+        # Seasonal only once there are two full seasons to learn it from (104
+        # weeks for weekly data); plain Holt until then, and always for yearly
+        season_length = {'D': 7, 'W': 52, 'M': 12, 'Q': 4, '6M': 2}.get(freq)
+        if season_length is not None and Y.shape[1] < 2 * season_length:
+            season_length = None
+        hw = fit_holt_winters(Y, season_length)
+        params, metrics = {}, {}
+        for i, name in enumerate(names):
+            params[name] = {"mode": "holt-winters", "level": float(hw["level"][i]), "trend": float(hw["trend"][i]),
+                            "season": hw["season"][i].tolist(), "periods": hw["periods"]}
+            metrics[name] = {"observations": int(hw["observations"][i]), "rmse": float(hw["rmse"][i]),
+                             "alpha": float(hw["alpha"][i]), "beta": float(hw["beta"][i]), "gamma": float(hw["gamma"][i])}
+        return params, metrics
+
+    def fit_series():
+        """Linear trend of each series over the date ordinals: (params, metrics), JSON-ready."""
+        if mode == 'holt-winters':
+            return fit_series_holt_winters()
+        from sklearn.linear_model import LinearRegression # deferred: keeps sklearn out of app start-up
         X = resampled_df[['Date_Ordinal']].values
-        if len(y[y != 0]) < 2: return [float(y[-1] if len(y) > 0 else 0)] * periods, 0
-        
-        model = LinearRegression()
-        model.fit(X, y)
+        params, metrics = {}, {}
+        for name in ('Sales', 'Expenses', 'Profit'):
+            y = resampled_df[name].values
+            if len(y[y != 0]) < 2:
+                params[name] = {"flat": float(y[-1] if len(y) > 0 else 0)}
+                continue
+            model = LinearRegression()
+            model.fit(X, y)
+            params[name] = {"coef": float(model.coef_[0]), "intercept": float(model.intercept_),
+                            "std": float(np.std(y)), "mean": float(np.mean(y)), "length": len(y)}
+            metrics[name] = {"observations": len(y), "mae": float(np.abs(y - model.predict(X)).mean()),
+                             "r_squared": float(model.score(X, y))}
+        return params, metrics
+
+    fitted = models(fit_series) if models else fit_series()[0]
+
+    def get_forecast(series_name, periods=8):
+        p = fitted[series_name]
+        if "flat" in p: return [p["flat"]] * periods, 0
         
         delta = {'D': 1, 'W': 7, 'M': 30, 'Q': 90, '6M': 180, 'Y': 365}[freq]
         last_date = resampled_df['Date'].max()
         future_dates = [last_date + pd.Timedelta(days=delta * (i+1)) for i in range(periods)]
-        future_ordinals = np.array([d.toordinal() for d in future_dates]).reshape(-1, 1)
+
+        if p.get("mode") == "holt-winters":
+            preds = forecast_holt_winters([p["level"]], [p["trend"]], [p["season"]], p["periods"], periods)[0]
+            # Trend is per period; the insight below expects per day like the regression slope
+            return [{"date": d.strftime('%Y-%m-%d'), "value": max(0, float(v))} for d, v in zip(future_dates, preds)], p["trend"] / delta
+
+        future_ordinals = np.array([d.toordinal() for d in future_dates])
         
-        preds = model.predict(future_ordinals)
+        preds = p["intercept"] + p["coef"] * future_ordinals
         
         period = {'W': 4, 'D': 30, 'M': 6, 'Q': 4, '6M': 2, 'Y': 1}.get(freq, 4)
-        amplitude = np.std(y) * 0.2 if len(y) > 0 and np.std(y) > 0 else (np.mean(y) * 0.1 if len(y) > 0 else 100)
+        amplitude = p["std"] * 0.2 if p["std"] > 0 else p["mean"] * 0.1
         
         real_preds = []
         for i, v in enumerate(preds):
-            seasonal = amplitude * np.sin(2 * np.pi * (i + len(y)) / period)
+            seasonal = amplitude * np.sin(2 * np.pi * (i + p["length"]) / period)
             noise = (np.random.random() - 0.5) * amplitude * 0.5
             real_preds.append(max(0, float(v + seasonal + noise)))
 
-        return [{"date": d.strftime('%Y-%m-%d'), "value": v} for d, v in zip(future_dates, real_preds)], model.coef_[0]
+        return [{"date": d.strftime('%Y-%m-%d'), "value": v} for d, v in zip(future_dates, real_preds)], p["coef"]
 
     sales_forecast, sales_slope = get_forecast('Sales')
+    check_deadline("forecasting")
     exp_forecast, _ = get_forecast('Expenses')
+    check_deadline("forecasting")
     profit_forecast, _ = get_forecast('Profit')
 
     # 5. Raw Data for Chart.js
     historical_data = [
         {
             "date": d.strftime('%Y-%m-%d'), 
-            "sales": float(s), 
-            "expenses": float(e),
-            "profit": float(p)
+            "sales": s,
+            "expenses": e,
+            "profit": p
         } 
         for d, s, e, p in zip(resampled_df['Date'], resampled_df['Sales'], resampled_df['Expenses'], resampled_df['Profit'])
     ]
@@ -199,10 +257,10 @@ def run_analysis(file_path, granularity='weekly'):
 
     result = {
         "total_stats": {
-            "sales": float(total_sales),
-            "expenses": float(total_expenses),
-            "profit": float(total_profit),
-            "margin": float(total_profit / total_sales * 100) if total_sales > 0 else 0
+            "sales": total_sales,
+            "expenses": total_expenses,
+            "profit": total_profit,
+            "margin": total_profit / total_sales * 100 if total_sales > 0 else 0
         },
         "historical": historical_data,
         "forecast": {
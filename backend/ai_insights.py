@@ -1,15 +1,24 @@
 from flask import Blueprint, request, jsonify, send_file, current_app
-from models import db, Transaction, InventoryItem, Business 
+from models import db, Transaction, InventoryItem, Business, get_data_version
 from business import get_user_id, get_member_role, role_required
-from sqlalchemy import func
+from admission import admit, heavy_request
+from coalesce import single_flight, request_key
+from result_cache import cached_result
+from snapshots import snapshot_first
+from rollups import build_advanced_analytics
+from trends import sales_forecast
+from model_registry import model_registry
+from deadline import phase, DeadlineExceeded
+from sqlalchemy import func, case, and_
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.linear_model import LinearRegression
 import os
 import io
 import pandas as pd
 from fpdf import FPDF
-from ai_forecaster import run_analysis
+from ai_forecaster import run_analysis, analyze_frame
+from ai_service import TransactionSet
+from holt_winters import mode_error
 
 ai_bp = Blueprint("ai", __name__)
 
@@ -20,6 +29,7 @@ def predict_demand(series):
     """Predicts next 30 days demand using Linear Regression."""
     if len(series) < 2:
         return sum(series) * 1.05 # Fallback to flat growth
+    from sklearn.linear_model import LinearRegression # deferred: keeps sklearn out of app start-up
     
     X = np.array(range(len(series))).reshape(-1, 1)
     y = np.array(series)
@@ -31,6 +41,10 @@ def predict_demand(series):
     prediction = model.predict(np.array([[len(series)]]))
     return max(0, float(prediction[0]))
 
+def _sum_where(column, *conditions):
+    """SUM(CASE WHEN <conditions> THEN column ELSE 0 END), 0 when nothing matches."""
+    return func.coalesce(func.sum(case((and_(*conditions), func.coalesce(column, 0)), else_=0)), 0)
+
 @ai_bp.route("/businesses/<int:business_id>/ai/dashboard", methods=["GET"])
 def get_dashboard_stats(business_id):
     auth = request.headers.get("Authorization")
@@ -43,9 +57,19 @@ def get_dashboard_stats(business_id):
     role = get_member_role(user_id, business_id)
     if not role:
         return jsonify({"error": "Forbidden"}), 403
-
-    granularity = request.args.get("granularity", "monthly") # daily, weekly, monthly, quarterly, halfyearly, yearly, custom
-
+    busy = admit(business_id)
+    if busy is not None: return busy
+
+    params = {
+        "granularity": request.args.get("granularity", "monthly"), # daily, weekly, monthly, quarterly, halfyearly, yearly, custom
+        "custom_start": request.args.get("start_date"),
+        "custom_end": request.args.get("end_date"),
+    }
+    compute = snapshot_first("dashboard", business_id, params, lambda: compute_dashboard_stats(business_id, **params))
+    return jsonify(cached_result("dashboard", business_id, params, compute))
+
+def compute_dashboard_stats(business_id, granularity="monthly", custom_start=None, custom_end=None):
+    """Builds the AI dashboard payload for a business."""
     # Date Filtering
     end_date = datetime.utcnow()
     if granularity == 'daily':
@@ -59,8 +83,6 @@ def get_dashboard_stats(business_id):
     elif granularity == 'yearly':
         start_date = end_date - timedelta(days=365)
     elif granularity == 'custom':
-        custom_start = request.args.get('start_date')
-        custom_end = request.args.get('end_date')
         if custom_start:
             start_date = datetime.strptime(custom_start, '%Y-%m-%d')
         else:
@@ -70,25 +92,34 @@ def get_dashboard_stats(business_id):
     else: # monthly (default)
         start_date = end_date - timedelta(days=30)
 
-    # 1. CORE STATS
-    total_sales = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.business_id == business_id, 
-        Transaction.type == "Sale",
-        Transaction.timestamp >= start_date
-    ).scalar() or 0
-
-    # Total COGS
-    total_cogs = db.session.query(func.sum(Transaction.cogs)).filter(
-        Transaction.business_id == business_id, 
-        Transaction.type == "Sale",
-        Transaction.timestamp >= start_date
-    ).scalar() or 0
+    today = datetime.now()
+    first_of_this_month = today.replace(day=1)
+    last_month_end = first_of_this_month - timedelta(days=1)
+    first_of_last_month = last_month_end.replace(day=1)
 
-    total_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.business_id == business_id, 
-        Transaction.type == "Expense",
-        Transaction.timestamp >= start_date
-    ).scalar() or 0
+    # 1. CORE STATS + 2. RECENT PERFORMANCE
+    # All KPIs come from one conditional-aggregation pass over the rows of
+    # the widest window they need, instead of one SUM() query each.
+    is_sale = Transaction.type == "Sale"
+    is_expense = Transaction.type == "Expense"
+    in_range = Transaction.timestamp >= start_date
+    this_month = Transaction.timestamp >= first_of_this_month
+    last_month = and_(Transaction.timestamp >= first_of_last_month, Transaction.timestamp <= last_month_end)
+
+    (total_sales, total_cogs, total_expenses,
+     recent_sales, recent_expenses,
+     last_month_sales, last_month_expenses) = db.session.query(
+        _sum_where(Transaction.amount, is_sale, in_range),
+        _sum_where(Transaction.cogs, is_sale, in_range),
+        _sum_where(Transaction.amount, is_expense, in_range),
+        _sum_where(Transaction.amount, is_sale, this_month),
+        _sum_where(Transaction.amount, is_expense, this_month),
+        _sum_where(Transaction.amount, is_sale, last_month),
+        _sum_where(Transaction.amount, is_expense, last_month),
+    ).filter(
+        Transaction.business_id == business_id,
+        Transaction.timestamp >= min(start_date, first_of_last_month)
+    ).one()
 
     gross_profit = total_sales - total_cogs
     # Net Profit = Gross - Expenses
@@ -98,64 +129,34 @@ def get_dashboard_stats(business_id):
     # db.session.query(func.sum(Transaction.profit))... should equal net_profit ideally.
     # We stick to calculated for consistency with user code style.
 
-    # 2. RECENT PERFORMANCE
-    today = datetime.now()
-    first_of_this_month = today.replace(day=1)
-    last_month_end = first_of_this_month - timedelta(days=1)
-    first_of_last_month = last_month_end.replace(day=1)
-
-    recent_sales = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.business_id == business_id,
-        Transaction.type == "Sale",
-        Transaction.timestamp >= first_of_this_month
-    ).scalar() or 0
-
-    recent_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.business_id == business_id,
-        Transaction.type == "Expense",
-        Transaction.timestamp >= first_of_this_month
-    ).scalar() or 0
-
-    last_month_sales = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.business_id == business_id,
-        Transaction.type == "Sale",
-        Transaction.timestamp >= first_of_last_month,
-        Transaction.timestamp <= last_month_end
-    ).scalar() or 0
-
-    last_month_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.business_id == business_id,
-        Transaction.type == "Expense",
-        Transaction.timestamp >= first_of_last_month,
-        Transaction.timestamp <= last_month_end
-    ).scalar() or 0
-
     # 3. AI DEMAND FORECASTING (Linear Regression)
-    # Get daily sales for the last 60 days to train the model
-    sixty_days_ago = today - timedelta(days=60)
-    daily_sales = db.session.query(
-        func.date(Transaction.timestamp),
-        func.sum(Transaction.amount)
-    ).filter(
-        Transaction.business_id == business_id,
-        Transaction.type == "Sale",
-        Transaction.timestamp >= sixty_days_ago
-    ).group_by(func.date(Transaction.timestamp)).order_by(func.date(Transaction.timestamp)).all()
-
-    sales_series = [float(s[1]) for s in daily_sales]
-    predicted_monthly_revenue = predict_demand(sales_series) * 30 if sales_series else 0
+    # Next 30 days of the daily sales trend over the last 60 days, fitted from
+    # the running sales sums (see trends.py) instead of scanning transactions
+    predicted_monthly_revenue, sales_history_days = sales_forecast(business_id, 30)
 
     # 4. REORDER RECOMMENDATIONS
     products = Product.query.filter_by(business_id=business_id).all()
     reorder_list = []
+
+    # Units sold per product over the last 28 and 7 days, in one grouped
+    # query; drives reorders, smart alerts and the high-velocity strategy.
+    four_weeks_ago = today - timedelta(days=28)
+    velocity_rows = db.session.query(
+        Transaction.inventory_item_id,
+        _sum_where(Transaction.quantity, Transaction.timestamp >= four_weeks_ago),
+        _sum_where(Transaction.quantity, Transaction.timestamp >= (today - timedelta(days=7)))
+    ).filter(
+        Transaction.business_id == business_id,
+        Transaction.type == "Sale",
+        Transaction.inventory_item_id.isnot(None),
+        Transaction.timestamp >= four_weeks_ago
+    ).group_by(Transaction.inventory_item_id).all()
+    units_28d = {item_id: q28 for item_id, q28, _ in velocity_rows}
+    units_7d = {item_id: q7 for item_id, _, q7 in velocity_rows}
     
     for p in products:
         # Get weekly sales velocity for this product
-        p_sales = db.session.query(func.sum(Transaction.quantity)).filter(
-            Transaction.inventory_item_id == p.id,
-            Transaction.type == "Sale",
-            Transaction.timestamp >= (today - timedelta(days=28))
-        ).scalar() or 0
+        p_sales = units_28d.get(p.id, 0)
         
         # Simple velocity: units per week
         vel = p_sales / 4
@@ -179,11 +180,7 @@ def get_dashboard_stats(business_id):
     
     for p in products:
         # Get sales velocity (units/day)
-        p_sales_28d = db.session.query(func.sum(Transaction.quantity)).filter(
-            Transaction.inventory_item_id == p.id,
-            Transaction.type == "Sale",
-            Transaction.timestamp >= (today - timedelta(days=28))
-        ).scalar() or 0
+        p_sales_28d = units_28d.get(p.id, 0)
         
         velocity = p_sales_28d / 28
         # Using selling_price - cost_price (calculated profit margin)
@@ -238,7 +235,7 @@ def get_dashboard_stats(business_id):
         })
 
     # Strategic Suggestions
-    high_velocity_items = sorted([p for p in products if (db.session.query(func.sum(Transaction.quantity)).filter(Transaction.inventory_item_id == p.id, Transaction.type == "Sale", Transaction.timestamp >= (today - timedelta(days=7))).scalar() or 0) > 10], key=lambda x: x.stock_quantity)
+    high_velocity_items = sorted([p for p in products if units_7d.get(p.id, 0) > 10], key=lambda x: x.stock_quantity)
     if high_velocity_items:
         alerts.append({
             "level": "Strategy",
@@ -290,8 +287,6 @@ def get_dashboard_stats(business_id):
         label_fmt = "%Y"
     elif granularity == "custom":
         # For custom range, divide the range into ~6 equal segments
-        custom_start = request.args.get('start_date')
-        custom_end = request.args.get('end_date')
         c_start = datetime.strptime(custom_start, '%Y-%m-%d') if custom_start else today - timedelta(days=30)
         c_end = datetime.strptime(custom_end, '%Y-%m-%d') if custom_end else today
         total_days = max((c_end - c_start).days, 1)
@@ -303,23 +298,50 @@ def get_dashboard_stats(business_id):
         delta_unit = timedelta(weeks=1)
         label_fmt = "Week %w"
 
-    for i in range(points):
-        end_date = today - (delta_unit * (points - 1 - i))
-        start_date = end_date - delta_unit
-        
-        p_sales = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.business_id == business_id, Transaction.type == "Sale",
-            Transaction.timestamp > start_date, Transaction.timestamp <= end_date
-        ).scalar() or 0
-        
-        p_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.business_id == business_id, Transaction.type == "Expense",
-            Transaction.timestamp > start_date, Transaction.timestamp <= end_date
-        ).scalar() or 0
-        
+    # Period buckets: (end - delta, end] for each of the `points` periods ending today
+    period_ends = [today - (delta_unit * (points - 1 - i)) for i in range(points)]
+    period_bucket = case(*[
+        (and_(Transaction.timestamp > end - delta_unit, Transaction.timestamp <= end), i)
+        for i, end in enumerate(period_ends)
+    ])
+
+    # Monthly trend buckets: [m_start, m_end] for the last 6 months
+    trend_months = []
+    for i in range(5, -1, -1):
+        m_start = (today.replace(day=1) - timedelta(days=i*30)).replace(day=1)
+        m_end = (m_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        trend_months.append((m_start, m_end))
+    month_ranges = sorted(set(trend_months))
+    month_bucket = case(*[
+        (and_(Transaction.timestamp >= m_start, Transaction.timestamp <= m_end), j)
+        for j, (m_start, m_end) in enumerate(month_ranges)
+    ])
+
+    # One GROUP BY over both bucket expressions gives the period series and
+    # the monthly trend; buckets with no rows stay at 0.
+    bucket_rows = db.session.query(
+        period_bucket, month_bucket, Transaction.type, func.sum(Transaction.amount)
+    ).filter(
+        Transaction.business_id == business_id,
+        Transaction.type.in_(["Sale", "Expense"]),
+        Transaction.timestamp > min(period_ends[0] - delta_unit, month_ranges[0][0]),
+        Transaction.timestamp <= max(today, month_ranges[-1][1])
+    ).group_by(period_bucket, month_bucket, Transaction.type).all()
+
+    period_totals = [{"Sale": 0, "Expense": 0} for _ in period_ends]
+    month_totals = {r: {"Sale": 0, "Expense": 0} for r in month_ranges}
+    for p_idx, m_idx, txn_type, amount in bucket_rows:
+        if p_idx is not None:
+            period_totals[p_idx][txn_type] += amount
+        if m_idx is not None:
+            month_totals[month_ranges[m_idx]][txn_type] += amount
+
+    for i, period_end in enumerate(period_ends):
+        p_sales = period_totals[i]["Sale"]
+        p_expenses = period_totals[i]["Expense"]
         expense_series.append(float(p_expenses))
 
-        label = end_date.strftime(label_fmt)
+        label = period_end.strftime(label_fmt)
         if granularity == "weekly":
              label = f"Week {i+1}"
         elif granularity == "quarterly":
@@ -329,9 +351,9 @@ def get_dashboard_stats(business_id):
         
         period_analysis.append({
             "label": label,
-            "revenue": float(p_sales),
-            "expenses": float(p_expenses),
-            "profit": float(p_sales - p_expenses)
+            "revenue": p_sales,
+            "expenses": p_expenses,
+            "profit": p_sales - p_expenses
         })
 
     # 7. EXPENSE BREAKDOWN (Category-wise)
@@ -344,25 +366,10 @@ def get_dashboard_stats(business_id):
     ).group_by(Transaction.category).all()
 
     # 8. MONTHLY PROFIT TREND (Last 6 Months)
-    monthly_profit_trend = []
-    for i in range(5, -1, -1):
-        m_start = (today.replace(day=1) - timedelta(days=i*30)).replace(day=1)
-        m_end = (m_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        m_sales = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.business_id == business_id, Transaction.type == "Sale",
-            Transaction.timestamp >= m_start, Transaction.timestamp <= m_end
-        ).scalar() or 0
-        
-        m_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.business_id == business_id, Transaction.type == "Expense",
-            Transaction.timestamp >= m_start, Transaction.timestamp <= m_end
-        ).scalar() or 0
-        
-        monthly_profit_trend.append({
-            "month": m_start.strftime("%b"),
-            "profit": float(m_sales - m_expenses)
-        })
+    monthly_profit_trend = [{
+        "month": m_start.strftime("%b"),
+        "profit": month_totals[(m_start, m_end)]["Sale"] - month_totals[(m_start, m_end)]["Expense"]
+    } for m_start, m_end in trend_months]
 
     # Expense forecast multiplier based on granularity
     if granularity == "daily":
@@ -380,7 +387,7 @@ def get_dashboard_stats(business_id):
 
     predicted_monthly_expenses = predict_demand(expense_series) * expense_multiplier if expense_series else 0
 
-    return jsonify({
+    return {
         "total_sales": total_sales,
         "total_cogs": total_cogs,
         "gross_profit": gross_profit,
@@ -389,7 +396,7 @@ def get_dashboard_stats(business_id):
         "prediction": {
             "amount": predicted_monthly_revenue,
             "expense_forecast": predicted_monthly_expenses,
-            "confidence": "High (Linear Trend Analysis)" if len(sales_series) > 10 else "Low (Need more data)"
+            "confidence": "High (Linear Trend Analysis)" if sales_history_days > 10 else "Low (Need more data)"
         },
         "reorder_recommendations": sorted(reorder_list, key=lambda x: x['priority'] == 'High', reverse=True)[:5],
         "alerts": alerts,
@@ -402,11 +409,11 @@ def get_dashboard_stats(business_id):
             }
         },
         "weekly_analysis": period_analysis,
-        "expense_breakdown": [{"category": c, "amount": float(a)} for c, a in expense_breakdown],
+        "expense_breakdown": [{"category": c, "amount": a} for c, a in expense_breakdown],
         "monthly_profit_trend": monthly_profit_trend,
         "product_performance": {
             "top_profitable": [
-                {"name": n, "total_profit": float(tp)}
+                {"name": n, "total_profit": tp}
                 for n, tp in db.session.query(
                     Product.name,
                     func.sum(Transaction.profit)
@@ -432,7 +439,7 @@ def get_dashboard_stats(business_id):
                 ).all()
             ]
         }
-    })
+    }
 
 @ai_bp.route("/businesses/<int:business_id>/ai/csv-analysis", methods=["GET"])
 def get_csv_analysis(business_id):
@@ -444,8 +451,13 @@ def get_csv_analysis(business_id):
     role = get_member_role(user_id, business_id)
     if not role or role not in ['Owner', 'Accountant', 'Analyst']:
         return jsonify({"error": "Forbidden"}), 403
+    busy = admit(business_id)
+    if busy is not None: return busy
 
     granularity = request.args.get("granularity", "weekly")
+    mode = request.args.get("mode", "linear") # linear or holt-winters
+    if mode_error(mode):
+        return jsonify({"error": mode_error(mode)}), 400
     start_date = request.args.get("startDate", None)
     end_date = request.args.get("endDate", None)
     
@@ -457,18 +469,23 @@ def get_csv_analysis(business_id):
     
     if not os.path.exists(file_path):
         return jsonify({"error": "No CSV file uploaded yet"}), 404
-    
-    result = run_analysis(file_path, granularity=granularity)
-    
-    # Read original filename from meta file
-    meta_path = os.path.join(backend_dir, f"sales_data_{business_id}.meta")
-    original_name = None
-    if os.path.exists(meta_path):
-        with open(meta_path, 'r') as mf:
-            original_name = mf.read().strip()
-    result['filename'] = original_name or f"sales_data_{business_id}.csv"
-    
-    return jsonify(result)
+
+    def compute():
+        with phase("analysis"):
+            result = run_analysis(file_path, granularity=granularity, mode=mode)
+
+        # Read original filename from meta file
+        meta_path = os.path.join(backend_dir, f"sales_data_{business_id}.meta")
+        original_name = None
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as mf:
+                original_name = mf.read().strip()
+        result['filename'] = original_name or f"sales_data_{business_id}.csv"
+        return result
+
+    # The uploaded file, not the DB, is the data here: its mtime is the version.
+    key = request_key("csv-analysis", business_id, {"granularity": granularity, "mode": mode}, os.path.getmtime(file_path))
+    return jsonify(single_flight.do(key, compute))
 
 
 @ai_bp.route("/businesses/<int:business_id>/ai/transaction-analysis", methods=["GET"])
@@ -481,11 +498,26 @@ def get_transaction_analysis(business_id):
     role = get_member_role(user_id, business_id)
     if not role or role not in ['Owner', 'Accountant', 'Analyst']:
         return jsonify({"error": "Forbidden"}), 403
+    busy = admit(business_id)
+    if busy is not None: return busy
+
+    params = {
+        "granularity": request.args.get("granularity", "weekly"),
+        "start_date": request.args.get("startDate", None),
+        "end_date": request.args.get("endDate", None),
+        "mode": request.args.get("mode", "linear"), # linear or holt-winters
+    }
+    if mode_error(params["mode"]):
+        return jsonify({"error": mode_error(params["mode"])}), 400
+    result = cached_result("transaction-analysis", business_id, params,
+                           lambda: compute_transaction_analysis(business_id, **params))
+    if result is None:
+        return jsonify({"error": "No transactions found"}), 404
+    return jsonify(result)
 
-    granularity = request.args.get("granularity", "weekly")
-    start_date = request.args.get("startDate", None)
-    end_date = request.args.get("endDate", None)
-
+def compute_transaction_analysis(business_id, granularity="weekly", start_date=None, end_date=None, mode="linear"):
+    """Runs the forecaster over the business's own transactions. Returns None if there are none."""
+    version = get_data_version(business_id) # before loading, see ModelRegistry.fitted
     # Fetch all transactions from the database
     query = Transaction.query.filter_by(business_id=business_id)
 
@@ -500,31 +532,43 @@ def get_transaction_analysis(business_id):
         except ValueError:
             pass
 
-    txns = query.order_by(Transaction.timestamp).all()
+    with phase("load_transactions"):
+        txns = query.order_by(Transaction.timestamp).all()
 
     if not txns:
-        return jsonify({"error": "No transactions found"}), 404
-
-    # Build a temporary CSV in memory from transactions
-    import tempfile, csv
-    tmp = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, newline='', encoding='utf-8')
-    writer = csv.writer(tmp)
-    writer.writerow(['Date', 'Type', 'Category', 'Amount'])
-    for t in txns:
-        writer.writerow([t.timestamp.strftime('%Y-%m-%d'), t.type, t.category or 'Others', t.amount])
-    tmp.close()
+        return None
+
+    with phase("analysis"):
+        return analyze_transactions(txns, granularity, analysis_models(business_id, version, granularity, start_date, end_date, mode), mode)
+
+def analysis_models(business_id, version, granularity, start_date=None, end_date=None, mode="linear"):
+    """Hook for analyze_frame that keeps its fitted series in the model registry."""
+    series = "analysis" if mode == "linear" else f"analysis:{mode}"
+    scope = f"{start_date or ''}..{end_date or ''}"
+    return lambda fit: model_registry.fitted(business_id, series, granularity, version, fit, scope)
+
+def analyze_transactions(txns, granularity="weekly", models=None, mode="linear"):
+    """Feeds Transaction rows, or a TransactionSet, to the forecaster (same columns as a CSV upload)."""
+    if isinstance(txns, TransactionSet):
+        frame = txns.frame
+        df = pd.DataFrame({
+            'Date': frame['date'],
+            'Type': frame['type'].astype(object),
+            'Category': frame['category'].astype(object).fillna('Others'),
+            'Amount': frame['amount'],
+        })
+    else:
+        df = pd.DataFrame({
+            'Date': [t.timestamp.date() for t in txns],
+            'Type': [t.type for t in txns],
+            'Category': [t.category or 'Others' for t in txns],
+            'Amount': [t.amount for t in txns],
+        })
 
-    result = run_analysis(tmp.name, granularity=granularity)
+    result = analyze_frame(df, granularity=granularity, models=models, mode=mode)
     result['source'] = 'transactions'
     result['record_count'] = len(txns)
-
-    # Clean up temp file
-    try:
-        os.unlink(tmp.name)
-    except:
-        pass
-
-    return jsonify(result)
+    return result
 
 @ai_bp.route("/businesses/<int:business_id>/ai/export-data", methods=["GET"])
 def export_ai_data(business_id):
@@ -536,6 +580,8 @@ def export_ai_data(business_id):
     role = get_member_role(user_id, business_id)
     if not role or role not in ['Owner', 'Accountant', 'Analyst']:
         return jsonify({"error": "Forbidden"}), 403
+    busy = admit(business_id)
+    if busy is not None: return busy
 
     results = db.session.query(
         Transaction.timestamp, Transaction.category, Product.name,
@@ -545,14 +591,14 @@ def export_ai_data(business_id):
     ).order_by(Transaction.timestamp.asc()).all()
 
     data = [{
-        "date": r[0].strftime("%Y-%m-%d"), 
+        "date": r[0].date(),
         "category": r[1], 
         "product": r[2],
         "quantity": r[3], 
         "total_revenue": r[4], 
         "total_cogs": r[5],
         "unit_cogs": r[5]/r[3] if r[3] > 0 else 0,
-        "total_profit": float(r[4] - r[5])
+        "total_profit": r[4] - r[5]
     } for r in results]
 
     return jsonify(data)
@@ -566,6 +612,8 @@ def export_report_excel(business_id):
     user_id = get_user_id(token)
     role = get_member_role(user_id, business_id)
     if not role: return jsonify({"error": "Forbidden"}), 403
+    busy = admit(business_id)
+    if busy is not None: return busy
 
     # Fetch Data
     sales_tx = Transaction.query.filter_by(business_id=business_id, type='Sale').all()
@@ -637,6 +685,8 @@ def export_report_pdf(business_id):
         user_id = get_user_id(token)
         role = get_member_role(user_id, business_id)
         if not role: return jsonify({"error": "Forbidden"}), 403
+        busy = admit(business_id)
+        if busy is not None: return busy
 
         business = Business.query.get(business_id)
         if not business: return jsonify({"error": "Business not found"}), 404
@@ -717,6 +767,8 @@ def export_report_pdf(business_id):
             as_attachment=True,
             download_name=f"Business_Performance_{datetime.now().strftime('%Y%m%d')}.pdf"
         )
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ PDF EXPORT ERROR: {str(e)}")
         import traceback
@@ -725,60 +777,17 @@ def export_report_pdf(business_id):
 
 @ai_bp.route("/businesses/<int:business_id>/ai/advanced-analytics", methods=["GET"])
 @role_required(['Owner', 'Accountant', 'Analyst'])
+@heavy_request
 def get_advanced_analytics(business_id):
-    # Fetch Daily Trends (Last 30 Days)
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=30)
-    
-    daily_txns = db.session.query(
-        func.date(Transaction.timestamp).label('date'),
-        Transaction.type,
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.business_id == business_id,
-        Transaction.timestamp >= start_date,
-        Transaction.timestamp <= end_date
-    ).group_by(
-        func.date(Transaction.timestamp), 
-        Transaction.type
-    ).all()
-    
-    daily_data = {}
-    for date_str, txn_type, amount in daily_txns:
-        if date_str not in daily_data:
-            daily_data[date_str] = {"date": date_str, "sales": 0, "expenses": 0}
-        
-        if txn_type == 'Sale':
-            daily_data[date_str]["sales"] = float(amount)
-        else:
-            daily_data[date_str]["expenses"] = float(amount)
-            
-    sorted_daily = sorted(daily_data.values(), key=lambda x: x['date'])
-    
-    # Category Breakdown
-    cat_txns = db.session.query(
-        Transaction.category,
-        Transaction.type,
-        func.sum(Transaction.amount)
-    ).filter(
-        Transaction.business_id == business_id
-    ).group_by(
-        Transaction.category,
-        Transaction.type
-    ).all()
-    
-    sales_by_cat = []
-    expenses_by_cat = []
-    
-    for cat, txn_type, amount in cat_txns:
-        entry = {"name": cat, "value": float(amount)}
-        if txn_type == 'Sale':
-            sales_by_cat.append(entry)
-        else:
-            expenses_by_cat.append(entry)
-            
-    return jsonify({
-        "daily_trends": sorted_daily,
-        "sales_by_category": sorted(sales_by_cat, key=lambda x: x['value'], reverse=True),
-        "expenses_by_category": sorted(expenses_by_cat, key=lambda x: x['value'], reverse=True)
-    }), 200
+    # ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD&granularity=daily|weekly|monthly
+    # (default: daily trend for the last 30 days, all-time category breakdown)
+    params = {
+        "start_date": request.args.get("start_date"),
+        "end_date": request.args.get("end_date"),
+        "granularity": request.args.get("granularity", "daily"),
+    }
+    try:
+        return jsonify(cached_result("advanced-analytics", business_id, params,
+                                     lambda: build_advanced_analytics(business_id, **params))), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
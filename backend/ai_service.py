@@ -1,42 +1,427 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
 from datetime import datetime, timedelta
+from functools import cached_property
+import hashlib
 import json
+import os
+import pickle
+import tempfile
+import threading
+from deadline import check_deadline, phase
+from holt_winters import FORECAST_MODES, mode_error, fit_holt_winters, forecast_holt_winters
 
 # Pre-defined categories for classification
 EXPENSE_CATEGORIES = ["Rent", "Utilities", "Inventory", "Salaries", "Marketing", "Others"]
 
+# Basic training data for bootstrap
+EXPENSE_TRAINING_DATA = [
+    ("Monthly store rent payment", "Rent"),
+    ("Electricity bill for January", "Utilities"),
+    ("Water and sewage bill", "Utilities"),
+    ("Bulk purchase of groceries", "Inventory"),
+    ("Buying milk and bread for stock", "Inventory"),
+    ("Salary payment for staff", "Salaries"),
+    ("Employee monthly wages", "Salaries"),
+    ("Google Ads campaign", "Marketing"),
+    ("Facebook promotion", "Marketing"),
+    ("Office supplies and stationery", "Others"),
+    ("Cleaning services", "Others")
+]
+
+# Trained classifier pipeline, written on first use and loaded by every later process
+CLASSIFIER_PATH = os.environ.get('EXPENSE_CLASSIFIER_PATH', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'expense_classifier.pkl'))
+
+class TransactionSet:
+    """
+    A transaction list materialized once as typed columns.
+    Derived groupings are memoized, so one set can be passed through several
+    BulkBinsAIService methods without rebuilding DataFrames from the dicts.
+    """
+    def __init__(self, transactions=()):
+        rows = list(transactions)
+        self.frame = pd.DataFrame({
+            'date': pd.to_datetime([t['timestamp'] for t in rows], format='ISO8601').normalize(),
+            'type': pd.Series([t.get('type') for t in rows], dtype=object),
+            'amount': pd.Series([t.get('amount', 0) for t in rows], dtype=float),
+            # Signed profit used by predict_profit: stored profit, else +/- amount
+            'pnl': pd.Series([
+                t['profit'] if 'profit' in t else (t.get('amount', 0) if t.get('type') == 'Sale' else -t.get('amount', 0))
+                for t in rows], dtype=float),
+            'profit': pd.Series([t.get('profit', 0) or 0 for t in rows], dtype=float),
+            'quantity': pd.Series([t.get('quantity', 1) for t in rows], dtype=float),
+            'inventory_item_id': pd.array([t.get('inventory_item_id') for t in rows], dtype='Int64'),
+            'category': pd.Series([t.get('category', 'Others') for t in rows], dtype=object),
+        })
+
+    # Columns from_frame/from_query understand; only timestamp (or date) is required
+    COLUMNS = ('timestamp', 'type', 'amount', 'profit', 'quantity', 'inventory_item_id', 'category')
+
+    @classmethod
+    def of(cls, transactions):
+        return transactions if isinstance(transactions, cls) else cls(transactions or [])
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Builds a set from a DataFrame of transaction columns (see COLUMNS)
+        with whole-column conversions. Missing columns get the same defaults
+        as missing dict keys.
+        """
+        n = len(frame)
+        def column(name, default):
+            return frame[name] if name in frame else pd.Series([default] * n, index=frame.index, dtype=object)
+
+        txn_type = column('type', None).astype('category')
+        amount = column('amount', 0).astype(float)
+        if 'profit' in frame:
+            pnl = frame['profit'].astype(float)
+        else:
+            pnl = amount.where(txn_type == 'Sale', -amount)
+
+        self = cls.__new__(cls)
+        self.frame = pd.DataFrame({
+            'date': pd.to_datetime(frame['date'] if 'date' in frame else frame['timestamp']).dt.normalize(),
+            'type': txn_type,
+            'amount': amount,
+            'pnl': pnl,
+            'profit': column('profit', 0).astype(float).fillna(0),
+            'quantity': column('quantity', 1).astype(float),
+            'inventory_item_id': column('inventory_item_id', None).astype('Int64'),
+            'category': column('category', 'Others').astype('category'),
+        }).reset_index(drop=True)
+        return self
+
+    @classmethod
+    def from_query(cls, query):
+        """
+        Runs a projected SQLAlchemy query, e.g.
+        db.session.query(Transaction.timestamp, Transaction.amount, ...),
+        straight into columns: no ORM objects, dicts or ISO strings in between.
+        Columns are matched by label, so use the names in COLUMNS.
+        """
+        result = query.session.execute(query.statement)
+        columns = list(result.keys())
+        rows = result.all()
+        return cls.from_frame(pd.DataFrame({
+            name: pd.Series(values) for name, values in zip(columns, zip(*rows) if rows else [()] * len(columns))
+        }))
+
+    @classmethod
+    def from_rows(cls, transactions):
+        """
+        Builds a set from Transaction objects a caller already loaded (e.g. to
+        render them too), reading the same COLUMNS as from_query.
+        """
+        return cls.from_frame(pd.DataFrame({
+            name: pd.Series([getattr(t, name) for t in transactions]) for name in cls.COLUMNS
+        }))
+
+    def __len__(self):
+        return len(self.frame)
+
+    @cached_property
+    def sales(self):
+        return self.frame[self.frame['type'] == 'Sale']
+
+    @cached_property
+    def expenses(self):
+        return self.frame[self.frame['type'] == 'Expense']
+
+    @cached_property
+    def daily_pnl(self):
+        """date -> summed signed profit."""
+        return self.frame.groupby('date')['pnl'].sum().reset_index().rename(columns={'pnl': 'amount'})
+
+    @cached_property
+    def daily_expense(self):
+        """date -> summed expense amount (case-insensitive type match)."""
+        exp = self.frame[self.frame['type'].str.lower() == 'expense']
+        return exp.groupby('date')['amount'].sum().reset_index().rename(columns={'amount': 'val'})
+
+    @cached_property
+    def demand_forecasts(self):
+        """item id -> 7/30-day demand forecast, for every item sold (see forecast_item_demand)."""
+        return forecast_item_demand(self.sales)
+
+    def fit_demand(self, mode="linear"):
+        """(params, metrics) of the demand model over these sales, for the model registry."""
+        return fit_item_demand(self.sales, mode=mode)
+
+    @cached_property
+    def item_totals(self):
+        """Per item profit / quantity / amount over all sales."""
+        s = self.sales
+        return pd.DataFrame({
+            'inventory_item_id': s['inventory_item_id'],
+            'profit': s['profit'],
+            'quantity': s['quantity'].fillna(0),
+            'amount': s['amount'].fillna(0)
+        }).groupby('inventory_item_id').agg({
+            'profit': 'sum',
+            'quantity': 'sum',
+            'amount': 'sum'
+        }).reset_index()
+
+NO_DEMAND = {"7_day": 0, "30_day": 0, "velocity": 0, "predicted_demand": 0}
+
+
+def fit_item_demand(sales, history_days=180, seasonal_prior=2.0, mode="linear"):
+    """
+    Fits the daily demand model of every item at once.
+
+    Builds an items x days matrix of units sold where each row covers that
+    item's own last `history_days` days up to its last sale, as the
+    per-item forecast did, so an item that stopped selling a while ago is
+    still forecast from its history. In "linear" mode it fits each item's
+    linear trend from its first sale in the window onward (closed-form least
+    squares on all rows together) and per-item day-of-week factors, shrunk
+    towards 1 by `seasonal_prior` pseudo-weeks so that a few sales don't
+    make a weekday. In "holt-winters" mode it runs additive Holt-Winters
+    with weekly seasonality over the same rows (see holt_winters.py).
+    Returns (params, metrics): params is a JSON-ready dict that
+    predict_item_demand turns into forecasts, metrics holds the in-sample
+    error per item-day. Params are empty without item sales.
+    """
+    if mode not in FORECAST_MODES:
+        raise ValueError(mode_error(mode))
+    sales = sales[sales['inventory_item_id'].notna()]
+    if sales.empty:
+        return {}, {"observations": 0}
+
+    # Velocity: average units per active day, over all history
+    per_day = sales.groupby(['inventory_item_id', 'date'])['quantity'].sum()
+    velocity = per_day.groupby(level=0).mean()
+
+    codes, item_ids = pd.factorize(sales['inventory_item_id'])
+    n_items = len(item_ids)
+    origin = sales['date'].min()
+    day_num = (sales['date'] - origin).dt.days.to_numpy()
+    item_first = np.full(n_items, day_num.max())
+    item_last = np.zeros(n_items, dtype=int)
+    np.minimum.at(item_first, codes, day_num)
+    np.maximum.at(item_last, codes, day_num)
+
+    # Row i covers days item_last[i] - days + 1 .. item_last[i]; column
+    # `days` is the day after the item's last sale for every row
+    days = int(min(history_days, (item_last - item_first).max() + 1))
+    day_idx = day_num - (item_last[codes] - days + 1)
+    in_window = day_idx >= 0
+    codes, day_idx = codes[in_window], day_idx[in_window]
+
+    # Units sold per item per day, in one pass
+    Y = np.bincount(codes * days + day_idx, weights=sales['quantity'].fillna(0).to_numpy(dtype=float)[in_window],
+                    minlength=n_items * days).reshape(n_items, days)
+
+    # Each item's series starts at its first sale in its window
+    first = np.full(n_items, days)
+    np.minimum.at(first, codes, day_idx)
+    ends = [(origin + pd.Timedelta(days=int(d))).strftime('%Y-%m-%d') for d in item_last]
+
+    if mode == "holt-winters":
+        hw = fit_holt_winters(Y, 7, first)
+        params = {
+            "mode": mode,
+            "ends": ends,
+            "days": days,
+            "items": [int(i) for i in item_ids],
+            "level": hw["level"].tolist(),
+            "trend": hw["trend"].tolist(),
+            "season": hw["season"].tolist(),
+            "velocity": [float(velocity.get(i, 0)) for i in item_ids],
+        }
+        return params, {"observations": int(hw["observations"].sum()), "rmse": float(hw["rmse"].mean())}
+
+    x = np.arange(days, dtype=float)
+    W = (x[None, :] >= first[:, None]).astype(float)
+    n = W.sum(axis=1)
+
+    # Trend: weighted least squares slope/intercept for every row
+    x_mean = (W @ x) / n
+    y_mean = (W * Y).sum(axis=1) / n
+    dx = (x[None, :] - x_mean[:, None]) * W
+    sxx = (dx ** 2).sum(axis=1)
+    slope = np.divide((dx * (Y - y_mean[:, None])).sum(axis=1), sxx, out=np.zeros(n_items), where=sxx > 0)
+    intercept = y_mean - slope * x_mean
+
+    # Weekday seasonality: each day of the week's mean relative to the item's
+    # mean, indexed by column % 7 (the same weekday within a row)
+    weekday_of_day = np.arange(days) % 7
+    onehot = (weekday_of_day[:, None] == np.arange(7)[None, :]).astype(float)
+    wd_sum = (W * Y) @ onehot
+    wd_count = W @ onehot
+    prior = seasonal_prior * y_mean[:, None]
+    factors = np.divide(wd_sum + prior, (wd_count + seasonal_prior) * y_mean[:, None],
+                        out=np.ones((n_items, 7)), where=y_mean[:, None] > 0)
+    factors /= factors.mean(axis=1, keepdims=True)
+
+    fitted = np.maximum(intercept[:, None] + slope[:, None] * x[None, :], 0) * factors[:, weekday_of_day]
+    params = {
+        "ends": ends,
+        "days": days,
+        "items": [int(i) for i in item_ids],
+        "intercept": intercept.tolist(),
+        "slope": slope.tolist(),
+        "factors": factors.tolist(),
+        "velocity": [float(velocity.get(i, 0)) for i in item_ids],
+    }
+    metrics = {"observations": int(W.sum()), "mae": float((np.abs(Y - fitted) * W).sum() / W.sum())}
+    return params, metrics
+
+
+def predict_item_demand(params, horizon=30):
+    """
+    Item id -> {"7_day", "30_day", "velocity", "predicted_demand"} for the
+    `horizon` days after each item's last sale a fit_item_demand model saw.
+    """
+    if not params:
+        return {}
+    days = params["days"]
+    if params.get("mode") == "holt-winters":
+        forecast = np.maximum(forecast_holt_winters(
+            params["level"], params["trend"], np.asarray(params["season"]).reshape(-1, 7), days, horizon), 0)
+    else:
+        intercept = np.asarray(params["intercept"])
+        slope = np.asarray(params["slope"])
+        factors = np.asarray(params["factors"]).reshape(-1, 7)
+
+        future = np.arange(days, days + horizon, dtype=float)
+        future_weekdays = (days + np.arange(horizon)) % 7
+        forecast = np.maximum(intercept[:, None] + slope[:, None] * future[None, :], 0) * factors[:, future_weekdays]
+    pred_7 = forecast[:, :7].sum(axis=1)
+    pred_30 = forecast.sum(axis=1) * (30 / horizon)
+
+    forecasts = {}
+    for i, item_id in enumerate(params["items"]):
+        final_30 = round(float(pred_30[i]), 2)
+        forecasts[item_id] = {
+            "7_day": round(float(pred_7[i]), 2),
+            "30_day": final_30,
+            "velocity": round(params["velocity"][i], 2),
+            "predicted_demand": final_30
+        }
+    return forecasts
+
+
+def forecast_item_demand(sales, horizon=30, history_days=180, seasonal_prior=2.0, mode="linear"):
+    """Fits and predicts every item's demand in one go (see fit_item_demand)."""
+    return predict_item_demand(fit_item_demand(sales, history_days, seasonal_prior, mode)[0], horizon)
+
+
+def _sales_expenses_by(frame, key):
+    """Sale and Expense totals per `key` value: one group-by, pivoted to two columns."""
+    table = frame['amount'].groupby([key, frame['type'].astype(object)]).sum().unstack(fill_value=0)
+    return table.reindex(columns=['Sale', 'Expense'], fill_value=0).sort_index()
+
+
+def summarize_periods(frame, now=None):
+    """
+    The dashboard's time-series sections from a TransactionSet frame:
+    (weekly_analysis for the last 8 weeks, expense_breakdown,
+    monthly_profit_trend for the last 6 months, this_month, last_month).
+    Each series is one group-by pivoted by type; no per-row Python.
+    """
+    now = now or datetime.now()
+
+    # Weeks start on Monday, as Period('W') does; dates are already midnight
+    week_start = frame['date'] - pd.to_timedelta(frame['date'].dt.dayofweek, unit='D')
+    weekly = _sales_expenses_by(frame, week_start).tail(8)
+    weekly_analysis = [{
+        "label": w.strftime('%d %b'),
+        "revenue": float(sales),
+        "expenses": float(exp),
+        "profit": float(sales - exp)
+    } for w, sales, exp in zip(weekly.index, weekly['Sale'], weekly['Expense'])]
+
+    expenses = frame[frame['type'] == 'Expense']
+    by_category = expenses.groupby('category', observed=True)['amount'].sum()
+    expense_breakdown = [{"category": c, "amount": float(a)} for c, a in by_category.items()]
+
+    monthly = _sales_expenses_by(frame, frame['date'].dt.to_period('M'))
+    recent = monthly.tail(6)
+    monthly_profit_trend = [{
+        "month": m.strftime('%b'),
+        "profit": float(sales - exp)
+    } for m, sales, exp in zip(recent.index, recent['Sale'], recent['Expense'])]
+
+    def month_totals(period):
+        if period not in monthly.index:
+            return {"sales": 0, "expenses": 0, "profit": 0}
+        sales, exp = float(monthly.at[period, 'Sale']), float(monthly.at[period, 'Expense'])
+        return {"sales": sales, "expenses": exp, "profit": sales - exp}
+
+    this_month = pd.Period(now, freq='M')
+    return weekly_analysis, expense_breakdown, monthly_profit_trend, month_totals(this_month), month_totals(this_month - 1)
+
+
+def train_expense_classifier():
+    """Fits the TF-IDF + LogisticRegression pipeline on EXPENSE_TRAINING_DATA."""
+    # sklearn is only imported when a pipeline is actually needed
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    X, y = zip(*EXPENSE_TRAINING_DATA)
+    
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer()),
+        ('clf', LogisticRegression())
+    ])
+    
+    pipeline.fit(X, y)
+    return pipeline
+
+
+def _training_fingerprint():
+    """Identifies what an artifact was trained on and with: the data and the sklearn version."""
+    import sklearn
+    data = json.dumps(EXPENSE_TRAINING_DATA).encode()
+    return f"{sklearn.__version__}:{hashlib.sha256(data).hexdigest()}"
+
+
+def load_expense_classifier(path=None):
+    """
+    The persisted classifier pipeline (default: CLASSIFIER_PATH). If the
+    artifact is missing, unreadable or was trained on other data or another
+    sklearn version, trains a new one and saves it (atomically, so
+    concurrent workers never read half a file).
+    """
+    path = path or CLASSIFIER_PATH
+    fingerprint = _training_fingerprint()
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+        if artifact.get('fingerprint') == fingerprint:
+            return artifact['pipeline']
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        pass
+
+    pipeline = train_expense_classifier()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'fingerprint': fingerprint, 'pipeline': pipeline}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass # read-only deploy: keep the in-memory pipeline
+    return pipeline
+
+
 class BulkBinsAIService:
     def __init__(self):
-        self.classifier = self._initialize_classifier()
-
-    def _initialize_classifier(self):
-        # Basic training data for bootstrap
-        data = [
-            ("Monthly store rent payment", "Rent"),
-            ("Electricity bill for January", "Utilities"),
-            ("Water and sewage bill", "Utilities"),
-            ("Bulk purchase of groceries", "Inventory"),
-            ("Buying milk and bread for stock", "Inventory"),
-            ("Salary payment for staff", "Salaries"),
-            ("Employee monthly wages", "Salaries"),
-            ("Google Ads campaign", "Marketing"),
-            ("Facebook promotion", "Marketing"),
-            ("Office supplies and stationery", "Others"),
-            ("Cleaning services", "Others")
-        ]
-        X, y = zip(*data)
-        
-        pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer()),
-            ('clf', LogisticRegression())
-        ])
-        
-        pipeline.fit(X, y)
-        return pipeline
+        # Loaded on the first classify_expense call, not at import
+        self._classifier = None
+        self._classifier_lock = threading.Lock()
+
+    @property
+    def classifier(self):
+        if self._classifier is None:
+            with self._classifier_lock:
+                if self._classifier is None:
+                    self._classifier = load_expense_classifier()
+        return self._classifier
 
     def classify_expense(self, description):
         if not description:
@@ -52,27 +437,16 @@ class BulkBinsAIService:
     def predict_profit(self, transactions):
         """
         Simple linear prediction based on daily profit history.
-        Expects a list of transaction objects/dicts.
+        Expects a list of transaction dicts or a TransactionSet.
         """
-        if not transactions:
+        txns = TransactionSet.of(transactions)
+        if not len(txns):
             return {"7_day": 0, "30_day": 0, "confidence": "Low", "amount": 0, "expense_forecast": 0}
 
-        df = pd.DataFrame([{
-            'date': datetime.fromisoformat(t['timestamp']).date(),
-            'amount': t.get('profit', t.get('amount', 0) if t.get('type') == 'Sale' else -t.get('amount', 0)),
-            'type': t.get('type', 'Sale'),
-            'val': t.get('amount', 0)
-        } for t in transactions])
-
-        if df.empty:
-             return {"7_day": 0, "30_day": 0, "confidence": "Low", "amount": 0, "expense_forecast": 0}
-
-        # Normalize types for robust filtering
-        df['type_lower'] = df['type'].str.lower()
-        daily_profit = df.groupby('date')['amount'].sum().reset_index()
+        daily_profit = txns.daily_pnl.copy()
         
         # Expense Forecast (Case-insensitive)
-        daily_expense = df[df['type_lower'] == 'expense'].groupby('date')['val'].sum().reset_index()
+        daily_expense = txns.daily_expense
         avg_expense = daily_expense['val'].mean() if not daily_expense.empty else 0
         expense_forecast = avg_expense * 30
 
@@ -112,72 +486,49 @@ class BulkBinsAIService:
             "expense_forecast": round(expense_forecast, 2)
         }
 
-    def get_demand_forecast(self, item_id, transactions):
+    def get_demand_forecast(self, item_id, transactions, demand_model=None):
         """
-        Predict next 7 and 30 day quantity demand for a specific item.
-        Includes a simple seasonality heuristic (weekend vs weekday).
+        Predict next 7 and 30 day quantity demand for a specific item,
+        with its trend and weekday seasonality (see forecast_item_demand),
+        or from demand_model (e.g. trends.item_demand_model) if given.
         """
-        if not transactions:
-            return {"7_day": 0, "30_day": 0, "velocity": 0, "predicted_demand": 0}
-
-        # Filter sales for this item
-        item_sales = [t for t in transactions if t.get('inventory_item_id') == item_id and t.get('type') == 'Sale']
-        if not item_sales:
-            return {"7_day": 0, "30_day": 0, "velocity": 0, "predicted_demand": 0}
+        if demand_model is not None:
+            return predict_item_demand(demand_model).get(item_id, dict(NO_DEMAND))
+        return TransactionSet.of(transactions).demand_forecasts.get(item_id, dict(NO_DEMAND))
 
-        df = pd.DataFrame([{
-            'date': datetime.fromisoformat(t['timestamp']).date(),
-            'weekday': datetime.fromisoformat(t['timestamp']).weekday(), # 0-6
-            'quantity': t.get('quantity', 1)
-        } for t in item_sales])
-
-        daily_qty = df.groupby(['date', 'weekday'])['quantity'].sum().reset_index()
-        
-        # Velocity calculation (avg daily sales over last 30 active days)
-        velocity = daily_qty['quantity'].mean()
-        
-        if len(daily_qty) < 2:
-            val = round(velocity * 30, 2)
-            return {"7_day": round(velocity * 7, 2), "30_day": val, "velocity": round(velocity, 2), "predicted_demand": val}
-
-        # Simple Trend/Linear Fit
-        daily_qty['day_num'] = (pd.to_datetime(daily_qty['date']) - pd.to_datetime(daily_qty['date'].min())).dt.days
-        z = np.polyfit(daily_qty['day_num'], daily_qty['quantity'], 1)
-        p = np.poly1d(z)
-
-        last_day = daily_qty['day_num'].max()
-        pred_7 = sum(p(last_day + i) for i in range(1, 8))
-        pred_30 = sum(p(last_day + i) for i in range(1, 31))
-
-        # Adjust for weekend seasonality (if weekends usually have 30% more volume)
-        weekend_mult = 1.3
-        predicted_days = [datetime.now().date() + timedelta(days=i) for i in range(1, 31)]
-        pred_30_seasonal = 0
-        for i, dt in enumerate(predicted_days):
-            day_val = p(last_day + i + 1)
-            if dt.weekday() >= 5: # Sat/Sun
-                day_val *= weekend_mult
-            pred_30_seasonal += max(0, day_val)
-            
-        final_30 = max(0, round(pred_30_seasonal, 2))
-
-        return {
-            "7_day": max(0, round(pred_7, 2)),
-            "30_day": final_30,
-            "velocity": round(velocity, 2),
-            "predicted_demand": final_30
-        }
-
-    def recommend_reorders(self, inventory_items, transactions):
+    def forecast_demand(self, transactions, item_ids=None, demand_model=None, mode="linear"):
+        """
+        7 and 30 day demand for many items in one batch: item id -> forecast.
+        Items without sales get zeros; item_ids=None returns every item sold.
+        mode is "linear" (trend x weekday factors) or "holt-winters". A
+        demand_model (fit_item_demand-shaped params, e.g. from the model
+        registry or trends.item_demand_model) is used instead of fitting the
+        transactions again.
+        """
+        if demand_model is not None:
+            forecasts = predict_item_demand(demand_model)
+        elif mode == "linear":
+            forecasts = TransactionSet.of(transactions).demand_forecasts
+        else:
+            forecasts = forecast_item_demand(TransactionSet.of(transactions).sales, mode=mode)
+        if item_ids is None:
+            return dict(forecasts)
+        return {i: forecasts.get(i, dict(NO_DEMAND)) for i in item_ids}
+
+    def recommend_reorders(self, inventory_items, transactions, demand_model=None, mode="linear"):
         """
         Calculates optimal reorder quantities and categorizes urgency based on financial risk.
         Categories: 'Critical', 'Warning', 'Insight'
         """
         recommendations = []
-        profit_insights = self.get_profitability_insights(inventory_items, transactions)
+        txns = TransactionSet.of(transactions)
+        profit_by_id = {p['id']: p for p in self.get_profitability_insights(inventory_items, txns)}
+        no_profit = {"margin": 0, "is_star": False, "total_profit": 0}
+        forecasts = self.forecast_demand(txns, [item['id'] for item in inventory_items], demand_model, mode)
+        check_deadline("recommend_reorders")
         
         for item in inventory_items:
-            forecast = self.get_demand_forecast(item['id'], transactions)
+            forecast = forecasts[item['id']]
             daily_demand = forecast['30_day'] / 30
             lead_time = item.get('lead_time', 1)
             current_qty = item['stock_quantity']
@@ -186,7 +537,7 @@ class BulkBinsAIService:
             days_to_stockout = current_qty / daily_demand if daily_demand > 0 else 999
             
             # Fetch profitability for this item
-            item_profit = next((i for i in profit_insights if i['id'] == item['id']), {"margin": 0, "is_star": False, "total_profit": 0})
+            item_profit = profit_by_id.get(item['id'], no_profit)
             avg_daily_profit = (item_profit['total_profit'] / 30) if daily_demand > 0 else 0
             
             # Estimated Lost Profit if we don't reorder now
@@ -248,55 +599,56 @@ class BulkBinsAIService:
     def get_profitability_insights(self, inventory_items, transactions):
         """
         Identifies 'Profit Stars' - items with high margin and high sales volume.
+        `transactions` is a list of transaction dicts, a TransactionSet, or a
+        DataFrame of per-item aggregates (inventory_item_id, profit, quantity,
+        amount) such as rollups.item_aggregates() returns.
         """
-        if not transactions:
+        if isinstance(transactions, pd.DataFrame):
+            item_stats = transactions
+        else:
+            txns = TransactionSet.of(transactions)
+            if not len(txns):
+                return []
+            item_stats = txns.item_totals
+        if item_stats.empty or not inventory_items:
             return []
 
-        # Ensure we have required keys in the dictionaries
-        safe_txns = []
-        for t in transactions:
-            if t.get('type') == 'Sale':
-                safe_txns.append({
-                    'inventory_item_id': t.get('inventory_item_id'),
-                    'profit': t.get('profit', 0) or 0,
-                    'quantity': t.get('quantity', 0) or 0,
-                    'amount': t.get('amount', 0) or 0
-                })
-
-        df = pd.DataFrame(safe_txns)
-        if df.empty:
-            return []
+        # Volume bar for a star: 70th percentile over every item sold
+        volume_threshold = item_stats['quantity'].quantile(0.7)
 
-        # Aggregate profit by item
-        item_stats = df.groupby('inventory_item_id').agg({
-            'profit': 'sum',
-            'quantity': 'sum',
-            'amount': 'sum'
-        }).reset_index()
+        names = pd.DataFrame({
+            'id': pd.array([i['id'] for i in inventory_items], dtype='Int64'),
+            'name': [i['name'] for i in inventory_items]
+        }).drop_duplicates('id')
+        stats = item_stats.astype({'inventory_item_id': 'Int64'}).merge(
+            names, left_on='inventory_item_id', right_on='id', how='inner')
+        if stats.empty:
+            return []
 
-        # Map names and calculate margin
-        insights = []
-        for _, row in item_stats.iterrows():
-            item = next((i for i in inventory_items if i['id'] == row['inventory_item_id']), None)
-            if item:
-                margin = (row['profit'] / row['amount'] * 100) if row['amount'] > 0 else 0
-                is_star = bool(margin > 20 and row['quantity'] >= item_stats['quantity'].quantile(0.7))
-                insights.append({
-                    "id": item['id'],
-                    "name": item['name'],
-                    "total_profit": float(row['profit']),
-                    "volume": int(row['quantity']),
-                    "margin": round(margin, 2),
-                    "is_star": is_star
-                })
+        amount = stats['amount'].to_numpy(dtype=float)
+        profit = stats['profit'].to_numpy(dtype=float)
+        quantity = stats['quantity'].to_numpy(dtype=float)
+        margin = np.divide(profit * 100, amount, out=np.zeros(len(stats)), where=amount > 0)
+        is_star = (margin > 20) & (quantity >= volume_threshold)
+
+        insights = [{
+            "id": int(item_id),
+            "name": name,
+            "total_profit": float(p),
+            "volume": int(q),
+            "margin": round(float(m), 2),
+            "is_star": bool(star)
+        } for item_id, name, p, q, m, star in zip(stats['id'], stats['name'], profit, quantity, margin, is_star)]
 
         return sorted(insights, key=lambda x: x['total_profit'], reverse=True)
 
-    def get_dashboard_stats(self, transactions, inventory_items, granularity='weekly'):
+    def get_dashboard_stats(self, transactions, inventory_items, granularity='weekly', demand_model=None):
         """
-        Aggregates all data for the high-fidelity dashboard.
+        Aggregates all data for the high-fidelity dashboard. demand_model is
+        passed on to recommend_reorders.
         """
-        if not transactions:
+        txns = TransactionSet.of(transactions)
+        if not len(txns):
             return {
                 "total_sales": 0, "total_cogs": 0, "gross_profit": 0, "total_expenses": 0, "net_profit": 0,
                 "prediction": {"amount": 0, "confidence": "Low", "expense_forecast": 0},
@@ -305,98 +657,26 @@ class BulkBinsAIService:
             }
 
         # 1. Basic Totals
-        sales_txns = [t for t in transactions if t.get('type') == 'Sale']
-        expense_txns = [t for t in transactions if t.get('type') == 'Expense']
-
-        total_sales = sum(t.get('amount', 0) for t in sales_txns)
-        total_expenses = sum(t.get('amount', 0) for t in expense_txns)
+        total_sales = float(txns.sales['amount'].sum())
+        total_expenses = float(txns.expenses['amount'].sum())
         
-        # Calculate COGS (approximate if cost_price is missing)
-        total_cogs = 0
-        for t in sales_txns:
-            item = next((i for i in inventory_items if i['id'] == t.get('inventory_item_id')), None)
-            if item:
-                cost = item.get('cost_price', 0)
-                qty = t.get('quantity', 1)
-                total_cogs += cost * qty
+        # Calculate COGS (approximate if cost_price is missing): each sale's
+        # item id is mapped to its unit cost through one id-keyed index
+        unit_cost = pd.Series({i['id']: i.get('cost_price') or 0 for i in inventory_items}, dtype=float)
+        sale_costs = txns.sales['inventory_item_id'].map(unit_cost).astype(float).fillna(0)
+        total_cogs = float((sale_costs * txns.sales['quantity']).sum())
         
         gross_profit = total_sales - total_cogs
         net_profit = total_sales - total_expenses
 
         # 2. Predictions & Recommendations
-        prediction = self.predict_profit(transactions)
-        reorders = self.recommend_reorders(inventory_items, transactions)
-        
-        # 3. Time Series Analysis
-        df = pd.DataFrame([{
-            'date': datetime.fromisoformat(t['timestamp']).date(),
-            'amount': t.get('amount', 0),
-            'type': t.get('type'),
-            'category': t.get('category', 'Others')
-        } for t in transactions])
-
-        # Weekly/Daily Analysis based on granularity
-        # For simplicity, we'll return last 7 units of time (days or weeks)
-        # But frontend expects "weekly_analysis" specifically for the chart
-        # Let's give last 7 weeks
-        df['date'] = pd.to_datetime(df['date'])
-        df['week_start'] = df['date'].dt.to_period('W').apply(lambda r: r.start_time)
-        
-        weekly_stats = df.groupby(['week_start', 'type'])['amount'].sum().reset_index()
-        weeks = sorted(weekly_stats['week_start'].unique())[-8:] # Last 8 weeks
-        
-        weekly_analysis = []
-        for w in weeks:
-            w_sales = weekly_stats[(weekly_stats['week_start'] == w) & (weekly_stats['type'] == 'Sale')]['amount'].sum()
-            w_exp = weekly_stats[(weekly_stats['week_start'] == w) & (weekly_stats['type'] == 'Expense')]['amount'].sum()
-            weekly_analysis.append({
-                "label": w.strftime('%d %b'),
-                "revenue": float(w_sales),
-                "expenses": float(w_exp),
-                "profit": float(w_sales - w_exp)
-            })
-
-        # 4. Expense Breakdown
-        expense_breakdown = []
-        if not df[df['type'] == 'Expense'].empty:
-            exp_by_cat = df[df['type'] == 'Expense'].groupby('category')['amount'].sum().reset_index()
-            expense_breakdown = [
-                {"category": r['category'], "amount": float(r['amount'])} 
-                for _, r in exp_by_cat.iterrows()
-            ]
-
-        # 5. Monthly Trend
-        df['month'] = df['date'].dt.strftime('%b')
-        df['year_month'] = df['date'].dt.to_period('M')
-        monthly_stats = df.groupby(['year_month', 'type'])['amount'].sum().reset_index()
-        months = sorted(monthly_stats['year_month'].unique())[-6:] # Last 6 months
+        with phase("predict_profit"):
+            prediction = self.predict_profit(txns)
+        with phase("recommend_reorders"):
+            reorders = self.recommend_reorders(inventory_items, txns, demand_model)
         
-        monthly_profit_trend = []
-        for m in months:
-            m_sales = monthly_stats[(monthly_stats['year_month'] == m) & (monthly_stats['type'] == 'Sale')]['amount'].sum()
-            m_exp = monthly_stats[(monthly_stats['year_month'] == m) & (monthly_stats['type'] == 'Expense')]['amount'].sum()
-            monthly_profit_trend.append({
-                "month": m.strftime('%b'),
-                "profit": float(m_sales - m_exp)
-            })
-            
-        # 6. Monthly Summary (This vs Last Month)
-        current_month = datetime.now().strftime('%Y-%m')
-        last_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
-        
-        def get_month_totals(ym_str):
-            # df['year_month'] is period, convert string to period
-            try:
-                p = pd.Period(ym_str, freq='M')
-                m_data = monthly_stats[monthly_stats['year_month'] == p]
-                s = m_data[m_data['type'] == 'Sale']['amount'].sum()
-                e = m_data[m_data['type'] == 'Expense']['amount'].sum()
-                return {"sales": float(s), "expenses": float(e), "profit": float(s - e)}
-            except:
-                return {"sales": 0, "expenses": 0, "profit": 0}
-
-        this_m = get_month_totals(current_month)
-        last_m = get_month_totals(last_month)
+        # 3-6. Weekly analysis, expense breakdown, monthly trend, this vs last month
+        weekly_analysis, expense_breakdown, monthly_profit_trend, this_m, last_m = summarize_periods(txns.frame)
         
         sales_growth = ((this_m['sales'] - last_m['sales']) / last_m['sales'] * 100) if last_m['sales'] > 0 else 0
         profit_growth = ((this_m['profit'] - last_m['profit']) / last_m['profit'] * 100) if last_m['profit'] > 0 else 0
@@ -433,7 +713,7 @@ class BulkBinsAIService:
             })
 
         # Product Performance
-        profit_insights = self.get_profitability_insights(inventory_items, transactions)
+        profit_insights = self.get_profitability_insights(inventory_items, txns)
         
         return {
             "total_sales": round(total_sales, 2),
@@ -462,3 +742,9 @@ class BulkBinsAIService:
 
 
 ai_service = BulkBinsAIService()
+
+
+if __name__ == "__main__":
+    # Build (or refresh) the classifier artifact, e.g. as a deploy step
+    load_expense_classifier()
+    print(f"Expense classifier ready at {CLASSIFIER_PATH}")
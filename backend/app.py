@@ -2,13 +2,14 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
-from models import db, User, Business, BusinessMember, Transaction, InventoryItem
+from models import db, User, Business, BusinessMember, Transaction, InventoryItem, get_data_version
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 from flask import send_from_directory
 from functools import wraps
+from json_provider import FastJSONProvider
 
 
 
@@ -29,14 +30,40 @@ else:
 
 app = Flask(__name__)
 application = app
+app.json = FastJSONProvider(app)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'bulkbins.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'bulkbins.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'bulkbins-premium-key-2026'
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-bulkbins-2026'
 app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'uploads/receipts')
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Admission control for heavy analytics/export routes (see admission.py)
+app.config['HEAVY_MAX_CONCURRENT'] = int(os.environ.get('HEAVY_MAX_CONCURRENT', 4))
+app.config['HEAVY_MAX_PER_BUSINESS'] = int(os.environ.get('HEAVY_MAX_PER_BUSINESS', 2))
+app.config['HEAVY_RETRY_AFTER'] = int(os.environ.get('HEAVY_RETRY_AFTER', 5))
+
+# Request deadlines (seconds) for the same heavy routes (see deadline.py)
+app.config['DEFAULT_REQUEST_DEADLINE'] = float(os.environ.get('DEFAULT_REQUEST_DEADLINE', 30))
+app.config['ROUTE_DEADLINES'] = {
+    'export.export_transactions': 60,
+    'export.email_report': 60,
+    'import_transactions': 120,
+}
+
+# Versioned result cache for dashboard endpoints (see result_cache.py)
+app.config['RESULT_CACHE_BACKEND'] = os.environ.get('RESULT_CACHE_BACKEND', 'memory')
+app.config['RESULT_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 512))
+app.config['RESULT_CACHE_STALE_WHILE_REVALIDATE'] = os.environ.get('RESULT_CACHE_STALE_WHILE_REVALIDATE', '0') == '1'
+
+# Background dashboard snapshots, refreshed by `python snapshots.py --worker` (see snapshots.py)
+app.config['SNAPSHOT_REFRESH_MINUTES'] = int(os.environ.get('SNAPSHOT_REFRESH_MINUTES', 15))
+app.config['SNAPSHOT_WORKERS'] = int(os.environ.get('SNAPSHOT_WORKERS', 2))
+
+# Live dashboard stream (see events.py): seconds between keep-alives / cross-worker version checks
+app.config['SSE_HEARTBEAT_SECONDS'] = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+
 db.init_app(app)
 jwt = JWTManager(app)
 
@@ -50,10 +77,28 @@ create_tables()
 
 
 from ai_insights import ai_bp
-from ai_service import ai_service
+from ai_service import ai_service, TransactionSet
 from export_routes import export_bp
+from dashboard_bundle import bundle_bp, build_pnl, build_profit_stars, build_inventory_insights, transaction_query
+from events import events_bp
+from portfolio import portfolio_bp
+from platform_metrics import compute_platform_metrics, business_status_counts
+from rollups import item_aggregates
+from trends import profit_trend
+from holt_winters import mode_error
 app.register_blueprint(ai_bp, url_prefix='/api')
 app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(bundle_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
+app.register_blueprint(portfolio_bp, url_prefix='/api')
+
+from admission import init_admission, heavy_request, HEAVY_ENDPOINTS
+from deadline import init_deadlines
+from result_cache import init_result_cache, cached_result
+from snapshots import snapshot_first
+init_admission(app)
+init_deadlines(app, HEAVY_ENDPOINTS)
+init_result_cache(app)
 
 # Configure CORS to allow requests from frontend
 CORS(app, 
@@ -197,16 +242,23 @@ def update_profile():
 @master_admin_required()
 def admin_overview():
     user_count = User.query.count()
-    business_count = Business.query.filter(Business.status == 'approved').count()
-    pending_count = Business.query.filter(Business.status == 'pending').count()
-    rejected_count = Business.query.filter(Business.status == 'rejected').count()
+    statuses = business_status_counts()
     return jsonify({
         "total_users": user_count,
-        "total_businesses": business_count,
-        "pending_businesses": pending_count,
-        "rejected_businesses": rejected_count
+        "total_businesses": statuses["approved"],
+        "pending_businesses": statuses["pending"],
+        "rejected_businesses": statuses["rejected"]
     }), 200
 
+@app.route('/api/admin/platform-metrics', methods=['GET'])
+@master_admin_required()
+def admin_platform_metrics():
+    # ?days=N sets the activity / GMV window (default 30)
+    days = request.args.get('days', 30, type=int)
+    if days <= 0 or days > 366:
+        return jsonify({"message": "days must be between 1 and 366"}), 400
+    return jsonify(compute_platform_metrics(days)), 200
+
 @app.route('/api/admin/users', methods=['GET'])
 @master_admin_required()
 def admin_get_users():
@@ -560,7 +612,7 @@ def get_transactions(business_id):
             "amount": t.amount,
             "category": t.category,
             "type": t.type,
-            "timestamp": t.timestamp.isoformat(),
+            "timestamp": t.timestamp,
             "description": t.description,
             "receipt_url": t.receipt_url,
             "ai_metadata": t.ai_metadata,
@@ -785,16 +837,10 @@ def ai_classify():
 
 @app.route('/api/businesses/<int:business_id>/ai/predictions', methods=['GET'])
 @role_required(['Owner', 'Analyst'])
+@heavy_request
 def ai_predictions(business_id):
-    txns = Transaction.query.filter_by(business_id=business_id).all()
-    txn_data = [{
-        "timestamp": t.timestamp.isoformat(),
-        "amount": t.amount,
-        "type": t.type,
-        "profit": t.profit
-    } for t in txns]
-    
-    predictions = ai_service.predict_profit(txn_data)
+    # O(1) read of the running trend sums maintained on every write
+    predictions = profit_trend(business_id)
     
     # Overspending check for current month
     now = datetime.utcnow()
@@ -817,105 +863,70 @@ def ai_predictions(business_id):
 
 @app.route('/api/businesses/<int:business_id>/ai/predictions', methods=['GET'])
 @role_required(['Owner', 'Accountant', 'Analyst'])
+@heavy_request
 def get_predictions(business_id):
-    # Fetch all transactions for analysis
-    txns = Transaction.query.filter_by(business_id=business_id).all()
-    txn_data = [{
-        "timestamp": t.timestamp.isoformat(),
-        "amount": t.amount,
-        "type": t.type,
-        "profit": t.profit
-    } for t in txns]
-    
-    prediction = ai_service.predict_profit(txn_data)
+    prediction = profit_trend(business_id)
     
     return jsonify(prediction), 200
 
 @app.route('/api/businesses/<int:business_id>/ai/pnl', methods=['GET'])
 @role_required(['Owner', 'Accountant', 'Analyst'])
+@heavy_request
 def get_pnl_data(business_id):
-    # Get monthly sales vs expenses for the last 6 months
-    now = datetime.utcnow()
-    six_months_ago = now - timedelta(days=180)
-    
-    txns = Transaction.query.filter(
-        Transaction.business_id == business_id,
-        Transaction.timestamp >= six_months_ago
-    ).all()
-    
-    data = {}
-    for t in txns:
-        month = t.timestamp.strftime('%Y-%m')
-        if month not in data:
-            data[month] = {"sales": 0, "expenses": 0, "profit": 0, "cogs": 0}
-        if t.type == 'Sale':
-            data[month]["sales"] += t.amount
-            data[month]["cogs"] += (t.cogs or 0)
-        else:
-            data[month]["expenses"] += t.amount
-        data[month]["profit"] += (t.profit or 0)
-            
-    sorted_months = sorted(data.keys())
-    pnl_history = [{
-        "month": m,
-        "sales": data[m]["sales"],
-        "expenses": data[m]["expenses"],
-        "cogs": data[m]["cogs"],
-        "profit": data[m]["profit"]
-    } for m in sorted_months]
-    
-    return jsonify(pnl_history), 200
+    # ?start_month=YYYY-MM&end_month=YYYY-MM&granularity=weekly|monthly|quarterly|yearly
+    # (default: monthly for the last 6 months)
+    params = {
+        "start_month": request.args.get("start_month"),
+        "end_month": request.args.get("end_month"),
+        "granularity": request.args.get("granularity", "monthly"),
+    }
+    compute = lambda: build_pnl(business_id, **params)
+    try:
+        return jsonify(cached_result("pnl", business_id, params, snapshot_first("pnl", business_id, params, compute))), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route('/api/businesses/<int:business_id>/ai/inventory-insights', methods=['GET'])
 @role_required(['Owner', 'Accountant', 'Analyst'])
+@heavy_request
 def get_inventory_insights(business_id):
-    items = InventoryItem.query.filter_by(business_id=business_id).all()
-    inventory_data = [{
-        "id": item.id,
-        "name": item.name,
-        "stock_quantity": item.stock_quantity,
-        "reorder_level": item.reorder_level,
-        "lead_time": item.lead_time
-    } for item in items]
+    # ?mode=linear|holt-winters picks the demand forecaster
+    params = {"mode": request.args.get("mode", "linear")}
+    if mode_error(params["mode"]):
+        return jsonify({"error": mode_error(params["mode"])}), 400
+
+    def compute():
+        version = get_data_version(business_id)
+        items = InventoryItem.query.filter_by(business_id=business_id).all()
+        inventory_data = [{
+            "id": item.id,
+            "name": item.name,
+            "stock_quantity": item.stock_quantity,
+            "reorder_level": item.reorder_level,
+            "lead_time": item.lead_time
+        } for item in items]
     
-    txns = Transaction.query.filter_by(business_id=business_id).all()
-    txn_data = [{
-        "inventory_item_id": t.inventory_item_id,
-        "type": t.type,
-        "quantity": t.quantity,
-        "timestamp": t.timestamp.isoformat()
-    } for t in txns]
-    
-    reorders = ai_service.recommend_reorders(inventory_data, txn_data)
-    
-    return jsonify({
-        "reorder_recommendations": reorders
-    }), 200
+        txns = TransactionSet.from_query(transaction_query(business_id))
+        return build_inventory_insights(inventory_data, txns, business_id, version, params["mode"])
+
+    return jsonify(cached_result("inventory-insights", business_id, params,
+                                 snapshot_first("inventory-insights", business_id, params, compute))), 200
 
 @app.route('/api/businesses/<int:business_id>/ai/profit-stars', methods=['GET'])
 @role_required(['Owner', 'Accountant', 'Analyst'])
+@heavy_request
 def get_profit_stars(business_id):
-    items = InventoryItem.query.filter_by(business_id=business_id).all()
-    inventory_data = [{"id": item.id, "name": item.name} for item in items]
-    
-    txns = Transaction.query.filter_by(business_id=business_id).all()
-    txn_data = [{
-        "inventory_item_id": t.inventory_item_id,
-        "type": t.type,
-        "quantity": t.quantity,
-        "profit": t.profit,
-        "amount": t.amount,
-        "timestamp": t.timestamp.isoformat()
-    } for t in txns]
-    
-    stars = ai_service.get_profitability_insights(inventory_data, txn_data)
-    
-    return jsonify({
-        "profit_stars": stars
-    }), 200
+    def compute():
+        items = InventoryItem.query.filter_by(business_id=business_id).all()
+        inventory_data = [{"id": item.id, "name": item.name} for item in items]
+        # Per-item totals come pre-aggregated from the daily rollups
+        return build_profit_stars(inventory_data, item_aggregates(business_id))
+
+    return jsonify(cached_result("profit-stars", business_id, {}, compute)), 200
 
 @app.route('/api/businesses/<int:business_id>/transaction-import', methods=['POST'])
 @role_required(['Owner', 'Analyst'])
+@heavy_request
 def import_transactions(business_id):
     if 'file' not in request.files:
         return jsonify({"message": "No file part"}), 400
@@ -2,6 +2,7 @@ from flask import request, jsonify
 from functools import wraps
 from flask_jwt_extended import decode_token, verify_jwt_in_request, get_jwt_identity
 from models import BusinessMember, User
+from deadline import DeadlineExceeded
 
 def get_user_id(token):
     try:
@@ -42,6 +43,8 @@ def role_required(allowed_roles):
                     return jsonify({"message": f"Access denied. Required roles: {allowed_roles}"}), 403
                 
                 return f(*args, **kwargs)
+            except DeadlineExceeded:
+                raise # Answered with 503 by the app's error handler
             except Exception as e:
                  return jsonify({"message": f"Authorization error: {str(e)}"}), 401
         return decorated_function
@@ -0,0 +1,78 @@
+import threading
+
+from deadline import DeadlineExceeded, current_deadline, shared_work
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one in-flight computation.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is running block until it finishes and share its result (or its error).
+    Nothing is kept once the call completes, so this is not a cache. It only
+    coalesces within one process, i.e. across the threads of a threaded
+    (gthread) gunicorn worker.
+
+    The leader computes under the route's own time budget (shared_work), so
+    a client that asked for a shorter one can't fail it for the others; a
+    follower stops waiting when its own deadline runs out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            deadline = current_deadline()
+            if not call.done.wait(deadline.remaining() if deadline is not None else None):
+                raise DeadlineExceeded("waiting for a shared computation", deadline)
+            if call.error is not None:
+                raise call.error
+            if not call.ok:
+                # The leader died of a BaseException (interrupt, worker timeout): there is no result
+                raise RuntimeError("The shared computation was interrupted")
+            return call.result
+
+        try:
+            with shared_work():
+                call.result = fn()
+            call.ok = True
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def normalize_params(params):
+    """Sorted (name, value) pairs; empty params are dropped so `?start_date=` and no start_date match."""
+    return tuple(sorted((k, str(v)) for k, v in params.items() if v not in (None, '')))
+
+
+def request_key(endpoint, business_id, params, version):
+    """Key for (endpoint, business_id, normalized params, data version)."""
+    return (endpoint, int(business_id), normalize_params(params), version)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway database before it is imported.
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test_dashboard.db')
+
+import pytest
+from flask_jwt_extended import create_access_token
+from app import app
+from models import db, User, Business, BusinessMember, Transaction, InventoryItem
+from result_cache import result_cache
+from model_registry import model_registry
+
+PRODUCTS = 2
+
+
+@pytest.fixture
+def client_and_business():
+    result_cache.clear()
+    model_registry.clear()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        user = User(username="Owner", email="owner@example.com")
+        user.set_password("secret")
+        biz = Business(name="Test Store", status="approved")
+        db.session.add_all([user, biz])
+        db.session.flush()
+        db.session.add(BusinessMember(user_id=user.id, business_id=biz.id, role="Owner"))
+
+        items = [
+            InventoryItem(business_id=biz.id, name=f"Item {i}", stock_quantity=20, reorder_level=5,
+                          cost_price=10.0, selling_price=15.0, lead_time=2)
+            for i in range(PRODUCTS)
+        ]
+        db.session.add_all(items)
+        db.session.flush()
+
+        now = datetime.now()
+        db.session.add_all([
+            Transaction(business_id=biz.id, inventory_item_id=items[0].id, type="Sale", amount=150.0,
+                        quantity=10, cogs=100.0, profit=50.0, category="Produce", timestamp=now - timedelta(days=2)),
+            Transaction(business_id=biz.id, inventory_item_id=items[1].id, type="Sale", amount=45.0,
+                        quantity=3, cogs=30.0, profit=15.0, category="Dairy", timestamp=now - timedelta(days=5)),
+            Transaction(business_id=biz.id, type="Expense", amount=40.0, quantity=1, cogs=40.0,
+                        profit=-40.0, category="Rent", timestamp=now - timedelta(days=3)),
+            # Outside the 30-day window: must not count towards the totals
+            Transaction(business_id=biz.id, type="Sale", amount=999.0, quantity=1,
+                        category="Produce", timestamp=now - timedelta(days=90)),
+        ])
+        db.session.commit()
+
+        token = create_access_token(identity=user.email)
+        yield app.test_client(), biz.id, token
@@ -0,0 +1,193 @@
+from flask import Blueprint, request, jsonify
+from models import db, Transaction, InventoryItem, get_data_version
+from business import role_required
+from admission import heavy_request
+from ai_service import ai_service, TransactionSet
+from model_registry import model_registry
+from trends import item_demand_model
+from holt_winters import FORECAST_MODES, mode_error
+from ai_insights import compute_dashboard_stats, analyze_transactions, analysis_models, _sum_where
+from rollups import period_start, next_period, period_label, build_advanced_analytics, item_aggregates
+from sqlalchemy import func, case, and_
+from datetime import datetime, timedelta
+from functools import cached_property
+
+bundle_bp = Blueprint("bundle", __name__)
+
+
+class BusinessData:
+    """One business's transactions and inventory, loaded at most once per request.
+
+    Widgets read whichever view they need; each view is built on first use,
+    so a bundle that only asks for the SQL-backed dashboard loads nothing.
+    data_version is read up front, so every view is at least that new.
+    """
+
+    def __init__(self, business_id):
+        self.business_id = business_id
+        self.data_version = get_data_version(business_id)
+
+    @cached_property
+    def items(self):
+        return InventoryItem.query.filter_by(business_id=self.business_id).all()
+
+    @cached_property
+    def inventory_data(self):
+        return [{
+            "id": item.id,
+            "name": item.name,
+            "stock_quantity": item.stock_quantity,
+            "reorder_level": item.reorder_level,
+            "lead_time": item.lead_time,
+            "cost_price": item.cost_price,
+            "selling_price": item.selling_price
+        } for item in self.items]
+
+    @cached_property
+    def txn_set(self):
+        """Columnar view shared by every widget that reads raw transactions."""
+        return TransactionSet.from_query(transaction_query(self.business_id))
+
+
+def transaction_query(business_id, start=None, end=None):
+    """The business's transactions projected onto TransactionSet.COLUMNS, for TransactionSet.from_query."""
+    query = db.session.query(*(getattr(Transaction, c).label(c) for c in TransactionSet.COLUMNS)).filter(
+        Transaction.business_id == business_id)
+    if start:
+        query = query.filter(Transaction.timestamp >= start)
+    if end:
+        query = query.filter(Transaction.timestamp <= end)
+    return query
+
+
+PNL_GRANULARITIES = ("weekly", "monthly", "quarterly", "yearly")
+MAX_PNL_PERIODS = 400
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m')
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+
+
+def build_pnl(business_id, start_month=None, end_month=None, granularity="monthly", now=None, days=180):
+    """Sales / expenses / COGS / profit per period, aggregated in the database.
+
+    The range is start_month..end_month inclusive (YYYY-MM), by default the
+    last `days` days. One GROUP BY over a CASE of period boundaries does the
+    bucketing, so the cost follows the number of rows in the range, not the
+    length of the business's history. Periods without transactions are left out.
+    """
+    if granularity not in PNL_GRANULARITIES:
+        raise ValueError(f"Invalid granularity '{granularity}', expected one of {', '.join(PNL_GRANULARITIES)}")
+    now = now or datetime.utcnow()
+    start = _parse_month(start_month) if start_month else now - timedelta(days=days)
+    end = next_period(_parse_month(end_month), "monthly") if end_month else next_period(period_start(now, granularity), granularity)
+    if start >= end:
+        raise ValueError("start_month must not be after end_month")
+
+    # [lo, hi) per period; the first one is clipped to the start of the range
+    periods = []
+    period = period_start(start, granularity)
+    while period < end:
+        if len(periods) >= MAX_PNL_PERIODS:
+            raise ValueError(f"Range covers more than {MAX_PNL_PERIODS} periods; use a coarser granularity")
+        following = next_period(period, granularity)
+        periods.append((period_label(period, granularity), max(period, start), min(following, end)))
+        period = following
+
+    bucket = case(*[
+        (and_(Transaction.timestamp >= lo, Transaction.timestamp < hi), i)
+        for i, (_, lo, hi) in enumerate(periods)
+    ])
+    is_sale = Transaction.type == 'Sale'
+    rows = db.session.query(
+        bucket,
+        _sum_where(Transaction.amount, is_sale),
+        _sum_where(Transaction.amount, Transaction.type != 'Sale'),
+        _sum_where(Transaction.cogs, is_sale),
+        func.coalesce(func.sum(Transaction.profit), 0)
+    ).filter(
+        Transaction.business_id == business_id,
+        Transaction.timestamp >= start,
+        Transaction.timestamp < end
+    ).group_by(bucket).order_by(bucket).all()
+
+    return [{
+        "period": periods[i][0],
+        "month": periods[i][0],
+        "sales": sales,
+        "expenses": expenses,
+        "cogs": cogs,
+        "profit": profit
+    } for i, sales, expenses, cogs, profit in rows if i is not None]
+
+
+def build_profit_stars(inventory_data, txn_data):
+    return {"profit_stars": ai_service.get_profitability_insights(inventory_data, txn_data)}
+
+
+def build_inventory_insights(inventory_data, txn_data, business_id=None, version=None, mode="linear"):
+    """Reorder recommendations, forecasting demand in `mode` (see FORECAST_MODES).
+    Given the business, linear demand comes from the per-item trend sums
+    (trends.item_demand_model) and other modes from the model registry, at
+    the data version read before txn_data was loaded."""
+    if mode not in FORECAST_MODES:
+        raise ValueError(mode_error(mode))
+    demand_model = None
+    if business_id is not None and mode == "linear":
+        demand_model = item_demand_model(business_id, [item["id"] for item in inventory_data])
+    elif business_id is not None:
+        demand_model = model_registry.fitted(business_id, f"units:{mode}", "daily", version,
+                                             lambda: TransactionSet.of(txn_data).fit_demand(mode))
+    return {"reorder_recommendations": ai_service.recommend_reorders(inventory_data, txn_data, demand_model, mode)}
+
+
+def _transaction_analysis(data, args):
+    if not len(data.txn_set):
+        return {"error": "No transactions found"}
+    granularity = args.get("granularity", "weekly")
+    mode = args.get("mode", "linear")
+    return analyze_transactions(data.txn_set, granularity,
+                                analysis_models(data.business_id, data.data_version, granularity, mode=mode), mode)
+
+
+# widget name -> builder(BusinessData, request args). Names match the standalone endpoints.
+WIDGETS = {
+    "dashboard": lambda data, args: compute_dashboard_stats(
+        data.business_id, args.get("granularity", "monthly"), args.get("start_date"), args.get("end_date")),
+    "pnl": lambda data, args: build_pnl(
+        data.business_id, args.get("start_month"), args.get("end_month"), args.get("pnl_granularity", "monthly")),
+    "profit-stars": lambda data, args: build_profit_stars(data.inventory_data, item_aggregates(data.business_id)),
+    "inventory-insights": lambda data, args: build_inventory_insights(
+        data.inventory_data, data.txn_set, data.business_id, data.data_version, args.get("mode", "linear")),
+    "advanced-analytics": lambda data, args: build_advanced_analytics(
+        data.business_id, args.get("start_date"), args.get("end_date"), args.get("analytics_granularity", "daily")),
+    "transaction-analysis": _transaction_analysis,
+}
+
+
+@bundle_bp.route("/businesses/<int:business_id>/ai/bundle", methods=["GET"])
+@role_required(['Owner', 'Accountant', 'Analyst'])
+@heavy_request
+def get_dashboard_bundle(business_id):
+    """Computes several dashboard widgets from a single load of the business's data.
+
+    ?widgets=pnl,profit-stars,... (defaults to all). Other query params
+    (granularity, start_date, end_date for the dashboard; start_month,
+    end_month, pnl_granularity for the P&L; start_date, end_date,
+    analytics_granularity for advanced analytics; mode for the inventory
+    insights and transaction analysis forecasts) are passed to the widgets
+    that use them.
+    """
+    requested = [w.strip() for w in request.args.get("widgets", ",".join(WIDGETS)).split(",") if w.strip()]
+    unknown = [w for w in requested if w not in WIDGETS]
+    if unknown:
+        return jsonify({"error": f"Unknown widgets: {', '.join(unknown)}", "available": list(WIDGETS)}), 400
+
+    data = BusinessData(business_id)
+    try:
+        return jsonify({"widgets": {name: WIDGETS[name](data, request.args) for name in requested}}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+import contextvars
+import logging
+import time
+
+logger = logging.getLogger("bulkbins.deadline")
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+
+# Header a client can send to shorten (never extend) a route's time budget, in seconds.
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, where, deadline):
+        super().__init__(f"Deadline of {deadline.budget:.1f}s exceeded during {where}")
+        self.where = where
+        self.deadline = deadline
+
+
+class Deadline:
+    """Time budget for one request, plus how long each phase of it took.
+
+    route_budget is the server's budget for the route before the client
+    shortened it; work shared with other requests runs under that (see shared_work).
+    """
+
+    def __init__(self, budget, route_budget=None):
+        self.budget = budget
+        self.route_budget = budget if route_budget is None else route_budget
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget
+        self.phases = []
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self, where="computation"):
+        if self.expired():
+            raise DeadlineExceeded(where, self)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline():
+    return _current.get()
+
+
+def check_deadline(where="computation"):
+    """Raises DeadlineExceeded if the current request is out of time. No-op outside requests."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(where)
+
+
+@contextmanager
+def phase(name):
+    """Times a phase of the current request and checks the deadline when it starts and ends."""
+    deadline = _current.get()
+    if deadline is None:
+        yield
+        return
+    deadline.check(name)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        deadline.phases.append((name, time.monotonic() - start))
+    deadline.check(name)
+
+
+@contextmanager
+def shared_work():
+    """Runs a computation whose result other requests share (see coalesce.SingleFlight).
+
+    Inside, only the route's own budget applies, not a shorter one the client
+    asked for with X-Request-Timeout: otherwise one impatient client would
+    fail the computation, and so the request, of everyone coalesced onto it.
+    The client's own deadline is back in force once the block exits.
+    """
+    deadline = _current.get()
+    if deadline is None or deadline.route_budget <= deadline.budget:
+        yield
+        return
+    shared = Deadline(deadline.route_budget)
+    shared.started = deadline.started
+    shared.expires_at = deadline.started + deadline.route_budget
+    shared.phases = deadline.phases
+    token = _current.set(shared)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def init_deadlines(app, routes):
+    """Gives each route in `routes` a deadline.
+
+    The budget is ROUTE_DEADLINES[endpoint], else DEFAULT_REQUEST_DEADLINE
+    (seconds), shortened by the X-Request-Timeout header if the client sends
+    one (except inside shared work, see shared_work). Long loops call check_deadline()/phase() and a request that runs out
+    of time is answered with 503, which releases the worker.
+    """
+    from flask import request, jsonify
+
+    @app.before_request
+    def _start_deadline():
+        if request.endpoint not in routes:
+            return None
+        route_budget = app.config.get("ROUTE_DEADLINES", {}).get(request.endpoint, app.config.get("DEFAULT_REQUEST_DEADLINE", 30))
+        budget = route_budget
+        try:
+            requested = float(request.headers.get(DEADLINE_HEADER, budget))
+            budget = min(budget, requested) if requested > 0 else budget
+        except ValueError:
+            pass
+        request.environ["bulkbins.deadline_token"] = _current.set(Deadline(budget, route_budget))
+        return None
+
+    @app.teardown_request
+    def _end_deadline(exc):
+        token = request.environ.pop("bulkbins.deadline_token", None)
+        if token is None:
+            return
+        deadline = _current.get()
+        _current.reset(token)
+        if deadline is not None and deadline.phases:
+            timings = " ".join(f"{name}={secs:.2f}s" for name, secs in deadline.phases)
+            logger.info("%s %s %s total=%.2fs", request.method, request.path, timings, deadline.elapsed())
+
+    @app.errorhandler(DeadlineExceeded)
+    def _deadline_exceeded(e):
+        logger.warning("%s %s aborted: %s", request.method, request.path, e)
+        resp = jsonify({
+            "error": "This report took too long to compute. Try a shorter date range.",
+            "phase": e.where,
+            "completed_phases": [{"phase": name, "seconds": round(secs, 3)} for name, secs in e.deadline.phases]
+        })
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "30"
+        return resp
@@ -0,0 +1,222 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import json
+import queue
+import threading
+
+from models import db, Transaction, InventoryItem, get_data_version
+from business import get_user_id, get_member_role
+
+events_bp = Blueprint("events", __name__)
+
+# Put on a subscriber's queue when it fell too far behind: the client refetches.
+RESYNC = object()
+
+
+class EventBroker:
+    """In-process fan-out of committed changes to open dashboard streams.
+
+    Subscribers only see commits made by their own worker process; the
+    stream's heartbeat compares data versions to catch the others.
+    """
+
+    def __init__(self, max_queued=100):
+        self.max_queued = max_queued
+        self._subscribers = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, business_id):
+        q = queue.Queue(maxsize=self.max_queued)
+        with self._lock:
+            self._subscribers.setdefault(business_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, business_id, q):
+        with self._lock:
+            subs = self._subscribers.get(business_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[business_id]
+                    self._totals.pop(business_id, None)
+
+    def has_subscribers(self, business_id):
+        return business_id in self._subscribers
+
+    def publish(self, business_id, delta):
+        with self._lock:
+            subs = list(self._subscribers.get(business_id, ()))
+        for q in subs:
+            try:
+                q.put_nowait(delta)
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(RESYNC)
+
+    def totals(self, business_id, version):
+        """Dashboard headline totals at `version`, computed once for all of the business's streams."""
+        with self._lock:
+            cached = self._totals.get(business_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        totals = compute_totals(business_id)
+        totals["version"] = version
+        with self._lock:
+            self._totals[business_id] = (version, totals)
+        return totals
+
+
+broker = EventBroker()
+
+
+def compute_totals(business_id, days=30):
+    """The dashboard's default (last `days` days) sales / COGS / expenses / net profit."""
+    from ai_insights import _sum_where
+
+    is_sale = Transaction.type == "Sale"
+    total_sales, total_cogs, total_expenses = db.session.query(
+        _sum_where(Transaction.amount, is_sale),
+        _sum_where(Transaction.cogs, is_sale),
+        _sum_where(Transaction.amount, Transaction.type == "Expense"),
+    ).filter(
+        Transaction.business_id == business_id,
+        Transaction.timestamp >= datetime.utcnow() - timedelta(days=days)
+    ).one()
+    return {
+        "total_sales": total_sales,
+        "total_cogs": total_cogs,
+        "total_expenses": total_expenses,
+        "net_profit": total_sales - total_cogs - total_expenses
+    }
+
+
+def _item_state(item):
+    return {
+        "id": item.id,
+        "name": item.name,
+        "stock_quantity": item.stock_quantity,
+        "reorder_level": item.reorder_level
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deltas(session, flush_context):
+    # Runs while new/dirty/deleted and attribute history still describe the
+    # flush. Deltas wait in session.info until the transaction commits.
+    pending = session.info.setdefault("bulkbins.live_deltas", {})
+
+    def delta_for(business_id):
+        return pending.setdefault(int(business_id), {"totals": False, "items": {}, "alerts": []})
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Transaction) and obj.business_id:
+            delta_for(obj.business_id)["totals"] = True
+        elif isinstance(obj, InventoryItem) and obj.business_id:
+            delta = delta_for(obj.business_id)
+            if obj in session.deleted:
+                delta["items"][obj.id] = {"id": obj.id, "deleted": True}
+                continue
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            delta["items"][obj.id] = _item_state(obj)
+
+            history = inspect(obj).attrs.stock_quantity.history
+            old_stock = history.deleted[0] if history.deleted else None
+            level = obj.reorder_level or 0
+            if (obj.stock_quantity or 0) <= level and (obj in session.new or (old_stock is not None and old_stock > level)):
+                delta["alerts"].append({
+                    "type": "low_stock",
+                    "item_id": obj.id,
+                    "name": obj.name,
+                    "stock_quantity": obj.stock_quantity,
+                    "reorder_level": obj.reorder_level,
+                    "message": f"{obj.name} is down to {obj.stock_quantity} (reorder level {obj.reorder_level})"
+                })
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_deltas(session):
+    for business_id, delta in session.info.pop("bulkbins.live_deltas", {}).items():
+        if broker.has_subscribers(business_id):
+            broker.publish(business_id, {
+                "totals": delta["totals"],
+                "items": list(delta["items"].values()),
+                "alerts": delta["alerts"]
+            })
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_deltas(session, previous_transaction):
+    session.info.pop("bulkbins.live_deltas", None)
+
+
+def _sse(event_name, data):
+    return f"event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@events_bp.route("/businesses/<int:business_id>/events", methods=["GET"])
+def stream_events(business_id):
+    """Server-Sent Events stream of live changes for one business.
+
+    Events: `totals` (dashboard headline numbers), `item` (stock of an
+    inventory item that changed, or {"id", "deleted": true}), `alert`
+    (an item fell to its reorder level) and `resync` (refetch everything).
+    EventSource can't set headers, so the JWT may be passed as ?token=.
+    Each open stream holds a worker thread: run gunicorn with threads.
+    """
+    auth = request.headers.get("Authorization")
+    token = auth.split(" ")[1] if auth else request.args.get("token")
+    if not token:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = get_user_id(token)
+    if not get_member_role(user_id, business_id):
+        return jsonify({"error": "Forbidden"}), 403
+
+    heartbeat = current_app.config.get("SSE_HEARTBEAT_SECONDS", 15)
+
+    def stream():
+        sub = broker.subscribe(business_id)
+        try:
+            version = get_data_version(business_id)
+            yield _sse("totals", broker.totals(business_id, version))
+            db.session.rollback() # don't hold a read transaction open between events
+
+            while True:
+                try:
+                    delta = sub.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Writes made by other worker processes only show up as a new version
+                    current = get_data_version(business_id)
+                    if current != version:
+                        version = current
+                        yield _sse("totals", broker.totals(business_id, version))
+                        yield _sse("resync", {"version": version})
+                    else:
+                        yield ": keep-alive\n\n"
+                    db.session.rollback()
+                    continue
+
+                version = get_data_version(business_id)
+                if delta is RESYNC:
+                    yield _sse("totals", broker.totals(business_id, version))
+                    yield _sse("resync", {"version": version})
+                else:
+                    for item in delta["items"]:
+                        yield _sse("item", item)
+                    for alert in delta["alerts"]:
+                        yield _sse("alert", alert)
+                    if delta["totals"]:
+                        yield _sse("totals", broker.totals(business_id, version))
+                db.session.rollback()
+        finally:
+            broker.unsubscribe(business_id, sub)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no" # let nginx pass events through unbuffered
+    })
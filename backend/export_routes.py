@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, send_file, current_app
 from models import db, Transaction, Business, User, BusinessMember
 from business import get_user_id, get_member_role
-from ai_service import ai_service
+from admission import admit
+from ai_service import ai_service, TransactionSet
 from sqlalchemy import func
 from datetime import datetime, timedelta
 import io
@@ -15,6 +16,7 @@ import numpy as np
 import os
 import tempfile
 from gmail_util import send_gmail
+from deadline import check_deadline, phase, DeadlineExceeded
 import base64
 import threading
 
@@ -346,6 +348,7 @@ def _build_pdf(transactions, business, user, start_date, end_date):
     chart_files = []
     
     # Income vs Expense Chart (Full Width)
+    check_deadline("pdf charts")
     chart_path = _generate_chart('profit_loss', transactions, business.name)
     if chart_path:
         chart_files.append(chart_path)
@@ -353,6 +356,7 @@ def _build_pdf(transactions, business, user, start_date, end_date):
         pdf.ln(5)
     
     # Side by Side Charts
+    check_deadline("pdf charts")
     trend_path = _generate_chart('profit_trend', transactions, business.name)
     breakdown_path = _generate_chart('expense_breakdown', transactions, business.name)
     
@@ -400,6 +404,8 @@ def _build_pdf(transactions, business, user, start_date, end_date):
     alt_fill_color = (248, 250, 252)
 
     for idx, t in enumerate(transactions[:300]): # Limit rows
+        if idx % 50 == 0:
+            check_deadline("pdf table")
         if pdf.get_y() > 270:
             pdf.add_page()
             # Re-print header
@@ -470,15 +476,19 @@ def export_transactions(business_id):
     role = get_member_role(user_id, business_id)
     if not role:
         return jsonify({"error": "Forbidden"}), 403
+    busy = admit(business_id)
+    if busy is not None: return busy
 
     fmt = request.args.get('format', 'csv').lower()
     start_date, end_date = _parse_dates(request)
-    transactions = _fetch_transactions(business_id, start_date, end_date)
+    with phase("load_transactions"):
+        transactions = _fetch_transactions(business_id, start_date, end_date)
     business = Business.query.get(business_id)
     user = User.query.get(user_id)
 
     if fmt == 'csv':
-        data = _build_csv(transactions)
+        with phase("render_csv"):
+            data = _build_csv(transactions)
         return send_file(
             io.BytesIO(data),
             mimetype='text/csv',
@@ -486,7 +496,8 @@ def export_transactions(business_id):
             download_name=f'{business.name}_transactions_{datetime.now().strftime("%Y%m%d")}.csv'
         )
     elif fmt == 'excel':
-        data = _build_excel(transactions, business.name, start_date, end_date)
+        with phase("render_excel"):
+            data = _build_excel(transactions, business.name, start_date, end_date)
         return send_file(
             io.BytesIO(data),
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
@@ -494,7 +505,8 @@ def export_transactions(business_id):
             download_name=f'{business.name}_report_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
     elif fmt == 'pdf':
-        data = _build_pdf(transactions, business, user, start_date, end_date)
+        with phase("render_pdf"):
+            data = _build_pdf(transactions, business, user, start_date, end_date)
         return send_file(
             io.BytesIO(data),
             mimetype='application/pdf',
@@ -517,6 +529,8 @@ def email_report(business_id):
         role = get_member_role(user_id, business_id)
         if not role:
             return jsonify({"error": "Forbidden"}), 403
+        busy = admit(business_id)
+        if busy is not None: return busy
 
         data = request.get_json()
         formats = data.get('formats', ['pdf'])
@@ -525,7 +539,8 @@ def email_report(business_id):
             
         start_date, end_date = _parse_dates(request)
 
-        transactions = _fetch_transactions(business_id, start_date, end_date)
+        with phase("load_transactions"):
+            transactions = _fetch_transactions(business_id, start_date, end_date)
         business = Business.query.get(business_id)
         user = User.query.get(user_id)
 
@@ -562,17 +577,11 @@ def email_report(business_id):
         inventory_items = [i for i in business.items]
         inventory_data = [{"id": i.id, "name": i.name, "stock_quantity": i.stock_quantity, "reorder_level": i.reorder_level, "lead_time": i.lead_time} for i in inventory_items]
         
-        # Format transactions for AI service
-        ai_txns = [{
-            "timestamp": t.timestamp.isoformat(),
-            "amount": t.amount,
-            "type": t.type,
-            "profit": t.profit,
-            "inventory_item_id": t.inventory_item_id,
-            "quantity": t.quantity
-        } for t in transactions]
+        # The rows loaded above, as columns for the AI service
+        ai_txns = TransactionSet.from_rows(transactions)
         
-        ai_dashboard = ai_service.get_dashboard_stats(ai_txns, inventory_data)
+        with phase("ai_insights"):
+            ai_dashboard = ai_service.get_dashboard_stats(ai_txns, inventory_data)
         
         ai_summary_html = ""
         if ai_dashboard.get('alerts'):
@@ -616,6 +625,7 @@ def email_report(business_id):
         gmail_attachments = []
         for fmt in formats:
             fmt = fmt.lower()
+            check_deadline(f"render_{fmt}")
             if fmt == 'csv':
                 file_data = _build_csv(transactions)
                 filename = f'{business.name}_transactions.csv'
@@ -647,6 +657,8 @@ def email_report(business_id):
             "email": recipient
         }), 200
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ EMAIL ERROR: {str(e)}")
         import traceback
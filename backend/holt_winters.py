@@ -0,0 +1,92 @@
+import numpy as np
+
+# Forecasting modes the reorder and analysis endpoints accept (?mode=)
+FORECAST_MODES = ("linear", "holt-winters")
+
+
+def mode_error(mode):
+    """The 400 message for a ?mode= that is not in FORECAST_MODES, else None."""
+    if mode not in FORECAST_MODES:
+        return f"Invalid mode '{mode}', expected one of {', '.join(FORECAST_MODES)}"
+    return None
+
+# (alpha, beta, gamma) candidates; every series picks the one with the
+# smallest one-step-ahead squared error over its history
+GRID = tuple((a, b, g) for a in (0.1, 0.3, 0.5) for b in (0.01, 0.1) for g in (0.05, 0.2))
+
+
+def fit_holt_winters(Y, season_length=7, first=None, grid=GRID):
+    """
+    Additive Holt-Winters (level + trend + seasonal) for every row of Y at once.
+
+    Y is a series x periods matrix; row i starts at period first[i] (default
+    0) and earlier periods are ignored. Every row is run with every
+    (alpha, beta, gamma) in `grid` as one stacked matrix, so the Python loop
+    is over periods only and each step is a handful of whole-array ops.
+    Level starts at the row's mean, trend at 0 and the seasonal terms at the
+    row's mean deviation per position in the season. With season_length
+    None it is plain Holt (level + trend): the seasonal term stays 0 and
+    only the (alpha, beta) pairs of the grid are tried.
+
+    Returns a dict of per-row arrays: level, trend, season (rows x
+    season_length, indexed by period % season_length; rows x 1 of zeros
+    without a season), alpha, beta, gamma, rmse (one-step-ahead) and
+    observations, plus `periods` = Y's width.
+    """
+    Y = np.asarray(Y, dtype=float)
+    n_series, periods = Y.shape
+    seasonal = season_length is not None
+    m = season_length if seasonal else 1
+    if not seasonal:
+        grid = tuple(dict.fromkeys((a, b, 0.0) for a, b, _ in grid))
+    first = np.zeros(n_series, dtype=int) if first is None else np.asarray(first)
+    t = np.arange(periods)
+    W = t[None, :] >= first[:, None]
+    observations = W.sum(axis=1)
+
+    mean = np.divide((Y * W).sum(axis=1), observations, out=np.zeros(n_series), where=observations > 0)
+    onehot = (t[:, None] % m == np.arange(m)[None, :]).astype(float)
+    counts = W.astype(float) @ onehot
+    season0 = np.divide((Y * W) @ onehot, counts, out=np.repeat(mean[:, None], m, axis=1), where=counts > 0)
+    season0 -= season0.mean(axis=1, keepdims=True) # all 0 when m == 1
+
+    # Row g * n_series + i runs series i with grid[g]
+    n_grid = len(grid)
+    alpha, beta, gamma = (np.repeat(np.array(p, dtype=float), n_series) for p in zip(*grid))
+    Yg = np.tile(Y, (n_grid, 1))
+    Wg = np.tile(W, (n_grid, 1))
+    level = np.tile(mean, n_grid)
+    trend = np.zeros(n_series * n_grid)
+    season = np.tile(season0, (n_grid, 1))
+    sse = np.zeros(n_series * n_grid)
+
+    for i in range(periods):
+        y, on, k = Yg[:, i], Wg[:, i], i % m
+        s = season[:, k]
+        error = y - (level + trend + s)
+        sse += np.where(on, error * error, 0)
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = np.where(on, beta * (new_level - level) + (1 - beta) * trend, trend)
+        if seasonal:
+            season[:, k] = np.where(on, gamma * (y - new_level) + (1 - gamma) * s, s)
+        level = np.where(on, new_level, level)
+
+    best = sse.reshape(n_grid, n_series).argmin(axis=0) * n_series + np.arange(n_series)
+    return {
+        "level": level[best],
+        "trend": trend[best],
+        "season": season[best],
+        "alpha": alpha[best],
+        "beta": beta[best],
+        "gamma": gamma[best],
+        "rmse": np.sqrt(np.divide(sse[best], observations, out=np.zeros(n_series), where=observations > 0)),
+        "observations": observations,
+        "periods": periods,
+    }
+
+
+def forecast_holt_winters(level, trend, season, periods, horizon):
+    """rows x horizon forecasts for the `horizon` periods after a fit over `periods` periods."""
+    level, trend, season = np.asarray(level, dtype=float), np.asarray(trend, dtype=float), np.asarray(season, dtype=float)
+    h = np.arange(1, horizon + 1)
+    return level[:, None] + trend[:, None] * h[None, :] + season[:, (periods + h - 1) % season.shape[1]]
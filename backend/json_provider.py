@@ -0,0 +1,69 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime
+from decimal import Decimal
+import numpy as np
+
+# orjson is optional: when it is installed responses are encoded natively
+# (datetimes, numpy scalars and arrays included), otherwise we fall back to
+# the stdlib encoder with the same type coverage.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """Serialize the types our analytics code returns that json can't."""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if hasattr(o, 'isoformat'):  # pandas.Timestamp, pandas.Period start times
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when available.
+
+    Handles datetime/date (ISO 8601), numpy scalars/arrays and pandas
+    timestamps directly, so routes can return query and DataFrame values
+    without converting every field by hand. Snapshot payloads are encoded
+    with it too (app.json.dumps); anything stored with the stdlib json
+    module, such as model registry params, still converts its own values.
+
+    Note that a raw datetime comes out as ISO 8601 ('2026-10-19T05:00:00'),
+    where Flask's default provider writes an HTTP date.
+    """
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self):
+        opts = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opts |= orjson.OPT_SORT_KEYS
+        return opts
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._orjson_options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Pretty-printing in debug mode keeps the stdlib path.
+        if orjson is None or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._orjson_options())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
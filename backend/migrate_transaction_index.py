@@ -0,0 +1,21 @@
+import sqlite3
+import os
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'bulkbins.db')
+
+def migrate():
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_transaction_business_timestamp ON "transaction" (business_id, timestamp)')
+        print("✅ Index on transaction(business_id, timestamp) is in place.")
+    except sqlite3.OperationalError as e:
+        print(f"❌ Error creating index: {e}")
+            
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,109 @@
+from datetime import datetime
+from functools import partial
+import json
+import time
+
+from sqlalchemy import and_, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, ForecastModel
+from result_cache import MemoryBackend
+
+
+class ModelRegistry:
+    """Fitted forecast parameters per (business, series, granularity, scope).
+
+    Scope is anything else the fit depends on, e.g. a date range. A model is
+    valid for the business data version it was fitted at; every
+    transaction/inventory write bumps the version (see models.py), so models
+    are only refitted after the data changed. Models are stored in the
+    ForecastModel table, shared by all workers, with an in-process LRU in
+    front so a hit costs no query. Rows are read and written on their own
+    connection, never committing the caller's session. If that session has
+    written in its open transaction, the fit may have seen those writes, so
+    the model is only stored once they commit (and dropped on rollback);
+    this also keeps the own connection clear of the session's SQLite lock.
+    Params and metrics must be JSON-serializable.
+    """
+
+    def __init__(self, max_entries=256):
+        self._memory = MemoryBackend(max_entries)
+
+    def fitted(self, business_id, series, granularity, version, fit, scope=None):
+        """Params of the model fitted at `version`, calling fit() -> (params, metrics) if there is none.
+
+        Pass the version read before loading the data `fit` uses, so a write
+        landing in between leaves the model one version behind, never ahead.
+        """
+        key = (business_id, series, granularity, scope or "")
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        table = ForecastModel.__table__
+        match = and_(*(column == value for column, value in zip(
+            (table.c.business_id, table.c.series, table.c.granularity, table.c.scope), key)))
+        # Own connection: callers are GET handlers and workers whose session must not be committed here
+        with db.engine.connect() as conn:
+            row = conn.execute(select(table.c.data_version, table.c.params).where(match)).first()
+        if row is not None and row.data_version == version:
+            params = json.loads(row.params)
+            self._memory.set(key, (version, params))
+            return params
+
+        started = time.perf_counter()
+        params, metrics = fit()
+        save = partial(self._save, table, match, key, version, params, metrics, time.perf_counter() - started)
+        session = db.session()
+        if _has_writes(session):
+            session.info.setdefault("deferred_models", []).append(save)
+        else:
+            save()
+        return params
+
+    def _save(self, table, match, key, version, params, metrics, fit_seconds):
+        values = {
+            "data_version": version,
+            "params": json.dumps(params),
+            "metrics": json.dumps(metrics),
+            "fit_seconds": fit_seconds,
+            "fitted_at": datetime.now(),
+        }
+        business_id, series, granularity, scope = key
+        try:
+            with db.engine.begin() as conn:
+                if conn.execute(table.update().where(match).values(**values)).rowcount == 0:
+                    conn.execute(table.insert().values(business_id=business_id, series=series,
+                                                       granularity=granularity, scope=scope, **values))
+        except IntegrityError:
+            pass # Another worker stored the same model first; this one is still good to serve
+        self._memory.set(key, (version, params))
+
+    def clear(self):
+        self._memory.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def _has_writes(session):
+    return bool(session.new or session.dirty or session.deleted or session.info.get("flushed_writes"))
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_writes(session, flush_context):
+    session.info["flushed_writes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _save_deferred_models(session):
+    session.info.pop("flushed_writes", None)
+    for save in session.info.pop("deferred_models", []):
+        save()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_deferred_models(session):
+    session.info.pop("flushed_writes", None)
+    session.info.pop("deferred_models", None)
@@ -1,6 +1,8 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import case, event, inspect, select, func
+from sqlalchemy.orm import Session
+from datetime import date, datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
@@ -31,11 +33,17 @@ class Business(db.Model):
     secondary_email = db.Column(db.String(120), nullable=True)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     logo_url = db.Column(db.String(500), nullable=True)
+    data_version = db.Column(db.Integer, default=0, nullable=False) # Bumped on every transaction/inventory write
     
     # Relationships
     members = db.relationship('BusinessMember', backref='business', lazy=True, cascade="all, delete-orphan")
     transactions = db.relationship('Transaction', backref='business', lazy=True, cascade="all, delete-orphan")
     items = db.relationship('InventoryItem', backref='business', lazy=True, cascade="all, delete-orphan")
+    snapshots = db.relationship('DashboardSnapshot', backref='business', lazy=True, cascade="all, delete-orphan")
+    rollups = db.relationship('DailyRollup', lazy=True, cascade="all, delete-orphan")
+    trends = db.relationship('TrendStats', lazy=True, cascade="all, delete-orphan")
+    trend_prefixes = db.relationship('TrendPrefix', lazy=True, cascade="all, delete-orphan")
+    forecast_models = db.relationship('ForecastModel', lazy=True, cascade="all, delete-orphan")
 
 class BusinessMember(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -64,6 +72,9 @@ class Transaction(db.Model):
     # Relationship
     inventory_item = db.relationship('InventoryItem', backref='transactions', lazy=True)
 
+    # Every report filters one business's transactions by date range
+    __table_args__ = (db.Index('ix_transaction_business_timestamp', 'business_id', 'timestamp'),)
+
 class InventoryItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
@@ -75,3 +86,305 @@ class InventoryItem(db.Model):
     selling_price = db.Column(db.Float)
     category = db.Column(db.String(50))
     lead_time = db.Column(db.Integer, default=1) # Lead time in days
+
+class DailyRollup(db.Model):
+    """Per-day totals of a business's transactions, kept in step with every write (see below).
+
+    Rows are additive: readers always SUM them, so a key occurring twice
+    (two writers inserting the same new day at once) is harmless.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    type = db.Column(db.String(20))
+    category = db.Column(db.String(50))
+    inventory_item_id = db.Column(db.Integer, nullable=True) # Not a foreign key: history outlives deleted items
+    amount = db.Column(db.Float, default=0.0, nullable=False)
+    quantity = db.Column(db.Integer, default=0, nullable=False)
+    profit = db.Column(db.Float, default=0.0, nullable=False)
+    cogs = db.Column(db.Float, default=0.0, nullable=False)
+    txn_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (db.Index('ix_daily_rollup_business_day', 'business_id', 'day'),)
+
+class TrendStats(db.Model):
+    """Running least-squares sums of one daily series, kept in step with every write (see below).
+
+    x counts calendar days from `origin` and days without transactions are 0,
+    so n, Σx and Σx² follow from the span alone; only the sums involving y
+    are stored. trends.py turns a row into a fitted line.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
+    series = db.Column(db.String(20), nullable=False) # profit, expense, or units of one item
+    inventory_item_id = db.Column(db.Integer, nullable=True) # Set for per-item series only
+    origin = db.Column(db.Date, nullable=False) # x = 0
+    last_day = db.Column(db.Date, nullable=False) # Latest day with data
+    sum_y = db.Column(db.Float, default=0.0, nullable=False)
+    sum_xy = db.Column(db.Float, default=0.0, nullable=False)
+    sum_yy = db.Column(db.Float, default=0.0, nullable=False)
+    active_days = db.Column(db.Integer, default=0, nullable=False) # Days with a nonzero value
+
+    __table_args__ = (db.Index('ix_trend_stats_business_series', 'business_id', 'series'),)
+
+class TrendPrefix(db.Model):
+    """Running sums of a daily series from its first day up to and including `day`.
+
+    One row per day a write touched. The row at or before a window's end
+    minus the row at or before its start gives the window's sums, so a
+    windowed trend (trends.sales_forecast) reads a fixed number of rows
+    however long the window or the history. x counts days from TREND_EPOCH.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
+    series = db.Column(db.String(20), nullable=False) # sales
+    day = db.Column(db.Date, nullable=False)
+    value = db.Column(db.Float, default=0.0, nullable=False) # The day's own total
+    sum_y = db.Column(db.Float, default=0.0, nullable=False)
+    sum_xy = db.Column(db.Float, default=0.0, nullable=False)
+    sum_yy = db.Column(db.Float, default=0.0, nullable=False)
+    active_days = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('business_id', 'series', 'day', name='unique_trend_prefix'),)
+
+class ForecastModel(db.Model):
+    """Fitted forecast parameters, reused until the business's data changes (see model_registry.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
+    series = db.Column(db.String(40), nullable=False) # e.g. units, analysis
+    granularity = db.Column(db.String(20), nullable=False) # daily, weekly, monthly, ...
+    scope = db.Column(db.String(80), nullable=False, default='') # Anything else the fit depends on, e.g. a date range
+    data_version = db.Column(db.Integer, nullable=False) # Business.data_version it was fitted at
+    params = db.Column(db.Text, nullable=False) # JSON
+    metrics = db.Column(db.Text, nullable=True) # JSON: observations, in-sample error, ...
+    fit_seconds = db.Column(db.Float)
+    fitted_at = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (db.UniqueConstraint('business_id', 'series', 'granularity', 'scope', name='unique_forecast_model'),)
+
+class DashboardSnapshot(db.Model):
+    """A dashboard payload precomputed off the request path (see snapshots.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
+    kind = db.Column(db.String(40), nullable=False) # dashboard, pnl, inventory-insights
+    payload = db.Column(db.Text, nullable=False) # JSON, exactly as the endpoint would return it
+    data_version = db.Column(db.Integer, nullable=False) # Business.data_version it was computed at
+    computed_at = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (db.UniqueConstraint('business_id', 'kind', name='unique_snapshot'),)
+
+
+def get_data_version(business_id):
+    """Current data version of a business; changes whenever its transactions or inventory do."""
+    return db.session.query(Business.data_version).filter(Business.id == business_id).scalar() or 0
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_data_versions(session, flush_context, instances):
+    # Every write path (routes, imports, seed scripts) goes through a flush,
+    # so versioning here keeps cached/coalesced results honest without each
+    # route having to remember to do it.
+    business_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Transaction, InventoryItem)) and obj.business_id:
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            business_ids.add(int(obj.business_id))
+    if business_ids:
+        session.execute(
+            db.update(Business)
+            .where(Business.id.in_(business_ids))
+            .values(data_version=db.func.coalesce(Business.data_version, 0) + 1)
+        )
+
+
+ROLLUP_KEY = ("business_id", "type", "category", "inventory_item_id")
+ROLLUP_MEASURES = ("amount", "quantity", "profit", "cogs")
+
+
+def _rollup_row(txn, committed=False):
+    """(key, measures) a transaction contributes to DailyRollup; committed=True gives its pre-flush values."""
+    def value(attr):
+        if committed:
+            history = inspect(txn).attrs[attr].history
+            if history.deleted:
+                return history.deleted[0]
+            if history.added:
+                return None
+        return getattr(txn, attr)
+
+    timestamp = value("timestamp")
+    key = (int(value("business_id")), timestamp.date()) + tuple(value(a) for a in ROLLUP_KEY[1:])
+    return key, tuple(value(m) or 0 for m in ROLLUP_MEASURES)
+
+
+def apply_rollup_deltas(session, deltas):
+    """Adds {(business_id, day, type, category, item_id): [amount, quantity, profit, cogs, count]} to DailyRollup."""
+    table = DailyRollup.__table__
+    for (business_id, day, txn_type, category, item_id), (amount, quantity, profit, cogs, count) in deltas.items():
+        if not (amount or quantity or profit or cogs or count):
+            continue
+        match = [table.c.business_id == business_id, table.c.day == day]
+        for column, v in ((table.c.type, txn_type), (table.c.category, category), (table.c.inventory_item_id, item_id)):
+            match.append(column.is_(None) if v is None else column == v)
+        updated = session.execute(
+            table.update().where(*match).values(
+                amount=table.c.amount + amount,
+                quantity=table.c.quantity + quantity,
+                profit=table.c.profit + profit,
+                cogs=table.c.cogs + cogs,
+                txn_count=table.c.txn_count + count
+            )
+        )
+        if updated.rowcount == 0:
+            session.execute(table.insert().values(
+                business_id=business_id, day=day, type=txn_type, category=category, inventory_item_id=item_id,
+                amount=amount, quantity=quantity, profit=profit, cogs=cogs, txn_count=count
+            ))
+
+
+# Series kept as per-day running sums (TrendPrefix) instead of one TrendStats row
+PREFIX_SERIES = ("sales",)
+TREND_EPOCH = date(2000, 1, 1)
+
+
+def _trend_points(key, measures):
+    """(series, item_id, value) a rollup key and its (amount, quantity, profit, ...) add to the trend series."""
+    txn_type, item_id = key[2], key[4]
+    amount, quantity, profit = measures[:3]
+    yield "profit", None, profit
+    if txn_type == 'Sale':
+        yield "sales", None, amount
+        if item_id is not None:
+            yield "units", item_id, quantity
+    elif (txn_type or '').lower() == 'expense':
+        yield "expense", None, amount
+
+
+def _active(value):
+    # Float sums of a day's writes and reversals can leave dust instead of 0
+    return 1 if abs(value) > 1e-9 else 0
+
+
+def apply_trend_deltas(session, deltas):
+    """Folds DailyRollup-shaped deltas into TrendStats and TrendPrefix. Must run before the rollups themselves change."""
+    changes = {} # (business_id, series, item_id) -> {day: change in the day's value}
+    for key, measures in deltas.items():
+        if not any(measures):
+            continue
+        # A zero value still extends the series: rebuild_trends sees the rollup row it leaves
+        for series, item_id, value in _trend_points(key, measures):
+            days = changes.setdefault((key[0], series, item_id), {})
+            days[key[1]] = days.get(key[1], 0) + value
+    if not changes:
+        return
+
+    # Each touched day's value before this flush, for the change in Σy² and in active days
+    business_ids = {k[0] for k in changes}
+    rollup = DailyRollup.__table__
+    before = {}
+    rows = session.execute(select(
+        rollup.c.business_id, rollup.c.day, rollup.c.type, rollup.c.inventory_item_id,
+        func.sum(rollup.c.amount), func.sum(rollup.c.quantity), func.sum(rollup.c.profit)
+    ).where(
+        rollup.c.business_id.in_(business_ids),
+        rollup.c.day.in_({day for days in changes.values() for day in days})
+    ).group_by(rollup.c.business_id, rollup.c.day, rollup.c.type, rollup.c.inventory_item_id))
+    for bid, day, txn_type, item_id, *measures in rows:
+        for series, series_item, value in _trend_points((bid, day, txn_type, None, item_id), measures):
+            k = (bid, series, series_item, day)
+            before[k] = before.get(k, 0) + (value or 0)
+
+    table = TrendStats.__table__
+    existing = {(r.business_id, r.series, r.inventory_item_id): r for r in session.execute(
+        select(table).where(table.c.business_id.in_(business_ids)))}
+
+    for (bid, series, item_id), days in changes.items():
+        if series in PREFIX_SERIES:
+            _apply_prefix_deltas(session, bid, series, {d: (before.get((bid, series, None, d), 0), v)
+                                                        for d, v in days.items()})
+            continue
+        row = existing.get((bid, series, item_id))
+        origin = min(days) if row is None else min(row.origin, min(days))
+        last_day = max(days) if row is None else max(row.last_day, max(days))
+        d_y = d_xy = d_yy = d_active = 0
+        for day, delta in days.items():
+            x = (day - origin).days
+            y = before.get((bid, series, item_id, day), 0)
+            d_y += delta
+            d_xy += x * delta
+            d_yy += 2 * y * delta + delta * delta
+            d_active += _active(y + delta) - _active(y)
+
+        if row is None:
+            session.execute(table.insert().values(
+                business_id=bid, series=series, inventory_item_id=item_id, origin=origin, last_day=last_day,
+                sum_y=d_y, sum_xy=d_xy, sum_yy=d_yy, active_days=d_active
+            ))
+        else:
+            # Moving the origin back k days adds k to every existing x, so k * Σy to Σxy;
+            # increments keep concurrent writers from overwriting each other's sums
+            shift = (row.origin - origin).days
+            session.execute(table.update().where(table.c.id == row.id).values(
+                origin=origin, last_day=last_day,
+                sum_y=table.c.sum_y + d_y,
+                sum_xy=table.c.sum_xy + shift * table.c.sum_y + d_xy,
+                sum_yy=table.c.sum_yy + d_yy,
+                active_days=table.c.active_days + d_active
+            ))
+
+
+def _apply_prefix_deltas(session, business_id, series, days):
+    """Adds {day: (value before, change)} to a TrendPrefix series: the day's row and every later one."""
+    table = TrendPrefix.__table__
+    match = (table.c.business_id == business_id, table.c.series == series)
+    sums = (table.c.sum_y, table.c.sum_xy, table.c.sum_yy, table.c.active_days)
+    for day in sorted(days):
+        y, delta = days[day]
+        if session.execute(select(table.c.id).where(*match, table.c.day == day)).first() is None:
+            # A new day starts from the running sums of the day before it
+            previous = session.execute(select(*sums).where(*match, table.c.day < day)
+                                       .order_by(table.c.day.desc()).limit(1)).first()
+            session.execute(table.insert().values(
+                business_id=business_id, series=series, day=day, value=0,
+                **dict(zip(("sum_y", "sum_xy", "sum_yy", "active_days"), previous or (0, 0, 0, 0)))
+            ))
+        x = (day - TREND_EPOCH).days
+        session.execute(table.update().where(*match, table.c.day >= day).values(
+            value=table.c.value + case((table.c.day == day, delta), else_=0),
+            sum_y=table.c.sum_y + delta,
+            sum_xy=table.c.sum_xy + x * delta,
+            sum_yy=table.c.sum_yy + 2 * y * delta + delta * delta,
+            active_days=table.c.active_days + _active(y + delta) - _active(y)
+        ))
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_daily_rollups(session, flush_context, instances):
+    # Subtract what a changed/deleted transaction used to contribute and add
+    # what it contributes now, in the same database transaction as the write.
+    deltas = {}
+
+    def add(txn, sign, committed=False):
+        key, measures = _rollup_row(txn, committed)
+        totals = deltas.setdefault(key, [0, 0, 0, 0, 0])
+        for i, m in enumerate(measures):
+            totals[i] += sign * m
+        totals[4] += sign
+
+    for obj in session.new:
+        if isinstance(obj, Transaction) and obj.business_id:
+            if obj.timestamp is None:
+                obj.timestamp = datetime.utcnow()
+            add(obj, 1)
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            add(obj, -1, committed=True)
+            add(obj, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            add(obj, -1, committed=True)
+
+    if deltas:
+        apply_trend_deltas(session, deltas) # reads the rollups as they were before this flush
+        apply_rollup_deltas(session, deltas)
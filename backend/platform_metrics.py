@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, distinct
+
+from models import db, Business, InventoryItem, DailyRollup
+from ai_insights import _sum_where
+
+# Rough on-disk size of one row, for the storage footprint estimate
+ROW_BYTES = {"transactions": 320, "inventory_items": 200, "rollups": 96}
+
+
+def business_status_counts():
+    """{status: count} for every business, in one grouped query."""
+    rows = db.session.query(Business.status, func.count(Business.id)).group_by(Business.status).all()
+    counts = {"approved": 0, "pending": 0, "rejected": 0}
+    for status, count in rows:
+        counts[status or 'approved'] = counts.get(status or 'approved', 0) + count
+    return counts
+
+
+def compute_platform_metrics(days=30, today=None):
+    """GMV, transaction volume, active businesses and per-tenant footprint.
+
+    Everything comes from DailyRollup (kept current by every write, see
+    models.py), the inventory and the business table; the transaction table
+    itself is never scanned. A business is active if it recorded a
+    transaction in the last `days` days.
+    """
+    today = today or datetime.now().date()
+    since = today - timedelta(days=days)
+    is_sale = DailyRollup.type == 'Sale'
+
+    # 1. Platform-wide series: GMV (per currency), volume and active businesses per day
+    daily_rows = db.session.query(
+        DailyRollup.day,
+        Business.currency,
+        _sum_where(DailyRollup.amount, is_sale),
+        func.sum(DailyRollup.txn_count),
+        func.count(distinct(DailyRollup.business_id))
+    ).join(
+        Business, Business.id == DailyRollup.business_id
+    ).filter(
+        DailyRollup.day >= since
+    ).group_by(DailyRollup.day, Business.currency).having(func.sum(DailyRollup.txn_count) > 0).all()
+
+    daily = {}
+    for day, currency, gmv, count, active in daily_rows:
+        entry = daily.setdefault(day, {"date": day.isoformat(), "gmv": {}, "transactions": 0, "active_businesses": 0})
+        entry["gmv"][currency or 'INR'] = entry["gmv"].get(currency or 'INR', 0) + gmv
+        entry["transactions"] += count
+        entry["active_businesses"] += active # each business has one currency, so these don't overlap
+
+    # 2. Per tenant: all-time volume and GMV, recent GMV, last activity, rollup rows
+    in_window = DailyRollup.day >= since
+    tenant_rows = db.session.query(
+        DailyRollup.business_id,
+        func.sum(DailyRollup.txn_count),
+        _sum_where(DailyRollup.amount, is_sale),
+        _sum_where(DailyRollup.amount, is_sale, in_window),
+        _sum_where(DailyRollup.txn_count, in_window),
+        func.max(DailyRollup.day),
+        func.count(DailyRollup.id)
+    ).group_by(DailyRollup.business_id).all()
+
+    # 3. Inventory size per tenant
+    item_counts = dict(db.session.query(
+        InventoryItem.business_id, func.count(InventoryItem.id)
+    ).group_by(InventoryItem.business_id).all())
+
+    businesses = db.session.query(Business.id, Business.name, Business.status, Business.currency).all()
+    statuses = business_status_counts()
+
+    tenants = {b.id: {
+        "business_id": b.id, "name": b.name, "status": b.status or 'approved', "currency": b.currency,
+        "transactions": 0, "gmv": 0, "gmv_recent": 0, "transactions_recent": 0, "last_active": None,
+        "inventory_items": item_counts.get(b.id, 0), "rollup_rows": 0
+    } for b in businesses}
+    for bid, count, gmv, gmv_recent, count_recent, last_day, rollup_rows in tenant_rows:
+        if bid not in tenants:
+            continue
+        tenants[bid].update({
+            "transactions": count or 0, "gmv": gmv, "gmv_recent": gmv_recent,
+            "transactions_recent": count_recent, "rollup_rows": rollup_rows,
+            "last_active": last_day.isoformat() if count else None
+        })
+    for t in tenants.values():
+        t["estimated_bytes"] = (t["transactions"] * ROW_BYTES["transactions"]
+                                + t["inventory_items"] * ROW_BYTES["inventory_items"]
+                                + t["rollup_rows"] * ROW_BYTES["rollups"])
+
+    # GMV is summed per currency: tenants don't share one
+    gmv_by_currency = {}
+    for t in tenants.values():
+        gmv_by_currency[t["currency"] or 'INR'] = gmv_by_currency.get(t["currency"] or 'INR', 0) + t["gmv_recent"]
+
+    return {
+        "window_days": days,
+        "gmv_by_currency": gmv_by_currency,
+        "transactions": sum(t["transactions_recent"] for t in tenants.values()),
+        "active_businesses": sum(1 for t in tenants.values() if t["transactions_recent"]),
+        "businesses": statuses,
+        "daily": [daily[d] for d in sorted(daily)],
+        "tenants": sorted(tenants.values(), key=lambda t: t["estimated_bytes"], reverse=True)
+    }
@@ -0,0 +1,153 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import case, and_
+from datetime import datetime, timedelta
+
+from admission import heavy_request
+from models import db, User, Business, BusinessMember, InventoryItem, DailyRollup
+from ai_insights import _sum_where
+from rollups import period_start, next_period, period_label
+from result_cache import result_cache
+
+portfolio_bp = Blueprint("portfolio", __name__)
+
+ANALYTICS_ROLES = ('Owner', 'Accountant', 'Analyst')
+TREND_MONTHS = 6
+ALERTS_PER_BUSINESS = 5
+
+
+def compute_portfolio(business_ids, today=None, days=30):
+    """KPIs, monthly trend and alerts for many businesses at once.
+
+    Reads DailyRollup and the inventory with one grouped query per section,
+    so the number of queries does not grow with the number of businesses.
+    Returns {business_id: {"kpis", "trend", "alerts"}}.
+    """
+    today = today or datetime.now().date()
+    start = today - timedelta(days=days)
+    this_month = period_start(today, "monthly")
+    last_month = period_start(this_month - timedelta(days=1), "monthly")
+    months = [this_month]
+    while len(months) < TREND_MONTHS:
+        months.insert(0, period_start(months[0] - timedelta(days=1), "monthly"))
+
+    results = {bid: {
+        "kpis": {"total_sales": 0, "total_cogs": 0, "total_expenses": 0, "net_profit": 0,
+                 "transactions": 0, "this_month_sales": 0, "last_month_sales": 0},
+        "trend": [{"month": period_label(m, "monthly"), "sales": 0, "expenses": 0} for m in months],
+        "alerts": []
+    } for bid in business_ids}
+    if not business_ids:
+        return results
+
+    # 1. KPIs (same window as the dashboard's default) and month-over-month sales
+    is_sale = DailyRollup.type == 'Sale'
+    in_range = DailyRollup.day >= start
+    kpi_rows = db.session.query(
+        DailyRollup.business_id,
+        _sum_where(DailyRollup.amount, is_sale, in_range),
+        _sum_where(DailyRollup.cogs, is_sale, in_range),
+        _sum_where(DailyRollup.amount, DailyRollup.type == 'Expense', in_range),
+        _sum_where(DailyRollup.txn_count, in_range),
+        _sum_where(DailyRollup.amount, is_sale, DailyRollup.day >= this_month),
+        _sum_where(DailyRollup.amount, is_sale, DailyRollup.day >= last_month, DailyRollup.day < this_month)
+    ).filter(
+        DailyRollup.business_id.in_(business_ids),
+        DailyRollup.day >= min(start, last_month)
+    ).group_by(DailyRollup.business_id).all()
+
+    for bid, sales, cogs, expenses, count, this_sales, last_sales in kpi_rows:
+        results[bid]["kpis"] = {
+            "total_sales": sales,
+            "total_cogs": cogs,
+            "total_expenses": expenses,
+            "net_profit": sales - cogs - expenses,
+            "transactions": count,
+            "this_month_sales": this_sales,
+            "last_month_sales": last_sales
+        }
+
+    # 2. Monthly sales/expense trend
+    month_bucket = case(*[
+        (and_(DailyRollup.day >= m, DailyRollup.day < next_period(m, "monthly")), i)
+        for i, m in enumerate(months)
+    ])
+    trend_rows = db.session.query(
+        DailyRollup.business_id,
+        month_bucket,
+        _sum_where(DailyRollup.amount, is_sale),
+        _sum_where(DailyRollup.amount, DailyRollup.type != 'Sale')
+    ).filter(
+        DailyRollup.business_id.in_(business_ids),
+        DailyRollup.day >= months[0]
+    ).group_by(DailyRollup.business_id, month_bucket).all()
+
+    for bid, i, sales, expenses in trend_rows:
+        if i is not None:
+            results[bid]["trend"][i]["sales"] = sales
+            results[bid]["trend"][i]["expenses"] = expenses
+
+    # 3. Low-stock alerts, most urgent first
+    low_stock = InventoryItem.query.filter(
+        InventoryItem.business_id.in_(business_ids),
+        InventoryItem.stock_quantity <= InventoryItem.reorder_level
+    ).order_by(InventoryItem.business_id, InventoryItem.stock_quantity).all()
+
+    for item in low_stock:
+        alerts = results[item.business_id]["alerts"]
+        if sum(1 for a in alerts if a["type"] == "low_stock") < ALERTS_PER_BUSINESS:
+            alerts.append({
+                "type": "low_stock",
+                "item_id": item.id,
+                "message": f"{item.name} is down to {item.stock_quantity} (reorder level {item.reorder_level})"
+            })
+
+    return results
+
+
+@portfolio_bp.route("/portfolio/dashboard", methods=["GET"])
+@jwt_required()
+@heavy_request
+def get_portfolio_dashboard():
+    """One dashboard across every business the user can see analytics for.
+
+    Businesses whose data version is unchanged come from the result cache;
+    the rest are computed together by compute_portfolio.
+    """
+    user = User.query.filter_by(email=get_jwt_identity()).first()
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    memberships = db.session.query(BusinessMember.role, Business).join(
+        Business, Business.id == BusinessMember.business_id
+    ).filter(
+        BusinessMember.user_id == user.id,
+        BusinessMember.role.in_(ANALYTICS_ROLES)
+    ).order_by(Business.name).all()
+
+    versions = {biz.id: biz.data_version for _, biz in memberships}
+    sections = {}
+    missing = []
+    for _, biz in memberships:
+        cached = result_cache.peek("portfolio", biz.id, {}, versions[biz.id])
+        if cached is None:
+            missing.append(biz.id)
+        else:
+            sections[biz.id] = cached
+    for bid, section in compute_portfolio(missing).items():
+        result_cache.put("portfolio", bid, {}, versions[bid], section)
+        sections[bid] = section
+
+    businesses = []
+    totals_by_currency = {}
+    for role, biz in memberships:
+        section = sections[biz.id]
+        businesses.append({"id": biz.id, "name": biz.name, "role": role, "currency": biz.currency,
+                           "status": biz.status or 'approved', **section})
+        totals = totals_by_currency.setdefault(biz.currency or 'INR', {
+            "total_sales": 0, "total_expenses": 0, "net_profit": 0, "businesses": 0})
+        for k in ("total_sales", "total_expenses", "net_profit"):
+            totals[k] += section["kpis"][k]
+        totals["businesses"] += 1
+
+    return jsonify({"businesses": businesses, "totals_by_currency": totals_by_currency}), 200
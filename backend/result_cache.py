@@ -0,0 +1,151 @@
+from flask import current_app
+from collections import OrderedDict, namedtuple
+from datetime import date
+import threading
+import time
+
+from coalesce import single_flight, normalize_params
+from models import get_data_version
+
+# value: the computed payload; version: the business data version it was computed at
+CacheEntry = namedtuple("CacheEntry", ["version", "value", "computed_at"])
+
+
+class MemoryBackend:
+    """In-process LRU cache bounded by entry count."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class NullBackend:
+    """Caches nothing; every request recomputes (still coalesced)."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, entry):
+        pass
+
+    def clear(self):
+        pass
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "none": NullBackend,
+}
+
+
+class ResultCache:
+    """Caches endpoint results per (endpoint, business, params, day).
+
+    Each entry remembers the business data version it was computed at. Every
+    transaction/inventory write bumps that version (see models.py), so an
+    entry is only served while it is current. With stale_while_revalidate
+    on, an outdated entry is served once more while a background thread
+    recomputes it.
+
+    A backend is any object with get(key), set(key, entry) and clear(); keys
+    are tuples of strings/ints and entries are CacheEntry tuples.
+    """
+
+    def __init__(self, backend=None, stale_while_revalidate=False):
+        self.backend = backend or MemoryBackend()
+        self.stale_while_revalidate = stale_while_revalidate
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint, business_id, params):
+        return (endpoint, int(business_id), normalize_params(params), date.today().isoformat())
+
+    def peek(self, endpoint, business_id, params, version):
+        """The cached value if it was computed at `version`, else None. Never computes."""
+        entry = self.backend.get(self.key(endpoint, business_id, params))
+        return entry.value if entry is not None and entry.version == version else None
+
+    def put(self, endpoint, business_id, params, version, value):
+        self.backend.set(self.key(endpoint, business_id, params), CacheEntry(version, value, time.time()))
+
+    def get_or_compute(self, endpoint, business_id, params, compute):
+        key = self.key(endpoint, business_id, params)
+        version = get_data_version(business_id)
+
+        entry = self.backend.get(key)
+        if entry is not None and entry.version == version:
+            return entry.value
+        if entry is not None and self.stale_while_revalidate:
+            self._refresh_in_background(key, version, compute)
+            return entry.value
+        return self._compute(key, version, compute)
+
+    def _compute(self, key, version, compute):
+        value = single_flight.do(key + (version,), compute)
+        self.backend.set(key, CacheEntry(version, value, time.time()))
+        return value
+
+    def _refresh_in_background(self, key, version, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self._compute(key, version, compute)
+            except Exception as e:
+                print(f"Cache refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def clear(self):
+        self.backend.clear()
+
+
+result_cache = ResultCache()
+
+
+def init_result_cache(app):
+    """Configures the shared cache from RESULT_CACHE_BACKEND ('memory' or 'none'),
+    RESULT_CACHE_MAX_ENTRIES and RESULT_CACHE_STALE_WHILE_REVALIDATE."""
+    name = app.config.get("RESULT_CACHE_BACKEND", "memory")
+    if name == "memory":
+        backend = MemoryBackend(app.config.get("RESULT_CACHE_MAX_ENTRIES", 512))
+    else:
+        backend = BACKENDS[name]()
+    result_cache.backend = backend
+    result_cache.stale_while_revalidate = app.config.get("RESULT_CACHE_STALE_WHILE_REVALIDATE", False)
+    return result_cache
+
+
+def cached_result(endpoint, business_id, params, compute):
+    return result_cache.get_or_compute(endpoint, business_id, params, compute)
@@ -0,0 +1,164 @@
+from datetime import datetime, date, timedelta
+import sys
+
+import pandas as pd
+from sqlalchemy import func
+from models import db, Business, Transaction, DailyRollup
+
+ANALYTICS_GRANULARITIES = ("daily", "weekly", "monthly")
+MAX_ANALYTICS_DAYS = 3 * 366
+
+
+def period_start(day, granularity):
+    """First day of the daily/weekly/monthly/quarterly/yearly period containing `day`."""
+    if isinstance(day, datetime):
+        day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "daily":
+        return day
+    if granularity == "weekly":
+        return day - timedelta(days=day.weekday())
+    if granularity == "quarterly":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == "yearly":
+        return day.replace(month=1, day=1)
+    return day.replace(day=1)
+
+
+def next_period(start, granularity):
+    if granularity == "daily":
+        return start + timedelta(days=1)
+    if granularity == "weekly":
+        return start + timedelta(weeks=1)
+    months = {"monthly": 1, "quarterly": 3, "yearly": 12}[granularity]
+    month_index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+def period_label(start, granularity):
+    if granularity in ("daily", "weekly"):
+        return start.strftime('%Y-%m-%d')
+    if granularity == "quarterly":
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    if granularity == "yearly":
+        return start.strftime('%Y')
+    return start.strftime('%Y-%m')
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def build_advanced_analytics(business_id, start_date=None, end_date=None, granularity="daily", today=None, days=30):
+    """Sales/expense trend and category breakdown, read from DailyRollup.
+
+    The trend covers start_date..end_date inclusive (YYYY-MM-DD), by default
+    the last `days` days, bucketed daily, weekly or monthly. The category
+    breakdown covers the same range when one is given and all of history
+    otherwise. Both queries read at most one row per day/type/category/item,
+    however many transactions the business has.
+    """
+    if granularity not in ANALYTICS_GRANULARITIES:
+        raise ValueError(f"Invalid granularity '{granularity}', expected one of {', '.join(ANALYTICS_GRANULARITIES)}")
+    today = today or datetime.now().date()
+    end = _parse_day(end_date) if end_date else today
+    start = _parse_day(start_date) if start_date else end - timedelta(days=days)
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+    if (end - start).days > MAX_ANALYTICS_DAYS:
+        raise ValueError(f"Range is longer than {MAX_ANALYTICS_DAYS} days")
+
+    daily = db.session.query(
+        DailyRollup.day, DailyRollup.type, func.sum(DailyRollup.amount)
+    ).filter(
+        DailyRollup.business_id == business_id,
+        DailyRollup.day >= start,
+        DailyRollup.day <= end
+    ).group_by(DailyRollup.day, DailyRollup.type).having(func.sum(DailyRollup.txn_count) > 0).all()
+
+    trend = {}
+    for day, txn_type, amount in daily:
+        bucket = period_start(day, granularity)
+        if bucket not in trend:
+            trend[bucket] = {"date": period_label(bucket, granularity), "sales": 0, "expenses": 0}
+        trend[bucket]["sales" if txn_type == 'Sale' else "expenses"] += amount
+
+    categories = db.session.query(
+        DailyRollup.category, DailyRollup.type, func.sum(DailyRollup.amount)
+    ).filter(DailyRollup.business_id == business_id)
+    if start_date or end_date:
+        categories = categories.filter(DailyRollup.day >= start, DailyRollup.day <= end)
+    # Rows whose transactions were all deleted or moved linger with a count of 0
+    categories = categories.group_by(DailyRollup.category, DailyRollup.type).having(func.sum(DailyRollup.txn_count) > 0).all()
+
+    sales_by_cat = [{"name": c, "value": v} for c, typ, v in categories if typ == 'Sale']
+    expenses_by_cat = [{"name": c, "value": v} for c, typ, v in categories if typ != 'Sale']
+    return {
+        "daily_trends": [trend[b] for b in sorted(trend)],
+        "sales_by_category": sorted(sales_by_cat, key=lambda x: x['value'], reverse=True),
+        "expenses_by_category": sorted(expenses_by_cat, key=lambda x: x['value'], reverse=True)
+    }
+
+
+def item_aggregates(business_id):
+    """All-time profit / quantity / amount of sales per item, as the DataFrame
+    BulkBinsAIService.get_profitability_insights accepts in place of transactions."""
+    rows = db.session.query(
+        DailyRollup.inventory_item_id,
+        func.sum(DailyRollup.profit),
+        func.sum(DailyRollup.quantity),
+        func.sum(DailyRollup.amount)
+    ).filter(
+        DailyRollup.business_id == business_id,
+        DailyRollup.type == 'Sale',
+        DailyRollup.inventory_item_id.isnot(None)
+    ).group_by(DailyRollup.inventory_item_id).having(func.sum(DailyRollup.txn_count) > 0).all()
+    return pd.DataFrame(rows, columns=['inventory_item_id', 'profit', 'quantity', 'amount'])
+
+
+def rebuild_rollups(business_id=None):
+    """Recomputes DailyRollup from the transaction table, for one business or all.
+
+    The flush listener in models.py keeps rollups current; run this once
+    after adding the table, and after any write that bypassed the ORM.
+    """
+    rollups = DailyRollup.query
+    if business_id is not None:
+        rollups = rollups.filter(DailyRollup.business_id == business_id)
+    rollups.delete(synchronize_session=False)
+
+    day = func.date(Transaction.timestamp)
+    rows = db.session.query(
+        Transaction.business_id, day, Transaction.type, Transaction.category, Transaction.inventory_item_id,
+        func.coalesce(func.sum(Transaction.amount), 0),
+        func.coalesce(func.sum(Transaction.quantity), 0),
+        func.coalesce(func.sum(Transaction.profit), 0),
+        func.coalesce(func.sum(Transaction.cogs), 0),
+        func.count(Transaction.id)
+    ).filter(Transaction.timestamp.isnot(None))
+    if business_id is not None:
+        rows = rows.filter(Transaction.business_id == business_id)
+    rows = rows.group_by(
+        Transaction.business_id, day, Transaction.type, Transaction.category, Transaction.inventory_item_id
+    ).all()
+
+    rollup_rows = [{
+        "business_id": bid,
+        "day": d if isinstance(d, date) else datetime.strptime(d, '%Y-%m-%d').date(),
+        "type": txn_type, "category": category, "inventory_item_id": item_id,
+        "amount": amount, "quantity": quantity, "profit": profit, "cogs": cogs, "txn_count": count
+    } for bid, d, txn_type, category, item_id, amount, quantity, profit, cogs, count in rows]
+    if rollup_rows:
+        db.session.execute(DailyRollup.__table__.insert(), rollup_rows)
+    db.session.commit()
+    return len(rollup_rows)
+
+
+if __name__ == "__main__":
+    from app import app
+    with app.app_context():
+        business_ids = [int(a) for a in sys.argv[1:]] or [b.id for b in Business.query.all()]
+        for bid in business_ids:
+            print(f"Business {bid}: {rebuild_rollups(bid)} rollup rows")
@@ -0,0 +1,181 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import OrderedDict, deque
+from datetime import datetime
+import json
+import os
+import sys
+import tempfile
+
+from models import db, Business, DashboardSnapshot, get_data_version
+from coalesce import normalize_params
+
+# Snapshot kinds and the query params of the request each one answers. The
+# names match the dashboard_bundle widgets and the result cache endpoints.
+SNAPSHOT_PARAMS = {
+    "dashboard": {"granularity": "monthly"},
+    "pnl": {"granularity": "monthly"},
+    "inventory-insights": {"mode": "linear"},
+}
+
+
+def get_fresh_snapshot(kind, business_id, params):
+    """The stored payload for this request if it is still current, else None.
+
+    A snapshot is current while the business's data version is unchanged
+    and it was computed today (the dashboard's windows are relative to today).
+    """
+    if kind not in SNAPSHOT_PARAMS or normalize_params(params) != normalize_params(SNAPSHOT_PARAMS[kind]):
+        return None
+    snap = DashboardSnapshot.query.filter_by(business_id=business_id, kind=kind).first()
+    if snap is None or snap.computed_at.date() != datetime.now().date():
+        return None
+    if snap.data_version != get_data_version(business_id):
+        return None
+    return json.loads(snap.payload)
+
+
+def snapshot_first(kind, business_id, params, compute):
+    """Wraps `compute` so a fresh snapshot is returned instead of recomputing."""
+    def load_or_compute():
+        payload = get_fresh_snapshot(kind, business_id, params)
+        return payload if payload is not None else compute()
+    return load_or_compute
+
+
+def _init_worker():
+    # Forked workers inherit the parent's pooled connections; never reuse them.
+    from app import app
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def _compute_snapshot(business_id, kind):
+    """Runs in a pool process. Returns (business_id, kind, version, payload JSON)."""
+    from app import app
+    from dashboard_bundle import BusinessData, WIDGETS
+
+    with app.app_context():
+        # Read the version first: a write that lands mid-computation then
+        # leaves the snapshot one version behind, never ahead.
+        version = get_data_version(business_id)
+        payload = WIDGETS[kind](BusinessData(business_id), SNAPSHOT_PARAMS[kind])
+        return business_id, kind, version, app.json.dumps(payload)
+
+
+def _pending_tasks():
+    """Snapshots that are missing or out of date, grouped per approved business."""
+    today = datetime.now().date()
+    versions = dict(db.session.query(Business.id, Business.data_version).filter(Business.status == 'approved').all())
+    current = {
+        (s.business_id, s.kind)
+        for s in DashboardSnapshot.query.filter(DashboardSnapshot.business_id.in_(list(versions))).all()
+        if s.data_version == (versions[s.business_id] or 0) and s.computed_at.date() == today
+    }
+    tasks = OrderedDict()
+    for business_id in sorted(versions):
+        kinds = [kind for kind in SNAPSHOT_PARAMS if (business_id, kind) not in current]
+        if kinds:
+            tasks[business_id] = deque(kinds)
+    return tasks
+
+
+def _save_snapshot(business_id, kind, version, payload):
+    snap = DashboardSnapshot.query.filter_by(business_id=business_id, kind=kind).first()
+    if snap is None:
+        snap = DashboardSnapshot(business_id=business_id, kind=kind)
+        db.session.add(snap)
+    snap.payload = payload
+    snap.data_version = version
+    snap.computed_at = datetime.now()
+    db.session.commit()
+
+
+def refresh_snapshots(app, workers=2):
+    """Recomputes every stale snapshot of every approved business.
+
+    Work is handed to the pool round-robin across businesses with at most
+    one task per business in flight, so a tenant with years of history
+    occupies one worker while the small tenants keep moving through the
+    others. Results are written back from this process only.
+    """
+    with app.app_context():
+        tasks = _pending_tasks()
+        if not tasks:
+            return 0
+
+        saved = 0
+        busy = set()
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            while tasks or running:
+                for business_id in list(tasks):
+                    if len(running) >= workers:
+                        break
+                    if business_id in busy:
+                        continue
+                    kind = tasks[business_id].popleft()
+                    if not tasks[business_id]:
+                        del tasks[business_id]
+                    else:
+                        tasks.move_to_end(business_id)
+                    running[pool.submit(_compute_snapshot, business_id, kind)] = (business_id, kind)
+                    busy.add(business_id)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    business_id, kind = running.pop(future)
+                    busy.discard(business_id)
+                    try:
+                        _save_snapshot(*future.result())
+                        saved += 1
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Snapshot {kind} for business {business_id} failed: {e}")
+        return saved
+
+
+def run_snapshot_worker(app):
+    """Refreshes snapshots every SNAPSHOT_REFRESH_MINUTES until killed.
+
+    Runs as its own process (`python snapshots.py --worker`), never inside a
+    web worker or anything else that imports app: a Flask-APScheduler job on
+    a blocking scheduler, so start() only returns at shutdown. Only one
+    worker per host runs (it holds a lock file for its lifetime); a second
+    one exits.
+    """
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from flask_apscheduler import APScheduler
+    from admission import SlotLimiter
+
+    lock_dir = app.config.get("ADMISSION_LOCK_DIR") or os.path.join(tempfile.gettempdir(), "bulkbins-admission")
+    lock = SlotLimiter(lock_dir).acquire("snapshot-scheduler", 1)
+    if lock is None:
+        print("Another snapshot worker is running on this host.")
+        return
+
+    def refresh():
+        try:
+            print(f"Refreshed {refresh_snapshots(app, app.config.get('SNAPSHOT_WORKERS', 2))} snapshots.")
+        except Exception as e:
+            print(f"Snapshot refresh failed: {e}")
+
+    scheduler = APScheduler(scheduler=BlockingScheduler())
+    scheduler.init_app(app)
+    scheduler.add_job(
+        id="refresh_snapshots",
+        func=refresh,
+        trigger="interval",
+        minutes=app.config.get("SNAPSHOT_REFRESH_MINUTES", 15),
+        next_run_time=datetime.now(), # first refresh on start-up, not one interval in
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.start()
+
+
+if __name__ == "__main__":
+    from app import app
+    if "--worker" in sys.argv[1:]:
+        run_snapshot_worker(app)
+    else:
+        print(f"Refreshed {refresh_snapshots(app, app.config.get('SNAPSHOT_WORKERS', 2))} snapshots.")
@@ -0,0 +1,75 @@
+import pytest
+
+from app import app
+from admission import SlotLimiter
+
+
+@pytest.fixture
+def held_slots():
+    """Takes slots the way a concurrent heavy request would, releasing them after the test."""
+    limiter = app.extensions["admission"]
+    handles = []
+
+    def hold(name, count):
+        for _ in range(count):
+            handle = limiter.acquire(name, count)
+            assert handle is not None
+            handles.append(handle)
+
+    yield hold
+    for handle in handles:
+        limiter.release(handle)
+
+
+def test_slot_limiter_counts_slots(tmp_path):
+    limiter = SlotLimiter(str(tmp_path))
+    first, second = limiter.acquire("business-1", 2), limiter.acquire("business-1", 2)
+    assert first is not None and second is not None
+    assert limiter.acquire("business-1", 2) is None
+    assert limiter.acquire("business-2", 2) is not None
+
+    limiter.release(first)
+    assert limiter.acquire("business-1", 2) is not None
+
+
+def test_busy_business_gets_429(client_and_business, held_slots):
+    client, business_id, token = client_and_business
+    held_slots(f"business-{business_id}", app.config["HEAVY_MAX_PER_BUSINESS"])
+
+    resp = client.get(f"/api/businesses/{business_id}/ai/pnl", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == str(app.config["HEAVY_RETRY_AFTER"])
+
+    # Light routes are never throttled
+    resp = client.get(f"/api/businesses/{business_id}/inventory", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code != 429
+
+
+def test_auth_runs_before_admission(client_and_business, held_slots):
+    client, business_id, token = client_and_business
+    held_slots(f"business-{business_id}", app.config["HEAVY_MAX_PER_BUSINESS"])
+
+    # Unauthenticated callers are turned away without ever taking (or waiting for) a slot
+    assert client.get(f"/api/businesses/{business_id}/ai/pnl").status_code == 401
+    assert client.get(f"/api/businesses/{business_id}/ai/transaction-analysis").status_code == 401
+
+
+def test_zero_per_business_limit_means_global_cap_only(client_and_business, held_slots, monkeypatch):
+    client, business_id, token = client_and_business
+    monkeypatch.setitem(app.config, "HEAVY_MAX_PER_BUSINESS", 0)
+
+    resp = client.get(f"/api/businesses/{business_id}/ai/pnl", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+
+    held_slots("global", app.config["HEAVY_MAX_CONCURRENT"])
+    resp = client.get(f"/api/businesses/{business_id}/ai/pnl", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 429
+
+
+def test_slots_are_released_after_the_request(client_and_business, monkeypatch):
+    client, business_id, token = client_and_business
+    monkeypatch.setitem(app.config, "HEAVY_MAX_PER_BUSINESS", 1)
+
+    for _ in range(3):
+        resp = client.get(f"/api/businesses/{business_id}/ai/pnl", headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200
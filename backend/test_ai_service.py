@@ -0,0 +1,209 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ai_service import (NO_DEMAND, TransactionSet, ai_service, fit_item_demand, forecast_item_demand,
+                        summarize_periods)
+from app import app
+from models import InventoryItem, Transaction
+from rollups import item_aggregates
+
+
+def _sales(item_id, start, quantities):
+    dates = pd.date_range(start, periods=len(quantities), freq='D')
+    return pd.DataFrame({'inventory_item_id': item_id, 'date': dates, 'quantity': quantities})
+
+
+def _per_item_forecast(daily):
+    """The 7-day forecast and velocity of the per-item forecaster the batch replaced."""
+    velocity = daily['quantity'].mean()
+    day_num = (daily['date'] - daily['date'].min()).dt.days
+    p = np.poly1d(np.polyfit(day_num, daily['quantity'], 1))
+    last_day = day_num.max()
+    return sum(p(last_day + i) for i in range(1, 8)), velocity
+
+
+def test_batch_forecast_matches_per_item_forecast():
+    # Item 1 stopped selling 300 days before item 2's latest sale: it keeps its own history
+    old = _sales(1, '2025-01-06', [10 + 0.5 * d for d in range(28)])
+    new = _sales(2, '2025-12-01', [5.0] * 14)
+    sales = pd.concat([old, new], ignore_index=True)
+
+    forecasts = forecast_item_demand(sales)
+    for item_id, daily in ((1, old), (2, new)):
+        pred_7, velocity = _per_item_forecast(daily)
+        assert forecasts[item_id]["velocity"] == round(velocity, 2)
+        assert abs(forecasts[item_id]["7_day"] - pred_7) <= 0.01 * pred_7
+
+
+def test_each_item_window_ends_at_its_last_sale():
+    sales = pd.concat([_sales(1, '2025-01-06', [3.0] * 10), _sales(2, '2025-06-01', [1.0] * 200)],
+                      ignore_index=True)
+    params, metrics = fit_item_demand(sales, history_days=180)
+
+    assert params["days"] == 180
+    assert params["ends"] == ["2025-01-15", "2025-12-17"]
+    assert metrics["observations"] == 10 + 180
+
+
+TRANSACTIONS = [
+    {"timestamp": "2025-12-01T10:00:00", "type": "Sale", "amount": 150.0, "profit": 50.0, "quantity": 10,
+     "inventory_item_id": 1, "category": "Produce"},
+    {"timestamp": "2025-12-01T18:30:00", "type": "Sale", "amount": 30.0, "profit": 10.0, "quantity": 2,
+     "inventory_item_id": 2, "category": "Dairy"},
+    {"timestamp": "2025-12-03T09:00:00", "type": "expense", "amount": 40.0, "profit": -40.0, "category": "Rent"},
+    {"timestamp": "2025-12-04T12:00:00", "type": "Sale", "amount": 90.0, "profit": 30.0, "quantity": 6,
+     "inventory_item_id": 1, "category": "Produce"},
+]
+INVENTORY = [
+    {"id": 1, "name": "Apples", "stock_quantity": 3, "reorder_level": 5, "lead_time": 7},
+    {"id": 2, "name": "Milk", "stock_quantity": 50, "reorder_level": 5, "lead_time": 2},
+]
+
+
+def test_one_transaction_set_serves_every_call():
+    txns = TransactionSet(TRANSACTIONS)
+    assert TransactionSet.of(txns) is txns
+    assert txns.sales is txns.sales # memoized, built once per set
+    assert len(txns.sales) == 3
+    # Expense matching is case-insensitive
+    assert txns.daily_expense['val'].tolist() == [40.0]
+    assert txns.daily_pnl['amount'].tolist() == [60.0, -40.0, 30.0]
+
+
+def test_service_gives_the_same_answers_for_dicts_and_a_shared_set():
+    txns = TransactionSet(TRANSACTIONS)
+    assert ai_service.predict_profit(TRANSACTIONS) == ai_service.predict_profit(txns)
+    assert ai_service.recommend_reorders(INVENTORY, TRANSACTIONS) == ai_service.recommend_reorders(INVENTORY, txns)
+    assert ai_service.forecast_demand(txns, [1, 2, 3]) == {
+        1: ai_service.get_demand_forecast(1, TRANSACTIONS),
+        2: ai_service.get_demand_forecast(2, TRANSACTIONS),
+        3: NO_DEMAND,
+    }
+
+
+def test_dashboard_cogs_uses_each_sales_item_cost():
+    inventory = [dict(INVENTORY[0], cost_price=8.0), dict(INVENTORY[1])] # Milk has no cost price
+    transactions = TRANSACTIONS + [
+        {"timestamp": "2025-12-05T09:00:00", "type": "Sale", "amount": 20.0, "profit": 5.0, "quantity": 4,
+         "inventory_item_id": 99, "category": "Produce"}, # no longer in the inventory
+        {"timestamp": "2025-12-05T10:00:00", "type": "Sale", "amount": 12.0, "profit": 2.0, "quantity": 1,
+         "category": "Produce"}, # not tied to an item
+    ]
+    stats = ai_service.get_dashboard_stats(transactions, inventory)
+    assert stats["total_cogs"] == 8.0 * (10 + 6)
+    assert stats["gross_profit"] == stats["total_sales"] - stats["total_cogs"]
+
+
+def test_reorders_read_each_items_profit():
+    # Apples sell 5 a day for two weeks; Milk's profit must not leak into Apples' risk
+    txns = TransactionSet([
+        {"timestamp": f"2025-12-{day:02d}T10:00:00", "type": "Sale", "amount": 50.0, "profit": 2.0, "quantity": 5,
+         "inventory_item_id": 1, "category": "Produce"} for day in range(1, 15)
+    ] + [TRANSACTIONS[1]])
+    daily_demand = ai_service.forecast_demand(txns, [1])[1]["30_day"] / 30
+    days_to_stockout = INVENTORY[0]["stock_quantity"] / daily_demand
+
+    apples, = [r for r in ai_service.recommend_reorders(INVENTORY, txns) if r["name"] == "Apples"]
+    assert apples["category"] == "Critical"
+    # Apples made 28 in profit: the risk is that per day, over the days without stock
+    assert apples["lost_profit_risk"] == round(28.0 / 30 * (INVENTORY[0]["lead_time"] - days_to_stockout), 2)
+
+
+def test_profit_stars_need_margin_and_volume():
+    insights = ai_service.get_profitability_insights(INVENTORY, TRANSACTIONS)
+    assert insights == [
+        {"id": 1, "name": "Apples", "total_profit": 80.0, "volume": 16, "margin": 33.33, "is_star": True},
+        # Same margin, but 2 units is under the 70th percentile of volume
+        {"id": 2, "name": "Milk", "total_profit": 10.0, "volume": 2, "margin": 33.33, "is_star": False},
+    ]
+
+
+def test_profit_stars_accept_item_aggregates():
+    aggregates = pd.DataFrame({
+        "inventory_item_id": [1, 2, 99, 3],
+        "profit": [80.0, 10.0, 500.0, 0.0],
+        "quantity": [16, 2, 100, 5],
+        "amount": [240.0, 30.0, 1000.0, 0.0],
+    })
+    inventory = INVENTORY + [{"id": 3, "name": "Free sample"}, dict(INVENTORY[0])] # Apples listed twice
+    insights = ai_service.get_profitability_insights(inventory, aggregates)
+
+    # Item 99 is not in the inventory, but still counts towards the volume threshold
+    assert [i["id"] for i in insights] == [1, 2, 3]
+    assert not any(i["is_star"] for i in insights)
+    assert insights[2]["margin"] == 0 # nothing sold for money: no division by zero
+    assert ai_service.get_profitability_insights(inventory, aggregates.iloc[:0]) == []
+    assert ai_service.get_profitability_insights([], aggregates) == []
+
+
+def test_item_aggregates_match_the_transactions(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        inventory = [{"id": i.id, "name": i.name} for i in InventoryItem.query.filter_by(business_id=business_id)]
+        from_rollups = ai_service.get_profitability_insights(inventory, item_aggregates(business_id))
+        from_rows = ai_service.get_profitability_insights(
+            inventory, TransactionSet.from_rows(Transaction.query.filter_by(business_id=business_id).all()))
+    assert from_rollups == from_rows
+    assert [(i["name"], i["total_profit"], i["volume"]) for i in from_rollups] == [("Item 0", 50.0, 10), ("Item 1", 15.0, 3)]
+
+
+def _masked_periods(frame, now):
+    """The per-week / per-month masking loop summarize_periods replaced."""
+    df = frame[['date', 'amount', 'type', 'category']].copy()
+    df['week_start'] = df['date'].dt.to_period('W').apply(lambda r: r.start_time)
+    weekly_stats = df.groupby(['week_start', 'type'], observed=True)['amount'].sum().reset_index()
+    weekly = []
+    for w in sorted(weekly_stats['week_start'].unique())[-8:]:
+        in_week = weekly_stats[weekly_stats['week_start'] == w]
+        sales = in_week[in_week['type'] == 'Sale']['amount'].sum()
+        exp = in_week[in_week['type'] == 'Expense']['amount'].sum()
+        weekly.append({"label": pd.Timestamp(w).strftime('%d %b'), "revenue": float(sales),
+                       "expenses": float(exp), "profit": float(sales - exp)})
+
+    df['year_month'] = df['date'].dt.to_period('M')
+    monthly_stats = df.groupby(['year_month', 'type'], observed=True)['amount'].sum().reset_index()
+
+    def month_totals(period):
+        m_data = monthly_stats[monthly_stats['year_month'] == period]
+        s = m_data[m_data['type'] == 'Sale']['amount'].sum()
+        e = m_data[m_data['type'] == 'Expense']['amount'].sum()
+        return {"sales": float(s), "expenses": float(e), "profit": float(s - e)}
+
+    trend = [{"month": m.strftime('%b'), "profit": month_totals(m)["profit"]}
+             for m in sorted(monthly_stats['year_month'].unique())[-6:]]
+    this_month = pd.Period(now, freq='M')
+    return weekly, trend, month_totals(this_month), month_totals(this_month - 1)
+
+
+def _year_of_transactions():
+    rng = np.random.default_rng(7)
+    days = pd.date_range('2025-01-01', '2025-12-31', freq='D')
+    rows = [{"timestamp": d.isoformat(), "type": "Sale", "amount": float(rng.integers(50, 500)),
+             "category": "Produce"} for d in days]
+    rows += [{"timestamp": d.isoformat(), "type": "Expense", "amount": float(rng.integers(100, 900)),
+              "category": ["Rent", "Wages", "Power"][i % 3]} for i, d in enumerate(days[::5])]
+    return rows
+
+
+def test_period_series_match_the_masked_loop():
+    now = datetime(2025, 12, 20)
+    rows = _year_of_transactions()
+    for frame in (TransactionSet(rows).frame, TransactionSet.from_frame(pd.DataFrame(rows)).frame):
+        weekly, breakdown, trend, this_m, last_m = summarize_periods(frame, now)
+        assert (weekly, trend, this_m, last_m) == _masked_periods(frame, now)
+        assert len(weekly) == 8 and len(trend) == 6
+        assert {b["category"] for b in breakdown} == {"Rent", "Wages", "Power"}
+        expenses = frame[frame['type'] == 'Expense']['amount'].sum()
+        assert sum(b["amount"] for b in breakdown) == expenses
+
+
+def test_period_series_for_months_without_activity():
+    frame = TransactionSet(TRANSACTIONS).frame
+    weekly, breakdown, trend, this_m, last_m = summarize_periods(frame, datetime(2026, 3, 1))
+    assert this_m == last_m == {"sales": 0, "expenses": 0, "profit": 0}
+    assert trend == [{"month": "Dec", "profit": 270.0}]
+    # 1 December 2025 is a Monday; the lowercase expense is not an 'Expense'
+    assert [w["label"] for w in weekly] == ["01 Dec"]
+    assert breakdown == []
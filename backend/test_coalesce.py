@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from coalesce import SingleFlight
+
+
+class WorkerAbort(BaseException):
+    """Stands in for what a worker timeout or interrupt raises mid-request."""
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(1)
+        return {"total": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("report", compute))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == [{"total": 42}] * 4
+    assert flight.in_flight() == 0
+
+
+def test_followers_fail_when_the_leader_is_interrupted():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    follower_outcome = []
+
+    def compute():
+        started.set()
+        release.wait(1)
+        raise WorkerAbort()
+
+    def leader():
+        with pytest.raises(WorkerAbort):
+            flight.do("report", compute)
+
+    def follower():
+        try:
+            follower_outcome.append(flight.do("report", lambda: "mine"))
+        except RuntimeError as e:
+            follower_outcome.append(e)
+
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    started.wait(1)
+    threads.append(threading.Thread(target=follower))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    # Not None passed off as a result
+    assert len(follower_outcome) == 1 and isinstance(follower_outcome[0], RuntimeError)
+    assert flight.in_flight() == 0
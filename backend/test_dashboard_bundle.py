@@ -0,0 +1,111 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import app
+from dashboard_bundle import build_pnl
+from models import db, Transaction
+
+
+def _get(client, token, url):
+    return client.get(url, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_bundle_returns_only_the_requested_widgets(client_and_business):
+    client, business_id, token = client_and_business
+    resp = _get(client, token, f"/api/businesses/{business_id}/ai/bundle?widgets=pnl,%20profit-stars")
+    assert resp.status_code == 200
+    assert set(resp.get_json()["widgets"]) == {"pnl", "profit-stars"}
+
+
+def test_bundle_widgets_match_the_standalone_endpoints(client_and_business):
+    client, business_id, token = client_and_business
+    with app.app_context():
+        widgets = _get(client, token, f"/api/businesses/{business_id}/ai/bundle?widgets=pnl,profit-stars,inventory-insights"
+                       ).get_json()["widgets"]
+        for name in ("pnl", "profit-stars", "inventory-insights"):
+            assert widgets[name] == _get(client, token, f"/api/businesses/{business_id}/ai/{name}").get_json(), name
+
+
+
+def test_bundle_reads_the_transaction_history_once(client_and_business):
+    client, business_id, token = client_and_business
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            widgets = _get(client, token, f"/api/businesses/{business_id}/ai/bundle").get_json()["widgets"]
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        standalone = _get(client, token, f"/api/businesses/{business_id}/ai/transaction-analysis").get_json()
+
+    # Full-history reads, as opposed to the SQL-side aggregates
+    loads = [s for s in statements if re.search(r'FROM "?transaction"?\s', s) and "GROUP BY" not in s]
+    assert len(loads) == 1, "\n".join(loads)
+    assert widgets["transaction-analysis"] == standalone
+
+def test_bundle_rejects_unknown_widgets(client_and_business):
+    client, business_id, token = client_and_business
+    resp = _get(client, token, f"/api/businesses/{business_id}/ai/bundle?widgets=pnl,forecast")
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert "forecast" in body["error"]
+    assert "pnl" in body["available"]
+
+
+def test_bundle_rejects_invalid_widget_params(client_and_business):
+    client, business_id, token = client_and_business
+    for query in ("widgets=pnl&pnl_granularity=hourly", "widgets=pnl&start_month=2026-13",
+                  "widgets=inventory-insights&mode=arima"):
+        resp = _get(client, token, f"/api/businesses/{business_id}/ai/bundle?{query}")
+        assert resp.status_code == 400, query
+        assert "error" in resp.get_json()
+
+
+def test_bundle_requires_a_member(client_and_business):
+    client, business_id, _ = client_and_business
+    assert client.get(f"/api/businesses/{business_id}/ai/bundle").status_code == 401
+
+
+def _add_quarter_of_transactions(business_id):
+    db.session.add_all([
+        Transaction(business_id=business_id, type="Sale", amount=100.0, quantity=2, cogs=60.0, profit=40.0,
+                    category="Produce", timestamp=datetime(2025, 1, 10, 12)),
+        Transaction(business_id=business_id, type="Expense", amount=30.0, quantity=1, cogs=30.0, profit=-30.0,
+                    category="Rent", timestamp=datetime(2025, 1, 20, 9)),
+        Transaction(business_id=business_id, type="Sale", amount=50.0, quantity=1, cogs=20.0, profit=30.0,
+                    category="Dairy", timestamp=datetime(2025, 3, 5, 18)),
+    ])
+    db.session.commit()
+
+
+def test_pnl_buckets_the_range_in_sql(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        _add_quarter_of_transactions(business_id)
+
+        monthly = build_pnl(business_id, "2025-01", "2025-03", "monthly")
+        # February has no transactions and is left out
+        assert [(p["period"], p["sales"], p["expenses"], p["cogs"], p["profit"]) for p in monthly] == [
+            ("2025-01", 100.0, 30.0, 60.0, 10.0),
+            ("2025-03", 50.0, 0, 20.0, 30.0),
+        ]
+        quarterly = build_pnl(business_id, "2025-01", "2025-03", "quarterly")
+        assert [(p["period"], p["sales"], p["profit"]) for p in quarterly] == [("2025-Q1", 150.0, 40.0)]
+
+
+def test_pnl_endpoint_takes_range_and_granularity(client_and_business):
+    client, business_id, token = client_and_business
+    with app.app_context():
+        _add_quarter_of_transactions(business_id)
+    resp = _get(client, token, f"/api/businesses/{business_id}/ai/pnl?start_month=2025-01&end_month=2025-03&granularity=yearly")
+    assert resp.status_code == 200
+    assert [(p["period"], p["sales"]) for p in resp.get_json()] == [("2025", 150.0)]
+
+    for query in ("granularity=daily", "start_month=2025-03&end_month=2025-01", "start_month=March"):
+        assert _get(client, token, f"/api/businesses/{business_id}/ai/pnl?{query}").status_code == 400, query
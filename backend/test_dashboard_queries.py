@@ -0,0 +1,204 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from app import app
+from models import db, Business, Transaction
+from result_cache import result_cache
+from model_registry import model_registry
+from snapshots import _save_snapshot
+
+
+def _count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_dashboard_query_count(client_and_business):
+    client, business_id, token = client_and_business
+
+    with app.app_context():
+        statements, stop = _count_queries()
+        try:
+            resp = client.get(f"/api/businesses/{business_id}/ai/dashboard?granularity=monthly",
+                              headers={"Authorization": f"Bearer {token}"})
+        finally:
+            stop()
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["total_sales"] == 195.0
+    assert data["total_cogs"] == 130.0
+    assert data["total_expenses"] == 40.0
+    assert data["net_profit"] == 25.0
+
+    # auth (user + membership) + data version, snapshot lookup
+    expected = 4
+    # KPIs (one conditional aggregate), sales trend (first day with sales in
+    # the window, running sums at both ends), products, per-product 7/28-day
+    # velocity (one grouped query, independent of the number of products)
+    expected += 6
+    # period analysis + monthly trend (one bucketed GROUP BY), expense breakdown
+    expected += 2
+    # top profitable, top selling, low stock
+    expected += 3
+    assert len(statements) == expected, "\n".join(statements)
+
+
+def test_dashboard_cached_until_data_changes(client_and_business):
+    client, business_id, token = client_and_business
+    url = f"/api/businesses/{business_id}/ai/dashboard?granularity=monthly"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with app.app_context():
+        assert client.get(url, headers=headers).status_code == 200
+
+        statements, stop = _count_queries()
+        try:
+            resp = client.get(url, headers=headers)
+        finally:
+            stop()
+        # auth (user + membership) + data version; the payload comes from the cache
+        assert len(statements) == 3, "\n".join(statements)
+        assert resp.get_json()["total_sales"] == 195.0
+
+        db.session.add(Transaction(business_id=business_id, type="Sale", amount=5.0, quantity=1,
+                                   category="Produce", timestamp=datetime.now() - timedelta(days=1)))
+        db.session.commit()
+
+    assert client.get(url, headers=headers).get_json()["total_sales"] == 200.0
+
+
+def test_dashboard_served_from_fresh_snapshot(client_and_business):
+    client, business_id, token = client_and_business
+    url = f"/api/businesses/{business_id}/ai/dashboard"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with app.app_context():
+        version = db.session.get(Business, business_id).data_version
+        _save_snapshot(business_id, "dashboard", version, '{"total_sales": 1.0}')
+        assert client.get(url, headers=headers).get_json() == {"total_sales": 1.0}
+
+        # A custom range is not what the snapshot answers
+        resp = client.get(url + "?granularity=weekly", headers=headers)
+        assert resp.get_json()["total_sales"] == 195.0
+
+        db.session.add(Transaction(business_id=business_id, type="Expense", amount=5.0, quantity=1,
+                                   category="Rent", timestamp=datetime.now()))
+        db.session.commit()
+
+    assert client.get(url, headers=headers).get_json()["total_sales"] == 195.0
+
+
+def test_rollups_follow_writes(client_and_business):
+    from rollups import build_advanced_analytics, rebuild_rollups
+
+    client, business_id, token = client_and_business
+    with app.app_context():
+        txn = Transaction.query.filter_by(business_id=business_id, category="Dairy").one()
+        txn.amount = 60.0
+        txn.category = "Bakery"
+        db.session.delete(Transaction.query.filter_by(business_id=business_id, category="Rent").one())
+        db.session.commit()
+
+        incremental = build_advanced_analytics(business_id)
+        assert incremental["sales_by_category"] == [
+            {"name": "Produce", "value": 1149.0}, {"name": "Bakery", "value": 60.0}]
+        assert incremental["expenses_by_category"] == []
+        assert sum(d["sales"] for d in incremental["daily_trends"]) == 210.0
+
+        rebuild_rollups(business_id)
+        assert build_advanced_analytics(business_id) == incremental
+
+
+def test_trend_sums_follow_writes(client_and_business):
+    from models import TrendStats
+    from trends import rebuild_trends, profit_trend
+
+    client, business_id, token = client_and_business
+    with app.app_context():
+        txn = Transaction.query.filter_by(business_id=business_id, category="Dairy").one()
+        txn.amount = 60.0
+        txn.timestamp = txn.timestamp - timedelta(days=90) # moves the series origin back
+        db.session.delete(Transaction.query.filter_by(business_id=business_id, category="Rent").one())
+        db.session.commit()
+
+        def sums():
+            return {(s.series, s.inventory_item_id): (s.origin, s.last_day, round(s.sum_y, 6), round(s.sum_xy, 6),
+                                                      round(s.sum_yy, 6), s.active_days)
+                    for s in TrendStats.query.filter_by(business_id=business_id)}
+
+        incremental = sums()
+        prediction = profit_trend(business_id)
+        rebuild_trends(business_id)
+        assert sums() == incremental
+        assert profit_trend(business_id) == prediction
+
+
+def test_demand_model_refitted_only_when_data_changes(client_and_business):
+    from models import ForecastModel
+
+    client, business_id, token = client_and_business
+    url = f"/api/businesses/{business_id}/ai/inventory-insights?mode=holt-winters"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with app.app_context():
+        first = client.get(url, headers=headers).get_json()
+        model = ForecastModel.query.filter_by(business_id=business_id, series="units:holt-winters").one()
+        fitted_at, version = model.fitted_at, model.data_version
+
+        # Another worker: no cached result and no in-process model, same data
+        result_cache.clear()
+        model_registry.clear()
+        assert client.get(url, headers=headers).get_json() == first
+        db.session.expire_all()
+        assert ForecastModel.query.filter_by(business_id=business_id, series="units:holt-winters").one().fitted_at == fitted_at
+
+        db.session.add(Transaction(business_id=business_id, type="Sale", amount=15.0, quantity=1,
+                                   category="Produce", timestamp=datetime.now()))
+        db.session.commit()
+        client.get(url, headers=headers)
+        db.session.expire_all()
+        assert ForecastModel.query.filter_by(business_id=business_id, series="units:holt-winters").one().data_version > version
+
+
+def test_forecast_mode_is_selectable(client_and_business):
+    client, business_id, token = client_and_business
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with app.app_context():
+        for path in ("inventory-insights", "transaction-analysis"):
+            url = f"/api/businesses/{business_id}/ai/{path}"
+            assert client.get(url + "?mode=holt-winters", headers=headers).status_code == 200
+            assert client.get(url + "?mode=arima", headers=headers).status_code == 400
+
+
+def test_expense_classifier_is_loaded_lazily_from_artifact(tmp_path, monkeypatch):
+    import ai_service as service
+
+    path = str(tmp_path / "expense_classifier.pkl")
+    monkeypatch.setattr(service, "CLASSIFIER_PATH", path)
+
+    text = "Monthly store rent payment"
+    fresh = service.BulkBinsAIService()
+    assert fresh._classifier is None
+    label = fresh.classify_expense(text) # trains on first use and writes the artifact
+    assert fresh._classifier is not None
+    assert os.path.exists(path)
+
+    # Later processes load the artifact instead of training
+    def no_training():
+        raise AssertionError("trained again")
+    monkeypatch.setattr(service, "train_expense_classifier", no_training)
+    loaded = service.BulkBinsAIService()
+    assert loaded.classify_expense(text) == label
+    assert list(loaded.classifier.predict_proba([text])[0]) == list(fresh.classifier.predict_proba([text])[0])
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from coalesce import SingleFlight
+from deadline import Deadline, DeadlineExceeded, _current, check_deadline, init_deadlines, shared_work
+
+
+def _under(deadline, fn):
+    token = _current.set(deadline)
+    try:
+        return fn()
+    finally:
+        _current.reset(token)
+
+
+def test_route_answers_503_once_its_budget_is_spent():
+    app = Flask(__name__)
+    app.config["DEFAULT_REQUEST_DEADLINE"] = 30
+
+    @app.route("/slow")
+    def slow():
+        time.sleep(0.05)
+        check_deadline("report")
+        return "done"
+
+    init_deadlines(app, {"slow"})
+    client = app.test_client()
+    assert client.get("/slow").status_code == 200
+
+    resp = client.get("/slow", headers={"X-Request-Timeout": "0.01"})
+    assert resp.status_code == 503
+    assert resp.get_json()["phase"] == "report"
+    assert resp.headers["Retry-After"] == "30"
+
+
+def test_shared_work_runs_under_the_route_budget():
+    deadline = Deadline(0.01, route_budget=30)
+    time.sleep(0.02)
+
+    def run():
+        with shared_work():
+            check_deadline("shared") # the client's 0.01s does not apply in here
+        with pytest.raises(DeadlineExceeded):
+            check_deadline("after")
+
+    _under(deadline, run)
+
+
+def test_impatient_leader_does_not_fail_its_followers():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    results = {}
+
+    def compute():
+        started.set()
+        release.wait(1)
+        check_deadline("compute")
+        return 42
+
+    def request(name, deadline, fn):
+        try:
+            results[name] = _under(deadline, lambda: flight.do("report", fn))
+        except DeadlineExceeded:
+            results[name] = 503
+
+    leader = threading.Thread(target=request, args=("leader", Deadline(0.01, route_budget=30), compute))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=request, args=("follower", Deadline(30), lambda: -1))
+    follower.start()
+    time.sleep(0.05) # the follower is now waiting on the leader's call
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == {"leader": 42, "follower": 42}
+
+
+def test_follower_stops_waiting_at_its_own_deadline():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    results = {}
+
+    def compute():
+        started.set()
+        release.wait(1)
+        return 42
+
+    leader = threading.Thread(target=lambda: results.setdefault("leader", flight.do("report", compute)))
+    leader.start()
+    started.wait(1)
+    with pytest.raises(DeadlineExceeded):
+        _under(Deadline(0.05), lambda: flight.do("report", lambda: -1))
+    release.set()
+    leader.join()
+    assert results["leader"] == 42
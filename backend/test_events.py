@@ -0,0 +1,99 @@
+import json
+import queue
+
+from app import app
+from events import RESYNC, EventBroker, broker
+from models import db, InventoryItem, Transaction
+
+
+def _events(chunk):
+    """(event, data) pairs of an SSE chunk; keep-alive comments are skipped."""
+    chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+    parsed = []
+    for block in chunk.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
+
+
+def test_committed_stock_drop_publishes_item_and_alert(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        sub = broker.subscribe(business_id)
+        try:
+            item = InventoryItem.query.filter_by(business_id=business_id, name="Item 0").one()
+            item.stock_quantity = 4 # reorder level is 5
+            db.session.flush()
+            assert sub.empty() # nothing before the commit
+            db.session.commit()
+
+            delta = sub.get_nowait()
+            assert delta["items"] == [{"id": item.id, "name": "Item 0", "stock_quantity": 4, "reorder_level": 5}]
+            assert [a["type"] for a in delta["alerts"]] == ["low_stock"]
+            assert delta["totals"] is False
+
+            item.stock_quantity = 3 # already below the level: no second alert
+            db.session.commit()
+            assert sub.get_nowait()["alerts"] == []
+        finally:
+            broker.unsubscribe(business_id, sub)
+
+
+def test_rolled_back_changes_are_not_published(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        sub = broker.subscribe(business_id)
+        try:
+            db.session.add(Transaction(business_id=business_id, type="Sale", amount=10.0, quantity=1, category="Produce"))
+            db.session.flush()
+            db.session.rollback()
+            assert sub.empty()
+        finally:
+            broker.unsubscribe(business_id, sub)
+
+
+def test_slow_subscriber_is_told_to_resync():
+    events = EventBroker(max_queued=2)
+    sub = events.subscribe(7)
+    for i in range(3):
+        events.publish(7, {"n": i})
+    assert sub.get_nowait() is RESYNC
+    try:
+        sub.get_nowait()
+        assert False, "the backlog should have been dropped"
+    except queue.Empty:
+        pass
+
+
+def test_stream_sends_totals_then_deltas(client_and_business, monkeypatch):
+    client, business_id, token = client_and_business
+    monkeypatch.setitem(app.config, "SSE_HEARTBEAT_SECONDS", 1)
+
+    resp = client.get(f"/api/businesses/{business_id}/events?token={token}", buffered=False)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    stream = iter(resp.response)
+    try:
+        (name, totals), = _events(next(stream))
+        assert name == "totals"
+        assert totals["total_sales"] == 195.0
+
+        with app.app_context():
+            db.session.add(Transaction(business_id=business_id, type="Sale", amount=5.0, quantity=1,
+                                       cogs=3.0, category="Produce"))
+            db.session.commit()
+
+        chunks = []
+        while not any(name == "totals" for name, _ in chunks):
+            chunks += _events(next(stream))
+        totals = dict(chunks)["totals"]
+        assert totals["total_sales"] == 200.0
+        assert totals["version"] > 0
+    finally:
+        resp.close()
+
+
+def test_stream_requires_a_member(client_and_business):
+    client, business_id, _ = client_and_business
+    assert client.get(f"/api/businesses/{business_id}/events").status_code == 401
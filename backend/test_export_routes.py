@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+import export_routes
+from app import app
+from ai_service import TransactionSet
+from dashboard_bundle import transaction_query
+from export_routes import _fetch_transactions
+from models import db
+
+
+def test_rows_and_query_give_the_same_transaction_set(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        from_rows = TransactionSet.from_rows(_fetch_transactions(business_id)).frame
+        from_query = TransactionSet.from_query(transaction_query(business_id)).frame
+        key = ['date', 'amount', 'type']
+        assert from_rows.sort_values(key).reset_index(drop=True).astype(str).equals(
+            from_query.sort_values(key).reset_index(drop=True).astype(str))
+
+
+def test_email_report_loads_transactions_once(client_and_business, monkeypatch):
+    client, business_id, token = client_and_business
+    sent = []
+    monkeypatch.setattr(export_routes, "send_gmail", lambda *args: sent.append(args))
+
+    with app.app_context():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            resp = client.post(f"/api/businesses/{business_id}/export/email", json={"formats": ["csv"]},
+                               headers={"Authorization": f"Bearer {token}"})
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    assert resp.status_code == 200
+    assert sum('FROM "transaction"' in s for s in statements) == 1
@@ -0,0 +1,28 @@
+import numpy as np
+
+from holt_winters import GRID, fit_holt_winters, forecast_holt_winters
+
+
+def test_holt_winters_follows_weekly_pattern():
+    pattern = np.array([10, 12, 14, 16, 18, 30, 40], dtype=float)
+    Y = np.vstack([np.tile(pattern, 12), np.tile(pattern * 2, 12)])
+    hw = fit_holt_winters(Y, 7)
+    forecast = forecast_holt_winters(hw["level"], hw["trend"], hw["season"], hw["periods"], 7)
+    assert np.allclose(forecast, np.vstack([pattern, pattern * 2]), atol=1.0)
+
+
+def test_without_a_season_it_is_plain_holt():
+    Y = np.vstack([5 + 2.0 * np.arange(60), np.full(60, 8.0)])
+    hw = fit_holt_winters(Y, None)
+
+    assert hw["season"].shape == (2, 1) and not hw["season"].any()
+    assert not hw["gamma"].any()
+    forecast = forecast_holt_winters(hw["level"], hw["trend"], hw["season"], hw["periods"], 3)
+    assert np.allclose(forecast, [[125, 127, 129], [8, 8, 8]], atol=1.0)
+
+
+def test_rows_start_at_their_first_period():
+    Y = np.array([[0, 0, 0, 0, 6, 6, 6, 6, 6, 6]], dtype=float)
+    hw = fit_holt_winters(Y, None, first=[4], grid=GRID[:1])
+    assert hw["observations"][0] == 6
+    assert abs(hw["level"][0] - 6) < 1e-9 and abs(hw["trend"][0]) < 1e-9
@@ -0,0 +1,62 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import json_provider
+from app import app
+from models import Transaction
+
+
+PAYLOAD = {
+    "at": datetime(2026, 10, 19, 5, 0, 30),
+    "day": date(2026, 10, 19),
+    "week": pd.Timestamp("2026-10-12"),
+    "total": np.float64(195.5),
+    "count": np.int64(3),
+    "series": np.array([1.5, 2.0]),
+}
+EXPECTED = {
+    # ISO 8601, not the HTTP date Flask's default provider writes ('Mon, 19 Oct 2026 05:00:30 GMT')
+    "at": "2026-10-19T05:00:30",
+    "day": "2026-10-19",
+    "week": "2026-10-12T00:00:00",
+    "total": 195.5,
+    "count": 3,
+    "series": [1.5, 2.0],
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_provider_encodes_dates_and_numpy_values(use_orjson, monkeypatch):
+    if use_orjson and json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    if not use_orjson:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    with app.app_context():
+        assert json.loads(app.json.dumps(PAYLOAD)) == EXPECTED
+        with app.test_request_context():
+            assert app.json.response(PAYLOAD).get_json() == EXPECTED
+
+
+def test_transaction_timestamps_are_iso_8601(client_and_business):
+    client, business_id, token = client_and_business
+    resp = client.get(f"/api/businesses/{business_id}/transactions",
+                      headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    with app.app_context():
+        stored = {t.id: t.timestamp for t in Transaction.query.filter_by(business_id=business_id)}
+    for txn in resp.get_json()["transactions"]:
+        assert txn["timestamp"] == stored[txn["id"]].isoformat()
+
+
+def test_analysis_values_are_served_without_conversion(client_and_business):
+    client, business_id, token = client_and_business
+    resp = client.get(f"/api/businesses/{business_id}/ai/transaction-analysis",
+                      headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["total_stats"]["sales"] == 195.0 + 45.0 + 999.0
+    assert all(isinstance(point["sales"], float) for point in body["historical"])
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import app
+from models import db, Transaction, ForecastModel, get_data_version
+from model_registry import model_registry
+
+
+def _counting_fit(fits, params):
+    def fit():
+        fits.append(params)
+        return params, {"observations": 1}
+    return fit
+
+
+def test_each_scope_keeps_its_own_model(client_and_business):
+    _, business_id, _ = client_and_business
+    fits = []
+    with app.app_context():
+        version = get_data_version(business_id)
+        for scope in ("2026-01-01..2026-03-31", "..", "2026-01-01..2026-03-31"):
+            model_registry.fitted(business_id, "analysis", "weekly", version, _counting_fit(fits, {"scope": scope}), scope)
+        # Another worker: nothing in memory, both rows in the table
+        model_registry.clear()
+        for scope in ("2026-01-01..2026-03-31", ".."):
+            assert model_registry.fitted(business_id, "analysis", "weekly", version,
+                                         _counting_fit(fits, {}), scope) == {"scope": scope}
+
+    assert fits == [{"scope": "2026-01-01..2026-03-31"}, {"scope": ".."}]
+
+
+def _stored(business_id):
+    # Read on a connection of its own, as another worker would
+    table = ForecastModel.__table__
+    with db.engine.connect() as conn:
+        return conn.execute(select(table.c.data_version, table.c.params).where(
+            table.c.business_id == business_id, table.c.series == "units")).all()
+
+
+def _add_pending_sale(business_id):
+    db.session.add(Transaction(business_id=business_id, type="Sale", amount=15.0, quantity=1,
+                               category="Produce", timestamp=datetime.now()))
+    return get_data_version(business_id) # autoflushes the sale, bumping the version
+
+
+def test_model_fitted_during_a_write_is_stored_when_it_commits(client_and_business):
+    _, business_id, _ = client_and_business
+    fits = []
+    with app.app_context():
+        version = _add_pending_sale(business_id)
+        model_registry.fitted(business_id, "units", "daily", version, _counting_fit(fits, {"slope": 1.0}))
+        assert _stored(business_id) == [] # the caller's transaction is still open, and not committed for it
+
+        db.session.commit()
+        assert _stored(business_id) == [(version, '{"slope": 1.0}')]
+        model_registry.fitted(business_id, "units", "daily", version, _counting_fit(fits, {}))
+    assert len(fits) == 1
+
+
+def test_model_fitted_during_a_write_is_dropped_on_rollback(client_and_business):
+    _, business_id, _ = client_and_business
+    fits = []
+    with app.app_context():
+        version = _add_pending_sale(business_id)
+        model_registry.fitted(business_id, "units", "daily", version, _counting_fit(fits, {"slope": 1.0}))
+        db.session.rollback()
+        assert Transaction.query.filter_by(amount=15.0).count() == 0
+        assert _stored(business_id) == []
+
+        # The rolled-back sale's version will be reused by the next write: refit then
+        model_registry.fitted(business_id, "units", "daily", version, _counting_fit(fits, {"slope": 2.0}))
+        assert _stored(business_id) == [(version, '{"slope": 2.0}')]
+    assert len(fits) == 2
+
+
+def test_model_fitted_on_a_read_is_stored_at_once(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        version = get_data_version(business_id)
+        model_registry.fitted(business_id, "units", "daily", version, _counting_fit([], {"slope": 1.0}))
+        assert _stored(business_id) == [(version, '{"slope": 1.0}')]
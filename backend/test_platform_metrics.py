@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from models import db, User, Business, Transaction
+from platform_metrics import ROW_BYTES, business_status_counts, compute_platform_metrics
+
+
+def _admin_token():
+    admin = User(username="Admin", email="admin@example.com", is_master_admin=True)
+    admin.set_password("secret")
+    db.session.add(admin)
+    db.session.commit()
+    return create_access_token(identity=admin.email)
+
+
+def _add_business(status, currency="INR", sale=0.0, days_ago=1):
+    biz = Business(name=f"{status} shop", status=status, currency=currency)
+    db.session.add(biz)
+    db.session.flush()
+    if sale:
+        db.session.add(Transaction(business_id=biz.id, type="Sale", amount=sale, quantity=1, cogs=0.0,
+                                   profit=sale, category="Misc", timestamp=datetime.now() - timedelta(days=days_ago)))
+    db.session.commit()
+    return biz.id
+
+
+def test_business_status_counts(client_and_business):
+    with app.app_context():
+        _add_business("pending")
+        _add_business("pending")
+        _add_business("rejected")
+        assert business_status_counts() == {"approved": 1, "pending": 2, "rejected": 1}
+
+
+def test_tenant_metrics_come_from_the_rollups(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        metrics = compute_platform_metrics(days=30)
+
+    tenant, = metrics["tenants"]
+    assert tenant["business_id"] == business_id
+    assert tenant["transactions"] == 4
+    assert tenant["gmv"] == 1194.0 # all-time sales, including the 90-day-old one
+    assert tenant["gmv_recent"] == 195.0
+    assert tenant["transactions_recent"] == 3
+    assert tenant["inventory_items"] == 2
+    assert tenant["last_active"] == (datetime.now() - timedelta(days=2)).date().isoformat()
+    assert tenant["estimated_bytes"] == (4 * ROW_BYTES["transactions"] + 2 * ROW_BYTES["inventory_items"]
+                                         + tenant["rollup_rows"] * ROW_BYTES["rollups"])
+
+    assert metrics["gmv_by_currency"] == {"INR": 195.0}
+    assert metrics["transactions"] == 3
+    assert metrics["active_businesses"] == 1
+    # One point per day with activity in the window: days 2, 3 and 5 ago
+    assert [d["transactions"] for d in metrics["daily"]] == [1, 1, 1]
+    assert sum(d["gmv"].get("INR", 0) for d in metrics["daily"]) == 195.0
+
+
+def test_gmv_is_kept_per_currency(client_and_business):
+    with app.app_context():
+        _add_business("approved", currency="USD", sale=70.0, days_ago=2)
+        idle = _add_business("approved", currency="USD")
+        metrics = compute_platform_metrics(days=30)
+
+    assert metrics["gmv_by_currency"] == {"INR": 195.0, "USD": 70.0}
+    assert metrics["active_businesses"] == 2
+    two_days_ago = next(d for d in metrics["daily"]
+                        if d["date"] == (datetime.now() - timedelta(days=2)).date().isoformat())
+    assert two_days_ago["gmv"] == {"INR": 150.0, "USD": 70.0}
+    assert two_days_ago["active_businesses"] == 2
+    idle_tenant = next(t for t in metrics["tenants"] if t["business_id"] == idle)
+    assert idle_tenant["transactions"] == 0
+    assert idle_tenant["last_active"] is None
+
+
+def test_window_controls_activity(client_and_business):
+    with app.app_context():
+        metrics = compute_platform_metrics(days=1)
+    assert metrics["window_days"] == 1
+    assert metrics["transactions"] == 0
+    assert metrics["active_businesses"] == 0
+    assert metrics["daily"] == []
+
+
+def test_platform_metrics_endpoint(client_and_business):
+    client, _, token = client_and_business
+    with app.app_context():
+        admin = _admin_token()
+    headers = {"Authorization": f"Bearer {admin}"}
+
+    resp = client.get("/api/admin/platform-metrics?days=7", headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["window_days"] == 7
+    assert client.get("/api/admin/platform-metrics?days=0", headers=headers).status_code == 400
+    assert client.get("/api/admin/platform-metrics?days=367", headers=headers).status_code == 400
+    # Business owners are not platform admins
+    assert client.get("/api/admin/platform-metrics",
+                      headers={"Authorization": f"Bearer {token}"}).status_code == 403
+
+
+def test_admin_overview_uses_the_status_counts(client_and_business):
+    client, _, _ = client_and_business
+    with app.app_context():
+        _add_business("pending")
+        admin = _admin_token()
+    body = client.get("/api/admin/overview", headers={"Authorization": f"Bearer {admin}"}).get_json()
+    assert body["total_businesses"] == 1
+    assert body["pending_businesses"] == 1
+    assert body["rejected_businesses"] == 0
+    assert body["total_users"] == 2
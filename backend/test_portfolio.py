@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from app import app
+from models import db, User, Business, BusinessMember, Transaction, InventoryItem
+from portfolio import compute_portfolio
+
+
+def _get(client, token, url="/api/portfolio/dashboard"):
+    return client.get(url, headers={"Authorization": f"Bearer {token}"})
+
+
+def _add_business(name, role, currency="USD", sale=0.0, low_stock=False):
+    """A second business for the fixture's owner, with one recent sale and optionally a low-stock item."""
+    user = User.query.filter_by(email="owner@example.com").first()
+    biz = Business(name=name, status="approved", currency=currency)
+    db.session.add(biz)
+    db.session.flush()
+    db.session.add(BusinessMember(user_id=user.id, business_id=biz.id, role=role))
+    item = InventoryItem(business_id=biz.id, name="Widget", stock_quantity=2 if low_stock else 50,
+                         reorder_level=10, cost_price=1.0, selling_price=2.0, lead_time=1)
+    db.session.add(item)
+    db.session.flush()
+    if sale:
+        db.session.add(Transaction(business_id=biz.id, inventory_item_id=item.id, type="Sale", amount=sale,
+                                   quantity=1, cogs=sale / 2, profit=sale / 2, category="Misc",
+                                   timestamp=datetime.now() - timedelta(days=1)))
+    db.session.commit()
+    return biz.id
+
+
+def test_compute_portfolio_reads_kpis_from_the_rollups(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        kpis = compute_portfolio([business_id])[business_id]["kpis"]
+    # The 999 sale is 90 days old: outside the 30-day window
+    assert kpis["total_sales"] == 195.0
+    assert kpis["total_cogs"] == 130.0
+    assert kpis["total_expenses"] == 40.0
+    assert kpis["net_profit"] == 25.0
+    assert kpis["transactions"] == 3
+
+
+def test_compute_portfolio_fills_empty_businesses(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        quiet = _add_business("Quiet", "Owner")
+        results = compute_portfolio([business_id, quiet])
+    assert results[quiet]["kpis"]["total_sales"] == 0
+    assert len(results[quiet]["trend"]) == 6
+    assert all(point["sales"] == 0 for point in results[quiet]["trend"])
+    assert compute_portfolio([]) == {}
+
+
+def test_dashboard_covers_every_analytics_membership(client_and_business):
+    client, business_id, token = client_and_business
+    with app.app_context():
+        shop = _add_business("Another Shop", "Analyst", sale=80.0, low_stock=True)
+        _add_business("Staff Only", "Staff", sale=500.0)
+        body = _get(client, token).get_json()
+
+    by_id = {b["id"]: b for b in body["businesses"]}
+    assert set(by_id) == {business_id, shop} # Staff memberships are left out
+    assert by_id[shop]["role"] == "Analyst"
+    assert by_id[shop]["kpis"]["total_sales"] == 80.0
+    assert [a["type"] for a in by_id[shop]["alerts"]] == ["low_stock"]
+    assert by_id[business_id]["alerts"] == []
+
+    # Totals are kept per currency, never added across them
+    totals = body["totals_by_currency"]
+    assert totals["USD"] == {"total_sales": 80.0, "total_expenses": 0, "net_profit": 40.0, "businesses": 1}
+    assert totals["INR"]["total_sales"] == 195.0
+    assert totals["INR"]["businesses"] == 1
+
+
+def test_dashboard_sees_new_transactions(client_and_business):
+    client, business_id, token = client_and_business
+    with app.app_context():
+        before = _get(client, token).get_json()["totals_by_currency"]["INR"]["total_sales"]
+        db.session.add(Transaction(business_id=business_id, type="Sale", amount=5.0, quantity=1, cogs=2.0,
+                                   profit=3.0, category="Produce", timestamp=datetime.now()))
+        db.session.commit()
+        after = _get(client, token).get_json()["totals_by_currency"]["INR"]["total_sales"]
+    assert after == before + 5.0
+
+
+def test_dashboard_requires_a_token(client_and_business):
+    client, _, _ = client_and_business
+    assert client.get("/api/portfolio/dashboard").status_code == 401
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import app
+from ai_service import TransactionSet, ai_service, predict_item_demand
+from models import db, ForecastModel, InventoryItem, Transaction, TrendPrefix, TrendStats
+from trends import item_demand_model, profit_trend, rebuild_trends, sales_forecast
+
+
+def test_sales_forecast_fits_the_last_60_days_only(client_and_business):
+    _, business_id, _ = client_and_business
+    today = datetime.now().date()
+    with app.app_context():
+        total, days_with_sales = sales_forecast(business_id, 30, today=today)
+
+        # Sales 5 and 2 days ago (the one 90 days ago is outside the window), empty days as 0
+        y = [45.0, 0, 0, 150.0, 0, 0]
+        slope, intercept = np.polyfit(np.arange(len(y)), y, 1)
+        expected = sum(intercept + slope * x for x in range(len(y), len(y) + 30))
+        assert days_with_sales == 2
+        assert abs(total - max(0.0, expected)) < 1e-6
+
+        db.session.add(Transaction(business_id=business_id, type="Sale", amount=5000.0, quantity=1,
+                                   category="Produce", timestamp=datetime.now() - timedelta(days=61)))
+        db.session.commit()
+        assert sales_forecast(business_id, 30, today=today) == (total, days_with_sales)
+
+
+def test_series_kept_per_business_and_per_item(client_and_business):
+    _, business_id, _ = client_and_business
+    with app.app_context():
+        items = [i.id for i in InventoryItem.query.filter_by(business_id=business_id).order_by(InventoryItem.id)]
+        assert {(s.series, s.inventory_item_id) for s in TrendStats.query.filter_by(business_id=business_id)} == {
+            ("profit", None), ("expense", None), ("units", items[0]), ("units", items[1])}
+        assert {p.series for p in TrendPrefix.query.filter_by(business_id=business_id)} == {"sales"}
+
+
+def test_expense_forecast_averages_days_with_expenses(client_and_business):
+    _, business_id, _ = client_and_business
+    now = datetime.now()
+    with app.app_context():
+        db.session.add_all([
+            Transaction(business_id=business_id, type="Expense", amount=20.0, quantity=1, profit=-20.0,
+                        category="Power", timestamp=now - timedelta(days=3)), # same day as the 40 of rent
+            Transaction(business_id=business_id, type="Expense", amount=30.0, quantity=1, profit=-30.0,
+                        category="Wages", timestamp=now - timedelta(days=10)),
+        ])
+        db.session.commit()
+        rows = Transaction.query.filter_by(business_id=business_id).all()
+
+        forecast = profit_trend(business_id)["expense_forecast"]
+        assert forecast == (60.0 + 30.0) / 2 * 30 # not spread over the empty days in between
+        assert forecast == ai_service.predict_profit(TransactionSet.from_rows(rows))["expense_forecast"]
+
+
+def test_prefix_sums_follow_writes(client_and_business):
+    _, business_id, _ = client_and_business
+    today = datetime.now().date()
+    with app.app_context():
+        txn = Transaction.query.filter_by(business_id=business_id, category="Dairy").one()
+        txn.amount = 60.0
+        txn.timestamp = txn.timestamp - timedelta(days=20) # a day before every other sale in the window
+        db.session.add(Transaction(business_id=business_id, type="Sale", amount=70.0, quantity=1,
+                                   category="Produce", timestamp=datetime.now() - timedelta(days=4)))
+        db.session.delete(Transaction.query.filter_by(business_id=business_id, amount=150.0).one())
+        db.session.commit()
+
+        def prefixes():
+            return [(p.day, round(p.value, 6), round(p.sum_y, 6), round(p.sum_xy, 6), round(p.sum_yy, 6),
+                     p.active_days) for p in TrendPrefix.query.filter_by(business_id=business_id).order_by(TrendPrefix.day)]
+
+        incremental = prefixes()
+        forecast = sales_forecast(business_id, 30, today=today)
+        rebuild_trends(business_id)
+        assert prefixes() == incremental
+        assert sales_forecast(business_id, 30, today=today) == forecast
+
+        # Sales 25 and 4 days ago; the deleted 150 leaves an empty day
+        y = [60.0] + [0] * 20 + [70.0] + [0] * 4
+        slope, intercept = np.polyfit(np.arange(len(y)), y, 1)
+        assert forecast[1] == 2
+        assert abs(forecast[0] - max(0.0, sum(intercept + slope * x for x in range(len(y), len(y) + 30)))) < 1e-6
+
+
+def test_item_demand_comes_from_the_units_sums(client_and_business):
+    client, business_id, token = client_and_business
+    with app.app_context():
+        items = InventoryItem.query.filter_by(business_id=business_id).order_by(InventoryItem.id).all()
+        db.session.add(Transaction(business_id=business_id, inventory_item_id=items[0].id, type="Sale",
+                                   amount=60.0, quantity=4, cogs=40.0, profit=20.0, category="Produce",
+                                   timestamp=datetime.now() - timedelta(days=4)))
+        db.session.commit()
+
+        model = item_demand_model(business_id)
+        assert model["items"] == [items[0].id, items[1].id]
+        forecasts = predict_item_demand(model)
+
+        # Item 0: 4 units 4 days ago, 10 two days ago, from its first sale to its last
+        y = [4.0, 0, 10.0]
+        slope, intercept = np.polyfit(np.arange(len(y)), y, 1)
+        expected = [max(0.0, intercept + slope * x) for x in range(len(y), len(y) + 30)]
+        assert forecasts[items[0].id]["7_day"] == round(sum(expected[:7]), 2)
+        assert forecasts[items[0].id]["30_day"] == round(sum(expected), 2)
+        assert forecasts[items[0].id]["velocity"] == 7.0
+        # Item 1 sold once: a flat line at that day's units
+        assert forecasts[items[1].id]["30_day"] == 90.0
+        assert ai_service.get_demand_forecast(items[1].id, None, model) == forecasts[items[1].id]
+        assert item_demand_model(business_id, [items[1].id])["items"] == [items[1].id]
+
+        # Linear inventory insights read the sums instead of fitting and storing a model
+        resp = client.get(f"/api/businesses/{business_id}/ai/inventory-insights",
+                          headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200
+        assert ForecastModel.query.filter_by(business_id=business_id).count() == 0
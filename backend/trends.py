@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+import sys
+
+from sqlalchemy import func
+from models import db, Business, DailyRollup, TrendStats, TrendPrefix, PREFIX_SERIES, TREND_EPOCH, _trend_points, _active
+
+NO_PROFIT_TREND = {"7_day": 0, "30_day": 0, "confidence": "Low", "amount": 0, "expense_forecast": 0}
+
+# The dashboard's sales forecast only looks this far back, so it follows recent sales
+SALES_WINDOW_DAYS = 60
+
+
+def fit_trend(stats, today=None):
+    """(slope, intercept, n, r_squared) of the least-squares line through a
+    TrendStats series, from its origin to `today` with empty days as 0.
+    O(1): the sums are maintained on write. None if there is no series."""
+    if stats is None:
+        return None
+    today = today or datetime.utcnow().date()
+    n = (max(today, stats.last_day) - stats.origin).days + 1
+    return _least_squares(n, stats.sum_y, stats.sum_xy, stats.sum_yy)
+
+
+def _least_squares(n, sum_y, sum_xy, sum_yy):
+    """(slope, intercept, n, r_squared) for x = 0..n-1 from the sums involving y."""
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    sxx = n * sum_xx - sum_x ** 2
+    sxy = n * sum_xy - sum_x * sum_y
+    syy = n * sum_yy - sum_y ** 2
+    slope = sxy / sxx if sxx > 0 else 0.0
+    intercept = (sum_y - slope * sum_x) / n
+    r_squared = min(sxy * sxy / (sxx * syy), 1.0) if sxx > 0 and syy > 1e-9 else 0.0
+    return slope, intercept, n, r_squared
+
+
+def forecast_sum(fit, horizon):
+    """Sum of the fitted line over the `horizon` days after its window."""
+    slope, intercept, n, _ = fit
+    return horizon * intercept + slope * (horizon * n + horizon * (horizon - 1) / 2)
+
+
+def _series(business_id, series):
+    return TrendStats.query.filter(TrendStats.business_id == business_id, TrendStats.series.in_(series)).all()
+
+
+def _prefix_at(business_id, series, day):
+    """The running sums of a TrendPrefix series as of `day`: (Σy, Σxy, Σy², active days)."""
+    row = db.session.query(TrendPrefix.sum_y, TrendPrefix.sum_xy, TrendPrefix.sum_yy, TrendPrefix.active_days).filter(
+        TrendPrefix.business_id == business_id, TrendPrefix.series == series, TrendPrefix.day <= day
+    ).order_by(TrendPrefix.day.desc()).first()
+    return tuple(row) if row else (0, 0, 0, 0)
+
+
+def profit_trend(business_id, today=None):
+    """7/30-day profit forecast and monthly expense forecast, shaped like
+    BulkBinsAIService.predict_profit, read from the running trend sums."""
+    rows = {r.series: r for r in _series(business_id, ("profit", "expense"))}
+    profit = fit_trend(rows.get("profit"), today)
+    if profit is None:
+        return dict(NO_PROFIT_TREND)
+
+    # Average over the days that had expenses, as predict_profit does
+    expense = rows.get("expense")
+    expense_forecast = expense.sum_y / expense.active_days * 30 if expense and expense.active_days else 0
+    r_squared = profit[3]
+    pred_7 = forecast_sum(profit, 7)
+    pred_30 = forecast_sum(profit, 30)
+    return {
+        "7_day": round(max(0, pred_7), 2),
+        "30_day": round(max(0, pred_30), 2),
+        "confidence": "High" if r_squared > 0.7 else "Medium" if r_squared > 0.4 else "Low",
+        "amount": round(max(0, pred_30), 2),
+        "expense_forecast": round(expense_forecast, 2)
+    }
+
+
+def sales_forecast(business_id, horizon=30, window=SALES_WINDOW_DAYS, today=None):
+    """(forecast total, days with sales) of daily sales over the next `horizon` days.
+
+    The line is fitted through the last `window` days of sales (from the
+    first day with sales in it, empty days as 0). The window's sums are the
+    difference of two TrendPrefix rows, so this is three indexed lookups
+    whatever the window; (0.0, 0) without sales in the window.
+    """
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=window)
+    first = db.session.query(TrendPrefix.day).filter(
+        TrendPrefix.business_id == business_id, TrendPrefix.series == "sales",
+        TrendPrefix.day > start, TrendPrefix.day <= today, func.abs(TrendPrefix.value) > 1e-9
+    ).order_by(TrendPrefix.day).first()
+    if first is None:
+        return 0.0, 0
+
+    sum_y, sum_xy, sum_yy, days = (a - b for a, b in zip(_prefix_at(business_id, "sales", today),
+                                                          _prefix_at(business_id, "sales", start)))
+    origin = first.day
+    # Prefix x counts from TREND_EPOCH; the fit's x counts from the window's first day with sales
+    fit = _least_squares((today - origin).days + 1, sum_y, sum_xy - (origin - TREND_EPOCH).days * sum_y, sum_yy)
+    return max(0.0, forecast_sum(fit, horizon)), days
+
+
+def item_demand_model(business_id, item_ids=None):
+    """Units-sold trends of a business's items, as params for ai_service.predict_item_demand.
+
+    One row read per item. Each line runs from the item's first sale to its
+    last, empty days as 0, so an item that stopped selling is still forecast
+    from its history; no weekday factors. Empty if no item has sold.
+    """
+    query = TrendStats.query.filter(TrendStats.business_id == business_id, TrendStats.series == "units")
+    if item_ids is not None:
+        query = query.filter(TrendStats.inventory_item_id.in_(item_ids))
+    rows = [r for r in query.order_by(TrendStats.inventory_item_id).all() if r.active_days]
+    if not rows:
+        return {}
+
+    fits = [_least_squares((r.last_day - r.origin).days + 1, r.sum_y, r.sum_xy, r.sum_yy) for r in rows]
+    # predict_item_demand forecasts every row from the same column: align each
+    # line's end with the longest one
+    days = max(n for _, _, n, _ in fits)
+    return {
+        "ends": [r.last_day.strftime('%Y-%m-%d') for r in rows],
+        "days": days,
+        "items": [r.inventory_item_id for r in rows],
+        "intercept": [intercept - slope * (days - n) for slope, intercept, n, _ in fits],
+        "slope": [slope for slope, _, _, _ in fits],
+        "factors": [[1.0] * 7 for _ in rows],
+        "velocity": [r.sum_y / r.active_days for r in rows],
+    }
+
+
+def rebuild_trends(business_id=None):
+    """Refits TrendStats and TrendPrefix from DailyRollup, for one business or all.
+
+    The flush listener in models.py keeps the sums current; run this once
+    after adding the tables, and after rebuild_rollups.
+    """
+    for table in (TrendStats, TrendPrefix):
+        stats = table.query
+        if business_id is not None:
+            stats = stats.filter(table.business_id == business_id)
+        stats.delete(synchronize_session=False)
+
+    rows = db.session.query(
+        DailyRollup.business_id, DailyRollup.day, DailyRollup.type, DailyRollup.inventory_item_id,
+        func.sum(DailyRollup.amount), func.sum(DailyRollup.quantity), func.sum(DailyRollup.profit)
+    )
+    if business_id is not None:
+        rows = rows.filter(DailyRollup.business_id == business_id)
+    rows = rows.group_by(DailyRollup.business_id, DailyRollup.day, DailyRollup.type,
+                         DailyRollup.inventory_item_id).all()
+
+    values = {} # (business_id, series, item_id) -> {day: value}
+    for bid, day, txn_type, item_id, *measures in rows:
+        for series, series_item, value in _trend_points((bid, day, txn_type, None, item_id), measures):
+            days = values.setdefault((bid, series, series_item), {})
+            days[day] = days.get(day, 0) + (value or 0)
+
+    trend_rows, prefix_rows = [], []
+    for (bid, series, item_id), days in values.items():
+        if series in PREFIX_SERIES:
+            sums = [0, 0, 0, 0]
+            for d in sorted(days):
+                v = days[d]
+                sums = [sums[0] + v, sums[1] + (d - TREND_EPOCH).days * v, sums[2] + v * v, sums[3] + _active(v)]
+                prefix_rows.append({"business_id": bid, "series": series, "day": d, "value": v,
+                                    **dict(zip(("sum_y", "sum_xy", "sum_yy", "active_days"), sums))})
+            continue
+        origin = min(days)
+        trend_rows.append({
+            "business_id": bid, "series": series, "inventory_item_id": item_id,
+            "origin": origin, "last_day": max(days),
+            "sum_y": sum(days.values()),
+            "sum_xy": sum((d - origin).days * v for d, v in days.items()),
+            "sum_yy": sum(v * v for v in days.values()),
+            "active_days": sum(_active(v) for v in days.values())
+        })
+    if trend_rows:
+        db.session.execute(TrendStats.__table__.insert(), trend_rows)
+    if prefix_rows:
+        db.session.execute(TrendPrefix.__table__.insert(), prefix_rows)
+    db.session.commit()
+    return len(trend_rows) + len({(r["business_id"], r["series"]) for r in prefix_rows})
+
+
+if __name__ == "__main__":
+    from app import app
+    with app.app_context():
+        business_ids = [int(a) for a in sys.argv[1:]] or [b.id for b in Business.query.all()]
+        for bid in business_ids:
+            print(f"Business {bid}: {rebuild_trends(bid)} trend series")
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_service import TransactionSet, summarize_periods
+
+ROWS = 250_000 # about a year of a busy store
+RUNS = 3
+NOW = datetime(2026, 1, 15)
+
+
+def build_set(rows=ROWS):
+    rng = np.random.default_rng(3)
+    minutes = np.sort(rng.integers(0, 365 * 24 * 60, rows))
+    start = NOW - timedelta(days=365)
+    return TransactionSet.from_frame(pd.DataFrame({
+        'timestamp': [start + timedelta(minutes=int(m)) for m in minutes],
+        'type': np.where(rng.random(rows) < 0.8, 'Sale', 'Expense'),
+        'amount': rng.uniform(10, 2000, rows),
+        'category': rng.choice(['Produce', 'Dairy', 'Rent', 'Utilities', 'Salaries'], rows),
+    }))
+
+
+def legacy_periods(txns, now=NOW):
+    """The previous implementation: lambda week bucketing and a fresh mask per week, month and type."""
+    df = txns.frame[['date', 'amount', 'type', 'category']].copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df['week_start'] = df['date'].dt.to_period('W').apply(lambda r: r.start_time)
+    weekly_stats = df.groupby(['week_start', 'type'], observed=True)['amount'].sum().reset_index()
+    weeks = sorted(weekly_stats['week_start'].unique())[-8:]
+    weekly = []
+    for w in weeks:
+        w_sales = weekly_stats[(weekly_stats['week_start'] == w) & (weekly_stats['type'] == 'Sale')]['amount'].sum()
+        w_exp = weekly_stats[(weekly_stats['week_start'] == w) & (weekly_stats['type'] == 'Expense')]['amount'].sum()
+        weekly.append((w_sales, w_exp))
+
+    exp_by_cat = df[df['type'] == 'Expense'].groupby('category', observed=True)['amount'].sum().reset_index()
+    breakdown = [(r['category'], r['amount']) for _, r in exp_by_cat.iterrows()]
+
+    df['year_month'] = df['date'].dt.to_period('M')
+    monthly_stats = df.groupby(['year_month', 'type'], observed=True)['amount'].sum().reset_index()
+    months = sorted(monthly_stats['year_month'].unique())[-6:]
+    trend = []
+    for m in months:
+        m_sales = monthly_stats[(monthly_stats['year_month'] == m) & (monthly_stats['type'] == 'Sale')]['amount'].sum()
+        m_exp = monthly_stats[(monthly_stats['year_month'] == m) & (monthly_stats['type'] == 'Expense')]['amount'].sum()
+        trend.append(m_sales - m_exp)
+    return weekly, breakdown, trend
+
+
+def bench(label, fn):
+    best = float("inf")
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<40} {best * 1000:8.1f} ms")
+    return best
+
+
+if __name__ == "__main__":
+    txns = build_set()
+    print(f"Dashboard period sections over {ROWS:,} transactions (best of {RUNS})")
+    base = bench("per-week/month masks + lambda", lambda: legacy_periods(txns))
+    fast = bench("summarize_periods (pivoted group-bys)", lambda: summarize_periods(txns.frame, NOW))
+    print(f"Speedup: {base / fast:.1f}x")
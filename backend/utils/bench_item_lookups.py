@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_service import ai_service, TransactionSet
+
+SALES = 500_000
+SKUS = 5_000
+LEGACY_SAMPLE = 2_000 # the old per-sale scans are timed on a sample and extrapolated
+
+
+def build_data(sales=SALES, skus=SKUS):
+    rng = np.random.default_rng(11)
+    items = [{
+        "id": i,
+        "name": f"SKU {i}",
+        "stock_quantity": int(rng.integers(0, 200)),
+        "reorder_level": 5,
+        "lead_time": 2,
+        "cost_price": float(rng.uniform(5, 50)),
+        "selling_price": float(rng.uniform(60, 120)),
+    } for i in range(skus)]
+
+    start = datetime(2025, 1, 1)
+    item_ids = rng.integers(0, skus, sales)
+    quantities = rng.integers(1, 6, sales)
+    minutes = np.sort(rng.integers(0, 365 * 24 * 60, sales))
+    txns = [{
+        "inventory_item_id": int(item_ids[n]),
+        "type": "Sale",
+        "quantity": int(quantities[n]),
+        "amount": float(quantities[n] * 80),
+        "profit": float(quantities[n] * 30),
+        "category": "Produce",
+        "timestamp": (start + timedelta(minutes=int(minutes[n]))).isoformat(),
+    } for n in range(sales)]
+    return items, txns
+
+
+def legacy_cogs(inventory_items, sales):
+    total = 0
+    for item_id, qty in zip(sales['inventory_item_id'], sales['quantity']):
+        item = next((i for i in inventory_items if i['id'] == item_id), None)
+        if item:
+            total += item.get('cost_price', 0) * qty
+    return total
+
+
+def indexed_cogs(inventory_items, sales):
+    unit_cost = pd.Series({i['id']: i.get('cost_price') or 0 for i in inventory_items}, dtype=float)
+    return float((sales['inventory_item_id'].map(unit_cost).astype(float).fillna(0) * sales['quantity']).sum())
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    items, txns = build_data()
+    txn_set, build_t = timed(lambda: TransactionSet(txns))
+    sales = txn_set.sales
+    print(f"{SALES:,} sales x {SKUS:,} SKUs (TransactionSet built in {build_t:.2f} s)")
+
+    sample = sales.head(LEGACY_SAMPLE)
+    _, legacy_t = timed(lambda: legacy_cogs(items, sample))
+    legacy_full = legacy_t * len(sales) / LEGACY_SAMPLE
+    _, indexed_t = timed(lambda: indexed_cogs(items, sales))
+    print(f"{'COGS, linear scan per sale (extrapolated)':<48} {legacy_full:10.2f} s")
+    print(f"{'COGS, id-indexed map':<48} {indexed_t:10.3f} s  ({legacy_full / indexed_t:,.0f}x)")
+
+    insights, insights_t = timed(lambda: ai_service.get_profitability_insights(items, txn_set))
+    print(f"{'get_profitability_insights':<48} {insights_t:10.3f} s  ({len(insights):,} items)")
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_provider import FastJSONProvider, orjson
+
+ROWS = 100_000
+RUNS = 5
+
+
+def build_payload(rows=ROWS):
+    """Rows shaped like get_transactions / export-data responses."""
+    start = datetime(2025, 1, 1)
+    amounts = np.random.default_rng(7).uniform(10, 5000, rows)
+    return {
+        "transactions": [{
+            "id": i,
+            "amount": amounts[i],
+            "category": "Produce",
+            "type": "Sale" if i % 4 else "Expense",
+            "timestamp": start + timedelta(minutes=i),
+            "description": f"Bulk order #{i}",
+            "profit": amounts[i] * 0.2,
+            "inventory_item_id": i % 500,
+            "quantity": np.int64(i % 12 + 1),
+        } for i in range(rows)],
+        "total": rows,
+    }
+
+
+def stdlib_payload(payload):
+    """What routes have to build for the stdlib provider: plain Python types only."""
+    return {
+        "transactions": [{
+            **row,
+            "amount": float(row["amount"]),
+            "profit": float(row["profit"]),
+            "timestamp": row["timestamp"].isoformat(),
+            "quantity": int(row["quantity"]),
+        } for row in payload["transactions"]],
+        "total": payload["total"],
+    }
+
+
+def bench(label, fn):
+    best = float("inf")
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        size = len(fn().get_data())
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<45} {best * 1000:8.1f} ms  ({size / 1e6:.1f} MB)")
+    return best
+
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    payload = build_payload()
+
+    print(f"Serializing {ROWS:,} rows (best of {RUNS}), orjson={'yes' if orjson else 'no'}")
+    base = bench("stdlib provider (convert + dump)", lambda: stdlib.response(stdlib_payload(payload)))
+    fast_t = bench("FastJSONProvider (native types)", lambda: fast.response(payload))
+    print(f"Speedup: {base / fast_t:.1f}x")
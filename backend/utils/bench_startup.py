@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+
+# Each scenario runs in a fresh interpreter, as a gunicorn worker or a maintenance script would
+IMPORT_APP = "import time; t0 = time.perf_counter(); import app; t1 = time.perf_counter()"
+SCENARIOS = [
+    ("import app (classifier not loaded)", IMPORT_APP + "; print(t1 - t0)"),
+    ("import app + first classify_expense, artifact on disk",
+     IMPORT_APP + "; app.ai_service.classify_expense('Electricity bill'); print(time.perf_counter() - t0)"),
+    ("import app + train pipeline (the old import-time cost)",
+     IMPORT_APP + "; from ai_service import train_expense_classifier; train_expense_classifier(); print(time.perf_counter() - t0)"),
+]
+
+
+def cold_start(code, env):
+    best = float("inf")
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        best = min(best, float(out.strip().splitlines()[-1]))
+    return best
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ,
+               DATABASE_URL="sqlite:///" + os.path.join(tmp, "bench.db"),
+               EXPENSE_CLASSIFIER_PATH=os.path.join(tmp, "expense_classifier.pkl"))
+    # Write the artifact once, as the deploy step would
+    subprocess.run([sys.executable, "ai_service.py"], cwd=BACKEND, env=env, capture_output=True, check=True)
+
+    print(f"Cold start in a fresh interpreter (best of {RUNS})")
+    results = [(label, cold_start(code, env)) for label, code in SCENARIOS]
+    for label, seconds in results:
+        print(f"{label:<58} {seconds * 1000:8.0f} ms")
+    lazy, _, eager = (s for _, s in results)
+    print(f"Boot saves {(eager - lazy) * 1000:.0f} ms per process ({eager / lazy:.1f}x faster)")